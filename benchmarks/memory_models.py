@@ -0,0 +1,159 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Memory benchmark for the Task, Machine and Allocation models.
+
+This compares the resident size of the slot-based models, which share a
+single runtime matrix between all tasks, against dictionary-based models
+laid out as they were before __slots__ were introduced (a __dict__ per
+object, and a {machine: runtime} dictionary per pre-computed task). The
+'comp' values read from the workflow file are held by the graph in both
+cases, so they are not included.
+
+Run from the repository root:
+
+    python -m benchmarks.memory_models --tasks 20000 --machines 128
+"""
+
+import argparse
+import json
+import tracemalloc
+
+import numpy as np
+
+from shadow.models.workflow import Task
+from shadow.models.environment import Machine
+from shadow.models.solution import Allocation
+
+
+class DictTask(object):
+    """Task as laid out before __slots__ and the shared runtime matrix"""
+
+    def __init__(self, tid, flops=0, data=None, pre_compute=False):
+        self.tid = tid
+        self.rank = -1
+        self.pre_compute = pre_compute
+        self.flops_demand = flops
+        self.io_demand = data
+        if self.pre_compute:
+            self._calculated_runtime = {}
+            self._calculated_io = {}
+            self._calculated_memory = {}
+        self.machine = None
+        self.ast = 0
+        self.aft = 0
+
+    def __hash__(self):
+        return hash(self.tid)
+
+
+class DictMachine(object):
+    """Machine as laid out before __slots__"""
+
+    def __init__(self, mid, flops, memory, bandwidth, cost):
+        self.id = mid
+        self.machine_type = mid.split("_")[0]
+        self.flops = flops
+        self.memory = memory
+        self.iorate = bandwidth
+        self.bandwidth = bandwidth
+        self.cost = cost
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class DictAllocation(object):
+    """Allocation as laid out before __slots__"""
+
+    def __init__(self, task, machine, ast=None, aft=None):
+        self.machine = machine
+        self.task = task
+        self.ast = ast
+        self.aft = aft
+
+
+def _build_dict_models(num_tasks, num_machines, runtimes):
+    machines = [DictMachine('cat0_m{0}'.format(i), 1000, 0, 1, 0)
+                for i in range(num_machines)]
+    tasks = []
+    for i in range(num_tasks):
+        task = DictTask(i, 0, 0, pre_compute=True)
+        task._calculated_runtime = dict(zip(machines, runtimes[i].tolist()))
+        tasks.append(task)
+    allocations = [
+        DictAllocation(t, machines[i % num_machines], i, i + 1)
+        for i, t in enumerate(tasks)
+    ]
+    return machines, tasks, allocations
+
+
+def _build_slot_models(num_tasks, num_machines, runtimes):
+    machines = [Machine('cat0_m{0}'.format(i), 1000, 0, 1, 0, index=i)
+                for i in range(num_machines)]
+    shared = np.array(runtimes)
+    tasks = []
+    for i in range(num_tasks):
+        task = Task(i, 0, 0, pre_compute=True)
+        task.index = i
+        task._runtimes = shared
+        tasks.append(task)
+    allocations = [
+        Allocation(t, machines[i % num_machines], i, i + 1)
+        for i, t in enumerate(tasks)
+    ]
+    return machines, tasks, allocations, shared
+
+
+def measure(builder, *args):
+    """
+    Peak and retained memory (bytes) allocated by `builder(*args)`
+    """
+    tracemalloc.start()
+    result = builder(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def run(num_tasks, num_machines, seed=20):
+    rng = np.random.default_rng(seed)
+    runtimes = rng.integers(1, 1000, size=(num_tasks, num_machines))
+    dict_current, dict_peak = measure(
+        _build_dict_models, num_tasks, num_machines, runtimes
+    )
+    slot_current, slot_peak = measure(
+        _build_slot_models, num_tasks, num_machines, runtimes
+    )
+    return {
+        'tasks': num_tasks,
+        'machines': num_machines,
+        'dict_bytes': dict_current,
+        'dict_peak_bytes': dict_peak,
+        'slots_bytes': slot_current,
+        'slots_peak_bytes': slot_peak,
+        'ratio': round(dict_current / slot_current, 2)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compare memory use of dict- and slot-based models')
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--machines', type=int, default=128)
+    args = parser.parse_args()
+    print(json.dumps(run(args.tasks, args.machines), indent=2))
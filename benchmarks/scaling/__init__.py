@@ -0,0 +1,41 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Scaling benchmarks of the scheduling pipeline on synthetic workflows.
+
+Workflows of standard shapes (see `shapes`) are generated at increasing
+sizes, and the wall time and peak memory of loading the workflow, ranking
+its tasks and allocating them with the list-scheduling heuristics are
+recorded (see `suite`). Results are written as JSON, and can be compared
+against a stored baseline to catch performance regressions.
+
+Run from the repository root:
+
+    python -m benchmarks.scaling --sizes 100 1000 10000 --output before.json
+    python -m benchmarks.scaling --sizes 100 1000 10000 --baseline before.json
+
+The second command exits with status 1 if any step is more than
+`--threshold` times slower (or larger) than in the baseline.
+
+Workflows of 10^5 and 10^6 tasks (`suite.LARGE_SIZES`) are opt-in, with
+`--large` or by listing them in `--sizes`:
+
+    python -m benchmarks.scaling --sizes 100000 1000000 --timeout 600
+
+The peak memory of sizes above `suite.TRACE_LIMIT` is not measured, and
+a step that runs for longer than `--timeout` seconds is reported as
+failed, so that the other steps still run.
+"""
@@ -0,0 +1,80 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Command-line entry point of the scaling benchmarks:
+
+    python -m benchmarks.scaling --sizes 100 1000 --output results.json
+    python -m benchmarks.scaling --sizes 100 1000 --baseline results.json
+
+The exit status is 1 if any step regressed against the baseline.
+"""
+
+import argparse
+import json
+import sys
+
+from benchmarks.scaling.shapes import SHAPES
+from benchmarks.scaling.suite import (
+    run, compare, format_table, STEPS, SIZES, LARGE_SIZES, NUM_MACHINES
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Scaling benchmarks of the shadow scheduling pipeline')
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES),
+                        default=list(SHAPES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='Approximate numbers of tasks')
+    parser.add_argument('--large', action='store_true',
+                        help='Also run the sizes {0}'.format(
+                            ' '.join(str(size) for size in LARGE_SIZES)))
+    parser.add_argument('--steps', nargs='+', choices=STEPS, default=STEPS)
+    parser.add_argument('--machines', type=int, default=NUM_MACHINES)
+    parser.add_argument('--seed', type=int, default=20)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Do not measure the peak memory of each step')
+    parser.add_argument('--timeout', type=float,
+                        help='Seconds after which a step is stopped')
+    parser.add_argument('--output', help='Write the results as JSON')
+    parser.add_argument('--baseline', help='Compare with a results file')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Ratio to the baseline above which a step '
+                             'has regressed')
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes
+    if args.large:
+        sizes = sizes + [size for size in LARGE_SIZES if size not in sizes]
+    results = run(args.shapes, sizes, args.steps,
+                  memory=not args.no_memory, num_machines=args.machines,
+                  seed=args.seed, timeout=args.timeout)
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as infile:
+            comparison = compare(results, json.load(infile), args.threshold)
+        results['comparison'] = comparison
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            json.dump(results, outfile, indent=2)
+    print(format_table(results, comparison))
+    if comparison and any(c['regressed'] for c in comparison):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
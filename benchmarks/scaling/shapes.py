@@ -0,0 +1,100 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Synthetic workflow shapes for the scaling benchmarks.
+
+Each shape function returns the edges of a DAG with approximately
+`num_tasks` tasks, as (num_tasks, sources, targets), where tasks are
+numbered 0..num_tasks-1 and every edge goes from a lower to a higher task
+number. Apart from `channel_split`, the shapes are graph families of
+utils.shadowgen.synthetic. `workflow_config` attaches random costs to a
+shape and produces a shadow workflow config (the dictionary stored in a
+workflow JSON file).
+"""
+
+import numpy as np
+
+from utils.shadowgen.synthetic import fork_join, layered, denselu
+
+# Tasks of the per-channel pipeline in `channel_split`, and its edges: a
+# simplified continuum imaging pipeline (ingest, flag, calibrate, three
+# parallel gridding steps, image and clean)
+_CHANNEL_TASKS = 8
+_CHANNEL_EDGES = np.array([(0, 1), (1, 2), (2, 3), (2, 4), (2, 5), (3, 6),
+                           (4, 6), (5, 6), (6, 7)])
+
+
+def channel_split(num_tasks):
+    """
+    Channel-split continuum workflow, in the shape produced by
+    recipes/daliuge_shadowgen.py: a head task splits the data into
+    channels, each of which is processed by a copy of the same pipeline.
+    """
+    per_channel = _CHANNEL_TASKS + 1
+    channels = max(1, (num_tasks - 1) // per_channel)
+    split = 1 + np.arange(channels) * per_channel
+    pipeline = split[:, None] + 1
+    sources = np.concatenate([
+        np.zeros(channels, dtype=np.int64), split,
+        (pipeline + _CHANNEL_EDGES[:, 0]).ravel()
+    ])
+    targets = np.concatenate([
+        split, pipeline[:, 0],
+        (pipeline + _CHANNEL_EDGES[:, 1]).ravel()
+    ])
+    return 1 + channels * per_channel, sources, targets
+
+
+SHAPES = {
+    'fork_join': fork_join,
+    'channel_split': channel_split,
+    'layered': layered,
+    'denselu': denselu
+}
+
+
+def workflow_config(shape, num_tasks, seed=20, comp=(1000, 100000),
+                    data=(0, 50)):
+    """
+    Shadow workflow config for a shape, with uniformly distributed FLOP
+    demands and edge transfer data.
+
+    :param shape: Name of a shape in SHAPES
+    :param num_tasks: Approximate number of tasks
+    :param comp: (low, high) range of the FLOP demand of each task
+    :param data: (low, high) range of the data transferred along each edge
+    :return: Dictionary in the shadow workflow JSON format
+    """
+    total, sources, targets = SHAPES[shape](num_tasks)
+    rng = np.random.default_rng(seed)
+    comp = rng.integers(comp[0], comp[1], total).tolist()
+    data = rng.integers(data[0], data[1], len(sources)).tolist()
+    order = np.lexsort((targets, sources))
+    return {
+        'header': {'time': False, 'gen_specs': {'shape': shape,
+                                                'seed': seed}},
+        'graph': {
+            'directed': True,
+            'multigraph': False,
+            'graph': {},
+            'nodes': [{'id': i, 'comp': c} for i, c in enumerate(comp)],
+            'links': [
+                {'source': u, 'target': v, 'transfer_data': d}
+                for u, v, d in zip(sources[order].tolist(),
+                                   targets[order].tolist(), data)
+            ]
+        }
+    }
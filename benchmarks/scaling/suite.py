@@ -0,0 +1,312 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Run the scaling benchmarks, and compare results against a baseline.
+
+For every (shape, size) pair, a workflow is generated (see `shapes`) and
+written to a JSON file, and an environment is generated with
+utils.shadowgen.generator.generate_system_machines. The steps below are
+then run in order on the same Workflow object:
+
+* 'load': Workflow(path) and add_environment;
+* 'ranks': calculate_upward_ranks (the ranks are stored on the tasks);
+* 'insertion_policy': HEFT allocation in rank order;
+* 'pheft' and 'fcfs': the complete heuristics.
+
+Each step is timed, and if `memory` is set it is run a second time under
+tracemalloc to find its peak memory (tracing slows Python down, so it is
+not run while timing). Tracing a workflow of a size above TRACE_LIMIT
+takes many times longer than the step itself, so the peak memory of
+larger workflows is not measured. A step that runs for longer than
+`timeout` seconds is stopped and reported as failed. Results are lists of
+dictionaries, one per (shape, size, step), which are written as JSON.
+
+SIZES are run by default; LARGE_SIZES (10^5 and 10^6 tasks) are opt-in,
+and are usually run with a timeout.
+"""
+
+import contextlib
+import json
+import os
+import platform
+import signal
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from shadow.algorithms.heuristic import (
+    calculate_upward_ranks, insertion_policy, pheft, fcfs
+)
+from shadow.models.environment import Environment
+from shadow.models.workflow import Workflow
+from utils.shadowgen.generator import generate_system_machines
+
+from benchmarks.scaling.shapes import SHAPES, workflow_config
+
+STEPS = ['load', 'ranks', 'insertion_policy', 'pheft', 'fcfs']
+SIZES = [100, 1000, 10000]
+LARGE_SIZES = [100000, 1000000]
+# Largest size (see SIZES) of which the peak memory is traced
+TRACE_LIMIT = 10000
+
+# Environment of the channel-split recipe (recipes/daliuge_shadowgen.py)
+NUM_MACHINES = 40
+HETEROGENEITY = [0.75, 0.25]
+SPEC_RANGE = [(200, 400), (800, 1600)]
+
+
+@contextlib.contextmanager
+def _time_limit(seconds):
+    """
+    Raise TimeoutError in the block if it runs for longer than `seconds`.
+    There is no limit if `seconds` is None, or on platforms without
+    SIGALRM.
+    """
+    if not seconds or not hasattr(signal, 'SIGALRM'):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise TimeoutError('stopped after {0} s'.format(seconds))
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _measure(function, memory, timeout=None):
+    """
+    Wall time (seconds) of `function()`, its result, and its peak traced
+    memory in bytes (None if `memory` is False). The run and the traced
+    rerun are each limited to `timeout` seconds.
+    """
+    with _time_limit(timeout):
+        start = time.perf_counter()
+        result = function()
+        wall = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            with _time_limit(timeout):
+                function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return wall, result, peak
+
+
+def _rank(workflow):
+    ranks = calculate_upward_ranks(workflow, progress=False)
+    for task in workflow.tasks:
+        task.rank = ranks[task]
+
+
+def run_workflow(workflow_path, env_path, steps=STEPS, memory=True,
+                 timeout=None):
+    """
+    Run the benchmark steps on one workflow file. The workflow is always
+    loaded (and ranked, if 'insertion_policy' is run without 'ranks'), but
+    only the steps in `steps` are reported.
+
+    :param timeout: Seconds after which a step is stopped (see
+        `_time_limit`)
+    :return: List of (step, wall seconds, peak bytes, makespan, error),
+        where `error` describes the exception raised by a step that failed
+        (and the other values are None). If the workflow could not be
+        loaded, every step fails.
+    """
+    def load():
+        workflow = Workflow(workflow_path)
+        workflow.add_environment(Environment(env_path))
+        return workflow
+
+    try:
+        wall, workflow, peak = _measure(load, memory, timeout)
+    except Exception as e:
+        return [(step, None, None, None, repr(e)) for step in steps]
+    results = []
+    if 'load' in steps:
+        results.append(('load', wall, peak, None, None))
+    if 'insertion_policy' in steps and 'ranks' not in steps:
+        _rank(workflow)
+    functions = {
+        'ranks': lambda: _rank(workflow),
+        'insertion_policy': lambda: insertion_policy(workflow),
+        'pheft': lambda: pheft(workflow),
+        'fcfs': lambda: fcfs(workflow)
+    }
+    for step in steps:
+        if step == 'load':
+            continue
+        try:
+            wall, solution, peak = _measure(functions[step], memory,
+                                            timeout)
+        except Exception as e:
+            results.append((step, None, None, None, repr(e)))
+            continue
+        makespan = solution.makespan if solution is not None else None
+        results.append((step, wall, peak, makespan, None))
+    return results
+
+
+def run(shapes=None, sizes=SIZES, steps=STEPS, memory=True,
+        num_machines=NUM_MACHINES, seed=20, directory=None, timeout=None):
+    """
+    Run the benchmarks over each shape and size.
+
+    :param shapes: Names of shapes (see shapes.SHAPES); defaults to all
+    :param sizes: Approximate numbers of tasks
+    :param steps: Steps to run (see STEPS)
+    :param memory: Also measure the peak memory of each step, for sizes
+        of at most TRACE_LIMIT
+    :param num_machines: Number of machines in the environment
+    :param seed: Seed of the workflow and environment generators
+    :param directory: Where to write the generated files (defaults to a
+        temporary directory, which is removed afterwards)
+    :param timeout: Seconds after which a step is stopped and reported as
+        failed
+    :return: Dictionary with the run's metadata and a list of results
+    """
+    if shapes is None:
+        shapes = list(SHAPES)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = directory or tmp
+        env_path = generate_system_machines(
+            os.path.join(directory, 'system_{0}.json'.format(num_machines)),
+            num_machines, 'giga', HETEROGENEITY, SPEC_RANGE, seed=seed
+        )
+        results = []
+        for shape in shapes:
+            for size in sizes:
+                config = workflow_config(shape, size, seed=seed)
+                path = os.path.join(directory,
+                                    '{0}_{1}.json'.format(shape, size))
+                with open(path, 'w') as outfile:
+                    json.dump(config, outfile)
+                num_tasks = len(config['graph']['nodes'])
+                num_edges = len(config['graph']['links'])
+                del config
+                traced = memory and size <= TRACE_LIMIT
+                for step, wall, peak, makespan, error in run_workflow(
+                        path, env_path, steps, traced, timeout):
+                    results.append({
+                        'shape': shape,
+                        'size': size,
+                        'tasks': num_tasks,
+                        'edges': num_edges,
+                        'step': step,
+                        'wall_s': None if wall is None else round(wall, 6),
+                        'peak_bytes': peak,
+                        'makespan': makespan,
+                        'error': error
+                    })
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machines': num_machines,
+            'seed': seed,
+            'timeout': timeout,
+            'date': time.strftime('%Y-%m-%d %H:%M:%S')
+        },
+        'results': results
+    }
+
+
+def compare(results, baseline, threshold=1.25, min_wall=0.01):
+    """
+    Compare benchmark results with a baseline run.
+
+    A step regresses if its wall time or peak memory is more than
+    `threshold` times that of the same (shape, size, step) in the
+    baseline. Wall times below `min_wall` seconds in both runs are too
+    noisy to compare, and are ignored.
+
+    :param results: Output of `run`
+    :param baseline: Output of `run` for the baseline
+    :return: List of dictionaries (one per step found in both runs) with
+        the ratios of the wall time and peak memory to the baseline, and
+        whether the step regressed
+    """
+    previous = {
+        (r['shape'], r['size'], r['step']): r for r in baseline['results']
+    }
+    comparison = []
+    for result in results['results']:
+        key = (result['shape'], result['size'], result['step'])
+        if key not in previous:
+            continue
+        base = previous[key]
+        if result['wall_s'] is None or base['wall_s'] is None:
+            continue
+        wall_ratio = None
+        if max(result['wall_s'], base['wall_s']) >= min_wall:
+            wall_ratio = result['wall_s'] / max(base['wall_s'], 1e-9)
+        memory_ratio = None
+        if result['peak_bytes'] and base['peak_bytes']:
+            memory_ratio = result['peak_bytes'] / base['peak_bytes']
+        regressed = any(ratio is not None and ratio > threshold
+                        for ratio in (wall_ratio, memory_ratio))
+        comparison.append({
+            'shape': result['shape'],
+            'size': result['size'],
+            'step': result['step'],
+            'wall_ratio': None if wall_ratio is None
+            else round(wall_ratio, 3),
+            'memory_ratio': None if memory_ratio is None
+            else round(memory_ratio, 3),
+            'regressed': regressed
+        })
+    return comparison
+
+
+def format_table(results, comparison=None):
+    """
+    Human-readable table of the results (and their comparison with a
+    baseline, if given)
+    """
+    ratios = {}
+    if comparison:
+        ratios = {(c['shape'], c['size'], c['step']): c for c in comparison}
+    lines = ['{0:<14}{1:>9}{2:>10}{3:<18}{4:>11}{5:>12}{6:>9}{7:>9}'.format(
+        'shape', 'tasks', 'edges', '  step', 'wall (s)', 'peak (MB)',
+        'x wall', 'x mem')]
+    for r in results['results']:
+        row = '{0:<14}{1:>9}{2:>10}  {3:<16}'.format(
+            r['shape'], r['tasks'], r['edges'], r['step'])
+        if r['error'] is not None:
+            lines.append(row + ' failed: ' + r['error'])
+            continue
+        c = ratios.get((r['shape'], r['size'], r['step']), {})
+        peak = ('{0:.1f}'.format(r['peak_bytes'] / 2 ** 20)
+                if r['peak_bytes'] is not None else '-')
+        lines.append(row + '{0:>11.4f}{1:>12}{2:>9}{3:>9}{4}'.format(
+            r['wall_s'], peak, _ratio(c.get('wall_ratio')),
+            _ratio(c.get('memory_ratio')),
+            '  REGRESSION' if c.get('regressed') else ''))
+    return '\n'.join(lines)
+
+
+def _ratio(value):
+    return '-' if value is None else '{0:.2f}'.format(value)
@@ -0,0 +1,112 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Serial vs. vectorised EFT evaluation in `insertion_policy`.
+
+HEFT is run on the same random layered workflow in environments of
+increasing size, first with the serial machine search and then with the
+vectorised search (`heft(workflow, vectorised=True)`). Both must produce
+the same schedule; the speedup shows the environment size at which the
+vectorised search starts to pay off.
+
+Run from the repository root:
+
+    python -m benchmarks.vectorised_eft --tasks 300 --machines 16 64 256
+"""
+
+import argparse
+import json
+import time
+
+import networkx as nx
+import numpy as np
+
+from shadow.algorithms.heuristic import heft
+from shadow.models.environment import Environment
+from shadow.models.workflow import Workflow
+
+
+def layered_workflow(num_tasks, width=20, seed=20):
+    """
+    Workflow config (as a dictionary) of a random layered DAG
+    """
+    rng = np.random.default_rng(seed)
+    graph = nx.DiGraph()
+    for i in range(num_tasks):
+        graph.add_node(i, comp=int(rng.integers(1000, 100000)))
+        if i >= width:
+            layer_start = (i // width - 1) * width
+            for p in rng.choice(width, size=2, replace=False):
+                graph.add_edge(int(layer_start + p), i,
+                               transfer_data=int(rng.integers(0, 50)))
+    return {
+        'header': {'time': False},
+        'graph': nx.readwrite.node_link_data(graph)
+    }
+
+
+def environment(num_machines, seed=20):
+    rng = np.random.default_rng(seed)
+    resources = {
+        'cat{0}_m{1}'.format(i % 4, i): {
+            'flops': float(rng.integers(5000, 20000)),
+            'compute_bandwidth': 1.0
+        } for i in range(num_machines)
+    }
+    return {'system': {'resources': resources, 'system_bandwidth': 1.0}}
+
+
+def _time_heft(path, env_config, vectorised):
+    workflow = Workflow(path)
+    workflow.add_environment(Environment(env_config, dictionary=True))
+    start = time.perf_counter()
+    solution = heft(workflow, vectorised=vectorised)
+    elapsed = time.perf_counter() - start
+    return elapsed, sorted(
+        (task.tid, alloc.machine.id, alloc.ast)
+        for task, alloc in solution.task_allocations.items())
+
+
+def run(num_tasks, machines, path='vectorised_eft_workflow.json'):
+    with open(path, 'w') as outfile:
+        json.dump(layered_workflow(num_tasks), outfile)
+    results = []
+    for num_machines in machines:
+        env_config = environment(num_machines)
+        serial, serial_schedule = _time_heft(path, env_config, False)
+        vectorised, vectorised_schedule = _time_heft(path, env_config, True)
+        if serial_schedule != vectorised_schedule:
+            raise RuntimeError('Vectorised EFT search changed the schedule')
+        results.append({
+            'machines': num_machines,
+            'serial_s': round(serial, 4),
+            'vectorised_s': round(vectorised, 4),
+            'speedup': round(serial / vectorised, 2)
+        })
+    return {'tasks': num_tasks, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compare serial and vectorised EFT evaluation in HEFT')
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--machines', type=int, nargs='+',
+                        default=[16, 64, 256, 512, 1024])
+    parser.add_argument('--output', default='vectorised_eft_workflow.json',
+                        help='Where to write the generated workflow')
+    args = parser.parse_args()
+    print(json.dumps(
+        run(args.tasks, args.machines, args.output), indent=2))
@@ -1,4 +1,3 @@
-from queue import Queue
 from shadow.algorithms.heuristic import heft
 
 from shadow.models.workflow import Workflow, Task
@@ -15,15 +14,16 @@ DelayWorkflow.add_environment(env)
 print(heft(DelayWorkflow))
 
 
-def calc_task_delay(task, delay, workflow):
-    t = workflow.graph.tasks[task]
-    aft = t.aft
-    update_list = list(workflow.graph.successors(t))
-    # add 10 to the start and finish time of each of these successors, and their successors
-    update_queue = Queue()
-    update_queue.put(update_list)
-    print(update_queue)
-    return workflow
+def calc_task_delay(task, delay, workflow, solution):
+    """
+    Delay the finish of `task` by `delay`, and push the delay through its
+    successors (and later tasks on the same machines) in `solution`.
+    """
+    alloc = solution.task_allocations[task]
+    solution.reschedule(workflow, task, finish=alloc.aft + delay)
+    return solution
 
-task = HEFTWorkflow.tasks[0]
-calc_task_delay(task, 10, workflow=HEFTWorkflow)
+
+solution = heft(HEFTWorkflow)
+task = next(iter(HEFTWorkflow.tasks))
+print(calc_task_delay(task, 10, HEFTWorkflow, solution).makespan)
@@ -0,0 +1,241 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Schedule many (workflow, environment) pairs in parallel.
+
+A BatchScheduler keeps a pool of worker processes alive between calls.
+Each workflow is compiled once in the parent process (see
+shadow.models.compiled) and its arrays are copied into a single
+`multiprocessing.shared_memory` block; workers map the block instead of
+unpickling a networkx graph. Workers return a ScheduleResult, which holds
+the makespan, cost and allocation arrays of the schedule rather than a
+Solution.
+
+    with BatchScheduler(processes=4) as scheduler:
+        results = scheduler.schedule_many(workflows, environment, 'heft')
+"""
+
+import atexit
+import logging
+from multiprocessing import Pool, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from shadow.algorithms.heuristic import (
+    compiled_heft, compiled_pheft, compiled_fcfs
+)
+from shadow.models.compiled import CompiledWorkflow, ScheduleResult
+from shadow.models.loader import stream_workflow
+from shadow.models.workflow import Workflow
+
+LOGGER = logging.getLogger(__name__)
+
+ALGORITHMS = {
+    'heft': compiled_heft,
+    'pheft': compiled_pheft,
+    'fcfs': compiled_fcfs
+}
+
+# Arrays of a CompiledWorkflow that are shared with the workers; the
+# predecessor arrays are rebuilt from these.
+_SHARED_ARRAYS = ['comp', 'task_data', 'succ_ptr', 'succ_idx',
+                  'transfer_data']
+_ALIGNMENT = 64
+
+
+def _share_arrays(compiled):
+    """
+    Copy the arrays of a CompiledWorkflow into one shared memory block.
+
+    :return: (shm, spec), where `spec` is the picklable description of the
+        block that is sent to workers
+    """
+    layout = {}
+    size = 0
+    for name in _SHARED_ARRAYS:
+        array = np.ascontiguousarray(getattr(compiled, name))
+        if array.dtype == object:
+            raise TypeError(
+                "Workflow array '{0}' cannot be placed in shared "
+                "memory".format(name))
+        size = -(-size // _ALIGNMENT) * _ALIGNMENT
+        layout[name] = (size, array.shape, array.dtype.str)
+        size += array.nbytes
+    shm = SharedMemory(create=True, size=max(size, 1))
+    for name in _SHARED_ARRAYS:
+        offset, shape, dtype = layout[name]
+        view = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        view[...] = getattr(compiled, name)
+    spec = {
+        'name': shm.name,
+        'layout': layout,
+        'time': compiled.time,
+        'num_tasks': compiled.num_tasks
+    }
+    return shm, spec
+
+
+def _attach(name):
+    try:
+        return SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers the block with the resource tracker again.
+        # Workers share the parent's tracker, which already holds the name,
+        # so the block is still only unlinked once (by the parent).
+        return SharedMemory(name=name)
+
+
+def _run(spec, environment, algorithm):
+    """
+    Worker: schedule the shared workflow described by `spec`
+    """
+    shm = _attach(spec['name'])
+    try:
+        arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf,
+                             offset=offset)
+            for name, (offset, shape, dtype) in spec['layout'].items()
+        }
+        workflow = CompiledWorkflow(
+            list(range(spec['num_tasks'])), time=spec['time'], **arrays
+        )
+        workflow.add_environment(environment)
+        if not callable(algorithm):
+            algorithm = ALGORITHMS[algorithm]
+        solution = algorithm(workflow)
+        costs = np.array([m.cost for m in environment.machines], dtype=float)
+        machine = np.asarray(solution.machine)
+        cost = float(
+            (costs[machine] * (solution.aft - solution.ast)).sum()
+        )
+        result = ScheduleResult(
+            solution.makespan, cost, machine.copy(),
+            np.array(solution.ast), np.array(solution.aft),
+            np.array(solution.order)
+        )
+        del workflow, arrays, solution
+    finally:
+        shm.close()
+    return result
+
+
+def _compile(workflow):
+    if isinstance(workflow, CompiledWorkflow):
+        return workflow
+    if isinstance(workflow, Workflow):
+        return CompiledWorkflow.from_workflow(workflow)
+    # Otherwise, a path to a workflow file
+    return stream_workflow(workflow)
+
+
+class BatchScheduler(object):
+    """
+    Persistent pool of worker processes for scheduling many workflows.
+
+    :param processes: Number of worker processes (defaults to the number of
+        CPUs)
+    """
+
+    def __init__(self, processes=None):
+        self.processes = processes
+        # Start the resource tracker before the workers, so they share it
+        # with this process (see _attach)
+        resource_tracker.ensure_running()
+        self._pool = Pool(processes=processes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def schedule_many(self, workflows, environments, algorithm='heft'):
+        """
+        Schedule each workflow on its environment.
+
+        Parameters
+        ----------
+        workflows : list
+            Workflow or CompiledWorkflow objects, or paths to workflow
+            files. The same workflow may appear more than once; it is only
+            compiled and shared once.
+        environments : Environment or list
+            One Environment per workflow, or a single Environment used for
+            all of them
+        algorithm : str or callable
+            'heft', 'pheft' or 'fcfs', or a (picklable) function that
+            takes a CompiledWorkflow and returns a CompiledSolution
+
+        Returns
+        -------
+        List of ScheduleResult, in the order of `workflows`
+        """
+        if self._pool is None:
+            raise RuntimeError("BatchScheduler has been closed")
+        if not isinstance(environments, (list, tuple)):
+            environments = [environments] * len(workflows)
+        if len(environments) != len(workflows):
+            raise ValueError(
+                "Number of environments ({0}) does not match the number of "
+                "workflows ({1})".format(len(environments), len(workflows))
+            )
+        if not callable(algorithm) and algorithm not in ALGORITHMS:
+            raise ValueError("Unknown algorithm '{0}'".format(algorithm))
+
+        blocks = {}
+        params = []
+        try:
+            for workflow, environment in zip(workflows, environments):
+                key = id(workflow)
+                if key not in blocks:
+                    blocks[key] = _share_arrays(_compile(workflow))
+                params.append((blocks[key][1], environment, algorithm))
+            return self._pool.starmap(_run, params)
+        finally:
+            for shm, _ in blocks.values():
+                shm.close()
+                shm.unlink()
+
+
+_DEFAULT_SCHEDULER = None
+
+
+def _close_default():
+    if _DEFAULT_SCHEDULER is not None:
+        _DEFAULT_SCHEDULER.close()
+
+
+def schedule_many(workflows, environments, algorithm='heft', processes=None):
+    """
+    Schedule many workflows in parallel, using a BatchScheduler that is
+    created on the first call and kept warm for later calls.
+
+    See BatchScheduler.schedule_many for the parameters; `processes` is
+    only used when the pool is first created.
+    """
+    global _DEFAULT_SCHEDULER
+    if _DEFAULT_SCHEDULER is None:
+        _DEFAULT_SCHEDULER = BatchScheduler(processes)
+        atexit.register(_close_default)
+    return _DEFAULT_SCHEDULER.schedule_many(workflows, environments,
+                                            algorithm)
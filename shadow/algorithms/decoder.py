@@ -0,0 +1,150 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Decode a (machine, priority) assignment of a CompiledWorkflow into a
+schedule, without building a Solution.
+
+Search-based schedulers (see shadow.algorithms.metaheuristic) describe a
+schedule by two arrays over the task indices: the machine each task runs
+on, and a priority for each task. Tasks are allocated in order of
+priority (lowest first), where the priority of each task is first raised
+to the largest priority of its predecessors, and ties are broken by
+topological position, so that no task is allocated before its
+predecessors. Each task is appended to its machine's timeline, and starts
+once the machine is free and the data from every predecessor has arrived.
+
+    decoder = ScheduleDecoder(compiled)
+    result = decoder.decode(machine, priority)
+    result.makespan, result.cost
+    solution = result.to_solution(compiled)
+
+Decoding takes O(V + E) time, plus a sort of the V priorities.
+"""
+
+import numpy as np
+
+from shadow.models.compiled import ScheduleResult, csr_positions
+
+
+def topological_levels(workflow):
+    """
+    Task indices of a CompiledWorkflow grouped into levels, where every
+    predecessor of a task is in an earlier level. Tasks in each level are
+    in index order.
+
+    :return: List of numpy.ndarray
+    """
+    remaining = np.diff(workflow.pred_ptr)
+    level = np.flatnonzero(remaining == 0)
+    levels = []
+    while len(level):
+        levels.append(level)
+        succ = workflow.succ_idx[csr_positions(workflow.succ_ptr, level)]
+        np.subtract.at(remaining, succ, 1)
+        level = np.unique(succ[remaining[succ] == 0])
+    if sum(len(level) for level in levels) != workflow.num_tasks:
+        raise RuntimeError("Workflow graph contains a cycle")
+    return levels
+
+
+class ScheduleDecoder(object):
+    """
+    Decoder of (machine, priority) assignments for one CompiledWorkflow.
+    The workflow's arrays are converted once, so each call to `decode`
+    only walks the tasks and edges.
+
+    :param workflow: CompiledWorkflow with an environment added
+    """
+
+    def __init__(self, workflow):
+        if workflow.env is None:
+            raise RuntimeError("Workflow environment is not initialised")
+        self.workflow = workflow
+        self.num_tasks = workflow.num_tasks
+        self.costs = [m.cost for m in workflow.env.machines]
+        self.runtimes = workflow.runtimes.tolist()
+        self.comm = workflow.comm.tolist()
+        self.pred_ptr = workflow.pred_ptr.tolist()
+        self.pred_idx = workflow.pred_idx.tolist()
+        self.pred_edge = workflow.pred_edge.tolist()
+        levels = topological_levels(workflow)
+        self.topological = np.concatenate(levels).tolist() if levels else []
+        self.position = np.empty(self.num_tasks, dtype=np.int64)
+        self.position[self.topological] = np.arange(self.num_tasks)
+
+    def order(self, priority):
+        """
+        Allocation order of the tasks for the given priorities
+        """
+        pred_ptr, pred_idx = self.pred_ptr, self.pred_idx
+        raised = list(priority)
+        for i in self.topological:
+            for p in pred_idx[pred_ptr[i]:pred_ptr[i + 1]]:
+                if raised[p] > raised[i]:
+                    raised[i] = raised[p]
+        return np.lexsort((self.position, raised))
+
+    def decode(self, machine, priority):
+        """
+        Decode an assignment.
+
+        :param machine: Machine index of each task
+        :param priority: Priority of each task (lower is allocated first)
+        :return: ScheduleResult
+        """
+        if len(machine) != self.num_tasks or len(priority) != self.num_tasks:
+            raise ValueError(
+                "Expected a machine and priority for each of the {0} "
+                "tasks".format(self.num_tasks))
+        order = self.order(priority)
+        machine = np.asarray(machine, dtype=np.int64)
+        assigned = machine.tolist()
+        runtimes, comm, costs = self.runtimes, self.comm, self.costs
+        pred_ptr, pred_idx, pred_edge = (
+            self.pred_ptr, self.pred_idx, self.pred_edge)
+        ast = [0] * self.num_tasks
+        aft = [0] * self.num_tasks
+        available = [0] * len(costs)
+        cost = 0
+        for i in order.tolist():
+            m = assigned[i]
+            start = available[m]
+            for k in range(pred_ptr[i], pred_ptr[i + 1]):
+                p = pred_idx[k]
+                arrival = aft[p]
+                if assigned[p] != m:
+                    arrival += comm[pred_edge[k]]
+                if arrival > start:
+                    start = arrival
+            runtime = runtimes[i][m]
+            ast[i] = start
+            aft[i] = available[m] = start + runtime
+            cost += costs[m] * runtime
+        return ScheduleResult(
+            max(aft, default=0), cost, machine, np.array(ast),
+            np.array(aft), order
+        )
+
+
+def decode(workflow, machine, priority):
+    """
+    Decode a (machine, priority) assignment of a CompiledWorkflow; see
+    ScheduleDecoder. Create a ScheduleDecoder to decode many assignments
+    of the same workflow.
+
+    :return: ScheduleResult
+    """
+    return ScheduleDecoder(workflow).decode(machine, priority)
@@ -0,0 +1,475 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Dynamic (ready-list) scheduling of a CompiledWorkflow.
+
+Unlike the static list schedulers in shadow.algorithms.heuristic, which rank
+every task up front, these schedulers keep the tasks that are ready (every
+predecessor placed) in priority heaps, and repeatedly place the best one.
+Tasks are appended to the end of a machine's timeline; there is no
+insertion into idle gaps. The priority functions are:
+
+* StaticLevel ('static_level'): Highest Level First with Estimated Times
+  (HLFET). The priority of a task is its static level, the longest path
+  (of average runtimes) from the task to an exit task. The task is placed
+  on the machine where it finishes earliest.
+* DynamicLevel ('dynamic_level'): Dynamic Level Scheduling (DLS, Sih and
+  Lee 1993). The (task, machine) pair with the largest dynamic level is
+  placed: the static level of the task, minus the time it can start on
+  the machine, plus the difference between its average runtime and its
+  runtime on the machine.
+* EarliestTimeFirst ('etf'): Earliest Time First (Hwang et al. 1989). The
+  (task, machine) pair that can start earliest is placed, with ties broken
+  by static level.
+
+Machine availability is kept in one heap per machine class (see
+Environment.collapse_machines; without classes, each machine is a class of
+its own). A task can start on a machine at max(available, ready), where
+`ready` is the time its input data arrives; this is the same on every
+machine that holds none of its predecessors. So a ready task only needs to
+be considered on the earliest available machine of each class, and on the
+machines that hold its predecessors.
+
+Dynamic priorities change as machines become busy. For each of these
+candidate machines (or classes), ready tasks are split into those still
+waiting for data (whose priority is fixed) and those waiting for the
+machine (whose relative order is fixed); a task moves from the first group
+to the second once the machine's available time passes its ready time.
+The best candidate of each machine is kept in a global heap that is
+updated lazily. A schedule therefore costs O((V * C + E) log V) time for C
+machine classes, which is O((V + E) log V) for a fixed environment.
+"""
+
+import heapq
+
+import numpy as np
+
+from shadow.models.compiled import CompiledWorkflow, CompiledSolution
+
+
+def static_levels(workflow):
+    """
+    Static level of each task in a CompiledWorkflow: its average runtime
+    plus the largest static level of its successors (communication costs
+    are not included).
+
+    :return: numpy.ndarray, indexed by task index
+    """
+    ave = workflow.ave_runtimes.tolist()
+    succ_ptr = workflow.succ_ptr.tolist()
+    succ_idx = workflow.succ_idx.tolist()
+    levels = [0.0] * workflow.num_tasks
+    for i in workflow.topological_order()[::-1].tolist():
+        start, end = succ_ptr[i], succ_ptr[i + 1]
+        longest = max((levels[s] for s in succ_idx[start:end]), default=0)
+        levels[i] = ave[i] + longest
+    return np.array(levels, dtype=float)
+
+
+class Priority(object):
+    """
+    Priority function of a ready-list schedule. Lower keys are placed first.
+
+    A static priority implements `key(state, i)`, which must not change as
+    other tasks are placed; each task is placed on the machine where it
+    finishes earliest.
+
+    A dynamic priority (`dynamic = True`) ranks (task, machine) pairs, and
+    implements:
+
+    * `key(state, i, m, start)`: the key of placing task `i` on machine `m`
+      at `start`. This must not decrease as `start` increases.
+    * `order(state, i, m)`: the order of the tasks that would start on `m`
+      as soon as it is available; if `order(i, m) < order(j, m)`, then
+      `key(i, m, t) <= key(j, m, t)` for every start time `t`.
+
+    `state` is the _ReadyListState of the schedule; `state.levels`,
+    `state.ave` and `state.runtimes` hold the static levels, average
+    runtimes and (task x machine) runtimes as lists.
+    """
+
+    dynamic = False
+
+    def key(self, state, i, *args):
+        raise NotImplementedError
+
+
+class StaticLevel(Priority):
+    """
+    HLFET: the task with the highest static level first
+    """
+
+    def key(self, state, i):
+        return -state.levels[i]
+
+
+class DynamicLevel(Priority):
+    """
+    DLS: the (task, machine) pair with the highest dynamic level first
+    """
+
+    dynamic = True
+
+    def key(self, state, i, m, start):
+        return start + self.order(state, i, m)
+
+    def order(self, state, i, m):
+        return state.runtimes[i][m] - state.ave[i] - state.levels[i]
+
+
+class EarliestTimeFirst(Priority):
+    """
+    ETF: the (task, machine) pair that starts earliest first, with ties
+    broken by static level
+    """
+
+    dynamic = True
+
+    def key(self, state, i, m, start):
+        return start, -state.levels[i]
+
+    def order(self, state, i, m):
+        return -state.levels[i]
+
+
+PRIORITIES = {
+    'static_level': StaticLevel(),
+    'dynamic_level': DynamicLevel(),
+    'etf': EarliestTimeFirst()
+}
+
+
+class _Candidates(object):
+    """
+    Ready tasks that could be placed on one machine, or on the earliest
+    available machine of a class.
+    """
+
+    __slots__ = ('waiting', 'data_bound', 'machine_bound', 'moved')
+
+    def __init__(self):
+        # (ready time, i): tasks whose data arrives after the machine is
+        # available
+        self.waiting = []
+        # (key, i): the same tasks, by their (fixed) key
+        self.data_bound = []
+        # (order, i): tasks that will start when the machine is available
+        self.machine_bound = []
+        self.moved = set()
+
+
+class _ReadyListState(object):
+    """
+    Mutable state of a ready-list schedule
+    """
+
+    def __init__(self, workflow):
+        self.workflow = workflow
+        self.runtimes = workflow.runtimes.tolist()
+        self.ave = workflow.ave_runtimes.tolist()
+        self.levels = static_levels(workflow).tolist()
+        self.comm = workflow.comm.tolist()
+        num_tasks, num_machines = workflow.runtimes.shape
+        self.machine = [-1] * num_tasks
+        self.aft = [0] * num_tasks
+        self.available = [0] * num_machines
+        classes = workflow.env.machine_classes
+        if classes:
+            groups = [c.indices.tolist() for c in classes]
+        else:
+            groups = [[m] for m in range(num_machines)]
+        # One heap of (available time, machine index) per machine class
+        self.heaps = [[(0, m) for m in group] for group in groups]
+        # Data-ready time of each ready task on the machines that hold none
+        # of its predecessors, and on those that do
+        self.remote = {}
+        self.local = {}
+
+    def task_ready(self, i):
+        workflow = self.workflow
+        start, end = workflow.pred_ptr[i], workflow.pred_ptr[i + 1]
+        inputs = [
+            (self.machine[p], self.aft[p], self.comm[e])
+            for p, e in zip(workflow.pred_idx[start:end].tolist(),
+                            workflow.pred_edge[start:end].tolist())
+        ]
+        self.remote[i] = max([0] + [aft + c for _, aft, c in inputs])
+        local = {}
+        for m, _, _ in inputs:
+            if m not in local:
+                local[m] = max([0] + [
+                    aft if pm == m else aft + c for pm, aft, c in inputs
+                ])
+        self.local[i] = local
+
+    def earliest_machine(self, c):
+        """
+        The earliest available machine in class `c`
+        """
+        heap = self.heaps[c]
+        while True:
+            available, m = heap[0]
+            if available == self.available[m]:
+                return m
+            heapq.heapreplace(heap, (self.available[m], m))
+
+    def ready_time(self, i, m):
+        return self.local[i].get(m, self.remote[i])
+
+    def candidates(self, i):
+        """
+        (machine, start time) pairs considered for task `i`
+        """
+        machines = set(self.local[i])
+        machines.update(self.earliest_machine(c)
+                        for c in range(len(self.heaps)))
+        return [(m, max(self.available[m], self.ready_time(i, m)))
+                for m in sorted(machines)]
+
+    def place(self, i, m, start):
+        finish = start + self.runtimes[i][m]
+        self.machine[i] = m
+        self.aft[i] = finish
+        self.available[m] = finish
+        del self.remote[i], self.local[i]
+        return finish
+
+
+class _DynamicQueue(object):
+    """
+    Ready (task, machine) pairs of a dynamic priority.
+
+    Candidates 0..C-1 are the machine classes (the task starts on the
+    earliest available machine of the class once its remote data has
+    arrived), and candidate C + m is machine m for the tasks that have a
+    predecessor on m.
+    """
+
+    def __init__(self, state, priority):
+        self.state = state
+        self.priority = priority
+        self.num_classes = len(state.heaps)
+        self.class_of = [0] * len(state.available)
+        for c, heap in enumerate(state.heaps):
+            for _, m in heap:
+                self.class_of[m] = c
+        self.candidates = [
+            _Candidates()
+            for _ in range(self.num_classes + len(state.available))
+        ]
+        # (key, i, machine, candidate, version); only the latest version
+        # of each candidate's entry is used, and its key may be stale
+        self.best = []
+        self.version = [0] * len(self.candidates)
+
+    def _machine(self, r):
+        if r < self.num_classes:
+            return self.state.earliest_machine(r)
+        return r - self.num_classes
+
+    def _best(self, r):
+        """
+        The best (key, i, machine) of candidate `r`, or None
+        """
+        state, priority = self.state, self.priority
+        cand = self.candidates[r]
+        m = self._machine(r)
+        available = state.available[m]
+        waiting, machine_bound = cand.waiting, cand.machine_bound
+        while waiting and waiting[0][0] <= available:
+            _, i = heapq.heappop(waiting)
+            if state.machine[i] < 0:
+                heapq.heappush(machine_bound,
+                               (priority.order(state, i, m), i))
+                cand.moved.add(i)
+        data_bound = cand.data_bound
+        while data_bound and (state.machine[data_bound[0][1]] >= 0
+                              or data_bound[0][1] in cand.moved):
+            cand.moved.discard(heapq.heappop(data_bound)[1])
+        while machine_bound and state.machine[machine_bound[0][1]] >= 0:
+            heapq.heappop(machine_bound)
+        best = None
+        if data_bound:
+            key, i = data_bound[0]
+            best = (key, i, m)
+        if machine_bound:
+            i = machine_bound[0][1]
+            key = priority.key(state, i, m, available)
+            if best is None or (key, i, m) < best:
+                best = (key, i, m)
+        return best
+
+    def _push_best(self, r):
+        self.version[r] += 1
+        best = self._best(r)
+        if best is not None:
+            heapq.heappush(self.best, best + (r, self.version[r]))
+
+    def add(self, i):
+        """
+        Add ready task `i`
+        """
+        state, priority = self.state, self.priority
+        entries = [(c, state.remote[i]) for c in range(self.num_classes)]
+        entries.extend((self.num_classes + m, ready)
+                       for m, ready in state.local[i].items())
+        for r, ready in entries:
+            cand = self.candidates[r]
+            m = self._machine(r)
+            if ready <= state.available[m]:
+                heapq.heappush(cand.machine_bound,
+                               (priority.order(state, i, m), i))
+            else:
+                heapq.heappush(cand.waiting, (ready, i))
+                heapq.heappush(cand.data_bound,
+                               (priority.key(state, i, m, ready), i))
+            self._push_best(r)
+
+    def pop(self):
+        """
+        Remove and return the best (i, machine, start)
+        """
+        state = self.state
+        while self.best:
+            entry = heapq.heappop(self.best)
+            r = entry[3]
+            if entry[4] != self.version[r]:
+                continue
+            current = self._best(r)
+            if current != entry[:3]:
+                if current is not None:
+                    self.version[r] += 1
+                    heapq.heappush(self.best,
+                                   current + (r, self.version[r]))
+                continue
+            _, i, m = current
+            return i, m, max(state.available[m], state.ready_time(i, m))
+        raise IndexError("No ready tasks")
+
+    def placed(self, i, m):
+        """
+        Update the candidates after task `i` was placed on machine `m`
+        """
+        # Keys only get worse, so stale entries in `best` are re-evaluated
+        # when they reach the top. Only the candidates for `m` (which have
+        # moved on to another machine of the class) need a fresh entry.
+        self._push_best(self.class_of[m])
+        self._push_best(self.num_classes + m)
+
+
+def ready_list_schedule(workflow, priority='static_level'):
+    """
+    Schedule a CompiledWorkflow with a dynamic ready-list policy.
+
+    :param workflow: CompiledWorkflow with an environment added
+    :param priority: 'static_level', 'dynamic_level' or 'etf', or a
+        Priority object
+    :return: CompiledSolution
+    """
+    if workflow.env is None:
+        raise RuntimeError("Workflow environment is not initialised")
+    if isinstance(priority, str):
+        if priority not in PRIORITIES:
+            raise ValueError("Unknown priority '{0}'".format(priority))
+        priority = PRIORITIES[priority]
+
+    state = _ReadyListState(workflow)
+    num_tasks = workflow.num_tasks
+    succ_ptr = workflow.succ_ptr.tolist()
+    succ_idx = workflow.succ_idx.tolist()
+    waiting = np.diff(workflow.pred_ptr).tolist()
+    ast = [0] * num_tasks
+    order = []
+
+    if priority.dynamic:
+        queue = _DynamicQueue(state, priority)
+    else:
+        queue = []
+
+    def add(i):
+        state.task_ready(i)
+        if priority.dynamic:
+            queue.add(i)
+        else:
+            heapq.heappush(queue, (priority.key(state, i), i))
+
+    for i in range(num_tasks):
+        if waiting[i] == 0:
+            add(i)
+
+    while len(order) < num_tasks:
+        if priority.dynamic:
+            if not queue.best:
+                break
+            i, m, start = queue.pop()
+        else:
+            if not queue:
+                break
+            _, i = heapq.heappop(queue)
+            _, m, start = min(
+                (start + state.runtimes[i][m], m, start)
+                for m, start in state.candidates(i)
+            )
+        state.place(i, m, start)
+        ast[i] = start
+        order.append(i)
+        if priority.dynamic:
+            queue.placed(i, m)
+        for s in succ_idx[succ_ptr[i]:succ_ptr[i + 1]]:
+            waiting[s] -= 1
+            if waiting[s] == 0:
+                add(s)
+
+    if len(order) != num_tasks:
+        raise RuntimeError("Workflow graph contains a cycle")
+    aft = np.array(state.aft)
+    return CompiledSolution(
+        workflow, np.array(state.machine, dtype=np.int64), np.array(ast),
+        aft, np.array(order, dtype=np.int64),
+        aft.max() if num_tasks else 0
+    )
+
+
+def _schedule(workflow, priority):
+    """
+    Schedule a Workflow or CompiledWorkflow; a Workflow gets a Solution
+    """
+    if workflow.env is None:
+        raise RuntimeError("Workflow environment is not initialised")
+    if isinstance(workflow, CompiledWorkflow):
+        return ready_list_schedule(workflow, priority)
+    return ready_list_schedule(workflow.compile(), priority).to_solution()
+
+
+def hlfet(workflow):
+    """
+    Highest Level First with Estimated Times (static level priority)
+    """
+    return _schedule(workflow, 'static_level')
+
+
+def dls(workflow):
+    """
+    Dynamic Level Scheduling (Sih and Lee 1993)
+    """
+    return _schedule(workflow, 'dynamic_level')
+
+
+def etf(workflow):
+    """
+    Earliest Time First (Hwang et al. 1989)
+    """
+    return _schedule(workflow, 'etf')
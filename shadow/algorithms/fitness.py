@@ -37,6 +37,33 @@ def calculate_fitness(objectives, solution):
     return fitness
 
 
+def population_fitness(objectives, costs, machine, ast, aft):
+    """
+    Calculate the fitness of a population of schedules with array
+    operations, rather than one Solution at a time.
+
+    :param objectives: List of objectives ('time' or 'cost')
+    :param costs: Cost per second of each machine
+    :param machine: (individuals x tasks) array of machine indices
+    :param ast: (individuals x tasks) array of start times
+    :param aft: (individuals x tasks) array of finish times
+    :return: Dictionary of (individuals,) arrays, keyed by objective
+    """
+    fitness = {}
+    for objective in objectives:
+        if objective == 'time':
+            fitness['time'] = aft.max(axis=1, initial=0)
+        elif objective == 'cost':
+            fitness['cost'] = (costs[machine] * (aft - ast)).sum(axis=1)
+        else:
+            raise NotImplementedError(
+                "Objective function {0} has not been implemented".format(
+                    objective
+                )
+            )
+    return fitness
+
+
 def cost_fitness(solution):
     """
     Calculate the cost of the solution based on the environment
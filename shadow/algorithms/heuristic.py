@@ -24,12 +24,21 @@ algorithms. Currently, this file implements the following algorithms:
 """
 from random import randint
 import networkx as nx
+import numpy as np
 import operator
 import copy
+import heapq
 import logging
 from tqdm import tqdm
 from shadow.models.solution import Solution
-from collections import deque
+from shadow.models.compiled import (
+    CompiledWorkflow, CompiledSolution, calc_minimum_runtime, csr_positions
+)
+from shadow.models.intervals import FreeSlotIndex, CountingSlotIndex
+from shadow.models.globals import WORKFLOW_EDGE
+from shadow.algorithms import dynamic
+from shadow.algorithms.stats import phase
+from collections.abc import Mapping
 
 RANDMAX = 1000
 
@@ -41,56 +50,71 @@ LOGGER = logging.getLogger(__name__)
 ############################# HUERISTICS  ###################################
 #############################################################################
 
-def heft(workflow, position=0):
+def heft(workflow, position=0, vectorised=False, stats=None):
     """
     Implementation of the original HEFT algorithm, Topcuolgu 2002.
 
-    :params workflow: The workflow object to schedule
-    :returns: The Solution object generated by the algorithm
+    :params workflow: The workflow object to schedule. If this is a
+        CompiledWorkflow, the array-based implementation is used.
+    :params vectorised: Evaluate the EFT of each task on every machine at
+        once, with array operations (see `insertion_policy`)
+    :params stats: Optional shadow.algorithms.stats.SchedulerStats in which
+        to record phase timings and counters; it is also attached to the
+        solution as `solution.stats`
+    :returns: The Solution object generated by the algorithm (or a
+        CompiledSolution, if `workflow` is a CompiledWorkflow)
     """
 
     if workflow.env is None:
         raise RuntimeError("Workflow environment is not initialised")
+    if isinstance(workflow, CompiledWorkflow):
+        return compiled_heft(workflow, stats)
     LOGGER.info('Ranking tasks')
-    task_ranks = calculate_upward_ranks(workflow, position, progress=False)
-    for task in workflow.tasks:
-        task.rank = task_ranks[task]
+    with phase(stats, 'ranking'):
+        task_ranks = calculate_upward_ranks(workflow, position,
+                                            progress=False)
+        for task in workflow.tasks:
+            task.rank = task_ranks[task]
     LOGGER.info('Allocating tasks using insertion policy')
-    solution = insertion_policy(workflow, position, progress=False)
+    solution = insertion_policy(workflow, position, progress=False,
+                                vectorised=vectorised, stats=stats)
     return solution
 
 
-def pheft(workflow):
+def pheft(workflow, stats=None):
     """
     Implementation of the PHEFT algorithm, which adaptst the HEFT algorithm
     using the concpet of an Optimistic Cost Table (OCT)
-    """
-    oct_rank_matrix = generate_ranking_matrix(workflow)
-    # Rank tasks according to the oct_rank_matrix
-    for task in workflow.tasks:
-        total = 0
-        for (t, p) in oct_rank_matrix:
-            if t is task:
-                total += oct_rank_matrix[(t, p)]
 
-        rank = int(total / len(workflow.env.machines))
-        task.rank = rank
+    :params stats: Optional SchedulerStats (see `heft`)
+    """
+    if isinstance(workflow, CompiledWorkflow):
+        return compiled_pheft(workflow, stats)
+    with phase(stats, 'ranking'):
+        oct_rank_matrix = generate_ranking_matrix(workflow)
+        # Rank tasks according to the oct_rank_matrix
+        for task, rank in zip(workflow.tasks,
+                              oct_rank_matrix.ranks().tolist()):
+            task.rank = rank
 
-    solution = insertion_policy_oct(workflow, oct_rank_matrix)
+    solution = insertion_policy_oct(workflow, oct_rank_matrix, stats)
     return solution
 
 
-def fcfs(workflow, greedy=True, seed=None):
+def fcfs(workflow, greedy=True, seed=None, stats=None):
     """
     Implementation of First Come First Serve Algorithm
     :param workflow:
     :param greedy:
     :param seed:
+    :param stats: Optional SchedulerStats (see `heft`)
     :return:
     """
     if workflow.env is None:
         raise RuntimeError("Workflow environment is not initialised")
-    solution = fcfs_allocation(workflow, greedy, seed)
+    if isinstance(workflow, CompiledWorkflow):
+        return compiled_fcfs(workflow, stats)
+    solution = fcfs_allocation(workflow, greedy, seed, stats)
     return solution
 
 
@@ -116,7 +140,14 @@ def minimin(workflow):
 
 
 def hlfet(workflow):
-    pass
+    """
+    Highest Level First with Estimated Times; see shadow.algorithms.dynamic
+
+    :params workflow: Workflow or CompiledWorkflow to schedule
+    :returns: Solution (or CompiledSolution, if `workflow` is a
+        CompiledWorkflow)
+    """
+    return dynamic.hlfet(workflow)
 
 
 def mapping(workflow):
@@ -137,119 +168,107 @@ def mols(workflow):
 ############### HELPER FUNCTIONS & HEURISTIC-SPECIFIC POLICIES ##############
 #############################################################################
 
+class OptimisticCostTable(Mapping):
+    """
+    Optimistic Cost Table (OCT) of a workflow, stored as a (tasks x
+    machines) array. Rows follow the task indices of the workflow, and
+    columns the machine indices of its environment.
+
+    The table may be indexed by (task, machine) pairs, and iterating over it
+    yields these pairs (task-major), as with a dictionary.
+    """
+
+    def __init__(self, tasks, machines, table):
+        self.tasks = tasks
+        self.machines = machines
+        self.table = table
+
+    def __getitem__(self, key):
+        task, machine = key
+        try:
+            return self.table[task.index, machine.index]
+        except AttributeError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for task in self.tasks:
+            for machine in self.machines:
+                yield task, machine
+
+    def __len__(self):
+        return self.table.size
+
+    def ranks(self):
+        """
+        OCT rank of each task (the mean of its row, truncated to an int),
+        indexed by task index
+        """
+        return self.table.mean(axis=1).astype(np.int64)
+
+
 def generate_ranking_matrix(workflow):
     """
     Optimistic cost table ranking heuristic outlined in
     Arabnejad and Barbos (2014)
-    """
-    oct_rank_matrix = {}
-    stack = deque()
-    for task in sorted(list(workflow.tasks)):
-        for machine in workflow.env.machines:
-            if (task, machine) not in oct_rank_matrix.keys():
-                stack.append((task, machine))
-
-    while len(stack) > 0:
-        (curr_task, pk) = stack.pop()
-        max_successor = 0
-        for successor in workflow.graph.successors(curr_task):
-            min_machine = 1000
-            for machine in workflow.env.machines:
-                comp_cost = successor.calculated_runtime(machine)
-                comm_cost = 0
-                if machine is not pk:
-                    comm_cost = ave_comm_cost(workflow, curr_task, successor)
-                oct_val = oct_rank_matrix[
-                              (successor, machine)] + comp_cost + comm_cost
-                min_machine = min(min_machine, oct_val)
 
-            max_successor = max(max_successor, min_machine)
-        oct_rank_matrix[(curr_task, pk)] = max_successor
+    The table is filled in reverse topological order, one task (row) at a
+    time, with the minimum over the machines of each successor calculated
+    as a single array operation (see `compiled_oct`).
 
-    return oct_rank_matrix
+    :param workflow: Workflow with an environment added
+    :return: OptimisticCostTable
+    """
+    compiled = CompiledWorkflow.from_workflow(workflow)
+    return OptimisticCostTable(
+        compiled.tasks, workflow.env.machines, compiled_oct(compiled)
+    )
 
 
-def calculate_upward_ranks(workflow, position=0, progress=True):
+def calculate_upward_ranks(workflow, position=0, progress=True,
+                           vectorised=False):
     """
     Upward ranking heuristic outlined in Topcuoglu, Hariri & Wu (2002)
     Closely modelled off 'cal_up_rank' function at:
     https://github.com/oyld/heft/blob/master/src/heft.py
 
-    Ranks individual tasks and then allocates this final value
-    to the attribute of the workflow graph
+    Tasks are ranked in reverse topological order, so every task is visited
+    once, after all of its successors (O(V+E)). The average runtimes and
+    communication costs are read from the compiled form of the workflow.
 
     :param workflow - Subject workflow
-    :param task -  A task task in an DAG that is being ranked
+    :param progress - Display a progress bar
+    :param vectorised - Rank all tasks of the same level (distance from an
+        exit task) at once, with array operations (see
+        `compiled_upward_ranks`)
+    :return: Dictionary of task ranks, keyed by task
     """
-
-    # task = list(workflow.graph.nodes)
-    # if len(list(workflow.graph.sucessors(task))) == 0:
-    #     return ave_comm_cost( wf, task, successor)
-
-    task_ranks = {}
-    unranked = [node for node in workflow.graph.nodes()]
-
-    for node in workflow.graph.nodes():
-        longest_rank = 0
-        if len(list(workflow.graph.successors(node))) == 0:
-            task_ranks[node] = max(
-                node.calc_ave_runtime(workflow.env) + longest_rank, 0)
-            unranked.remove(node)
-
-    _ranked_node_count = 1
-    _total_nodes = len(workflow.graph.nodes())
+    compiled = CompiledWorkflow.from_workflow(workflow)
     pbar = None
     if progress:
-        pbar = tqdm(total=_total_nodes, unit="Tasks", desc=f'Ranking tasks '
-                                                           f'{position}',
-                    position=position)
-    while unranked:
-        for node in unranked:
-            _ranked_node_count += 1
-            longest_rank = -1
-            succs = list(workflow.graph.successors(node))
-            if all(k in task_ranks for k in succs):
-                for s in succs:
-                    if longest_rank < 0:
-                        longest_rank = ave_comm_cost(workflow, node, s) + \
-                                       task_ranks[s]
-                    else:
-                        longest_rank = max(longest_rank,
-                                           ave_comm_cost(workflow, node, s) +
-                                           task_ranks[s])
-
-            if not longest_rank < 0:
-                task_ranks[node] = longest_rank + max(
-                    node.calc_ave_runtime(workflow.env), 1)
-                unranked.remove(node)
-                if progress:
-                    pbar.update()
+        pbar = tqdm(total=compiled.num_tasks, unit="Tasks",
+                    desc=f'Ranking tasks {position}', position=position)
+    ranks = compiled_upward_ranks(compiled, vectorised)
     if progress:
+        pbar.update(compiled.num_tasks)
         pbar.close()
 
-    return task_ranks
+    return dict(zip(compiled.tasks, ranks.tolist()))
 
 
 def ave_comm_cost(workflow, task, successor):
-    transfer_data = workflow.graph.edges[task, successor]['transfer_data']
-    # return workflow.graph.edges[task, successor]['transfer_data']
-
-    return workflow.env.calc_data_transfer_time(transfer_data=transfer_data)
+    return workflow.comm_cost(task, successor)
 
 
 def ave_comp_cost(workflow, task):
-    comp = workflow.tasks[task]['comp']
-    return sum(comp) / len(comp)
+    return workflow.ave_runtimes[task.index]
 
 
 def max_comp_cost(workflow, task):
-    comp = workflow.tasks[task]['comp']
-    return max(comp)
+    return workflow.runtimes[task.index].max()
 
 
 def min_comp_cost(workflow, task):
-    comp = workflow.tasks[task]['comp']
-    return min(comp)
+    return workflow.runtimes[task.index].min()
 
 
 def calc_est(workflow, task, machine, solution):
@@ -257,16 +276,15 @@ def calc_est(workflow, task, machine, solution):
     Calculate the Estimated Start Time of a task on a given processor
     """
 
+    runtime = workflow.runtimes[task.index, machine.index].item()
     est = 0
-    predecessors = workflow.graph.predecessors(task)
-    for pretask in predecessors:
+    comm = workflow.comm
+    for pretask, attr in workflow.graph.pred[task].items():
         # If task isn't on the same processor, there is a transfer cost
         alloc = solution.task_allocations[pretask]
         pre_machine_alloc = alloc.machine
-        rate = workflow.env.system_bandwith
-        if pre_machine_alloc != machine and rate > 0:
-            comm_cost = int(
-                workflow.graph.edges[pretask, task]['transfer_data'] / rate)
+        if pre_machine_alloc != machine:
+            comm_cost = comm[attr[WORKFLOW_EDGE]].item()
         else:
             comm_cost = 0
 
@@ -275,57 +293,50 @@ def calc_est(workflow, task, machine, solution):
         if tmp >= est:
             est = tmp
 
-    machine_str = machine
-    curr_allocations = solution.list_machine_allocations(machine_str)
-    available_slots = []
-    num_alloc = len(curr_allocations)
-    prev = None
-    if curr_allocations:
-        for i, alloc in enumerate(curr_allocations):
-            if i == 0:
-                # If the start time of the first allocation is not 0
-                if alloc.ast != 0:
-                    available_slots.append((0, alloc.ast))
-                else:
-                    continue
-            elif alloc.ast < est:
-                continue
-            else:
-                prev_alloc = curr_allocations[i - 1]
-                available_slots.append((prev_alloc.aft, alloc.ast))
-        # We want the finish time of the latest allocation.
-        final_alloc = curr_allocations[-1]
-        available_slots.append((final_alloc.aft, -1))
-
-    for slot in available_slots:
-        (start, end) = slot
-        if est < start and start + task.calc_runtime(machine) <= end:
-            return start
-        if (est >= start) and est + task.calc_runtime(machine) <= end:
-            return est
-        # At the 'end' of available slots
-        if (est >= start) and (end < 0):
-            return est
-        # This last case occurs when we have a low est but a high cost, so
-        # it doesn't fit in any gaps; hence we have to put it at the 'end'
-        # and start it late
-        if (est < start) and (end < 0):
-            return start
-
-    return est
+    return solution.earliest_start(machine, est, runtime)
 
 
-def insertion_policy(workflow, position=0, progress=False):
+def insertion_policy(workflow, position=0, progress=False, vectorised=False,
+                     stats=None):
     """
     Allocate tasks to machines following the insertion based policy outline
     in Tocuoglu et al.(2002)
+
+    If the machines of the workflow's environment have been collapsed into
+    classes (Environment.collapse_machines), the EFT of each task is only
+    evaluated on the earliest-available machine of each class and on the
+    machines that hold its predecessors, rather than on every machine.
+    Idle gaps on the other machines of a class are not searched.
+
+    :param vectorised: Evaluate the EFT of each task on every machine at
+        once with array operations, assuming it is appended after the last
+        allocation on each machine, and only search the idle gaps of the
+        machines on which it could finish earlier (see
+        `_min_eft_vectorised`). The schedule is the same as the serial
+        search. It breaks even at 32 to 64 machines and is faster beyond
+        that (about 2.5x at 256 machines, 6x at 1024; see
+        benchmarks/vectorised_eft.py). Ignored if the machines have been
+        collapsed into classes.
+    :param stats: Optional SchedulerStats, in which the sorting and
+        allocation phases are timed and the EFT probes counted
     """
     makespan = 0
     prev_aft, prev_ast = (0, 0)
+    classes = workflow.env.machine_classes
+    if classes:
+        available = [
+            [(0, m.index, m) for m in machine_class.machines]
+            for machine_class in classes
+        ]
+    vectorised = vectorised and not classes
+    if vectorised:
+        # Finish time of the last allocation on each machine
+        finish = np.zeros(len(workflow.env.machines), dtype=np.float64)
     # tasks = sort_tasks(workflow, 'rank')
-    sorted_tasks = workflow.sort_tasks('rank')
+    with phase(stats, 'sorting'):
+        sorted_tasks = workflow.sort_tasks('rank')
     # tmp = workflow.tasks
-    solution = Solution(workflow.env.machines)
+    solution = Solution(workflow.env.machines, stats)
     _debug_task_count = 0
     _total_tasks = len(sorted_tasks)
     pbar = None
@@ -334,137 +345,290 @@ def insertion_policy(workflow, position=0, progress=False):
         pbar = tqdm(total=_total_tasks, unit="Tasks", desc='Allocating '
                                                            'tasks',
                     position=position)
-    for task in sorted_tasks:
-        _debug_task_count += 1
-        # Treat the first task differently, as it's the easiest to get the
-        # lowest cost
-        if task == list(sorted_tasks)[0]:  # Convert networkx NodeView to list
-            m, w = task.calc_mininum_runtime(workflow.env)
-            # m2, w2 = min(
-            #     task.test_runtime.items(),
-            #     key=operator.itemgetter(1)
-            # )
-            # assert m == m2
-            # assert w == w2
-            ast = 0
-            aft = w
-            solution.add_allocation(task=task, machine=m, ast=ast, aft=aft)
-        else:
-            aft = -1  # Finish time for the current task
-            m = 0
-
-            for machine in workflow.env.machines:
-                # tasks in self.rank_sort are being updated, not workflow.graph;
-                est = calc_est(workflow, task, machine, solution)
-                if aft == -1:  # assign initial value of aft for this task
-                    aft = est + task.calc_runtime(machine)
-                    m = machine
-                # see if the next processor gives us an earlier finish time
-                elif est + task.calc_runtime(machine) < aft:
-                    aft = est + task.calc_runtime(machine)
-                    m = machine
-            ast = aft - task.calc_runtime(m)
-
-            if aft >= makespan:
-                makespan = aft
-            solution.add_allocation(task=task, machine=m, ast=ast, aft=aft)
-        if progress:
-            update = 1
-            pbar.update(update)
+    with phase(stats, 'allocation'):
+        for task in sorted_tasks:
+            _debug_task_count += 1
+            runtime = workflow.runtimes[task.index].tolist()
+            # Treat the first task differently, as it's the easiest to get
+            # the lowest cost
+            if _debug_task_count == 1:
+                m, w = task.calc_mininum_runtime(workflow.env)
+                ast = 0
+                aft = w
+                solution.add_allocation(task=task, machine=m, ast=ast,
+                                        aft=aft)
+            else:
+                ready = _ready_times(workflow, task, solution)
+                if classes:
+                    machines = _class_candidates(workflow, task, solution,
+                                                 available)
+                else:
+                    machines = workflow.env.machines
+                if vectorised:
+                    aft, m = _min_eft_vectorised(
+                        solution, machines, workflow.runtimes[task.index],
+                        finish, *ready)
+                else:
+                    aft, m = _min_eft(solution, machines, runtime, *ready)
+                if stats is not None:
+                    stats.eft_probes += len(machines)
+                ast = aft - runtime[m.index]
+
+                if aft >= makespan:
+                    makespan = aft
+                solution.add_allocation(task=task, machine=m, ast=ast,
+                                        aft=aft)
+            if vectorised and aft > finish[m.index]:
+                finish[m.index] = aft
+            if progress:
+                update = 1
+                pbar.update(update)
     if progress:
         pbar.close()
+    if stats is not None:
+        stats.record_allocations(
+            (mid, len(allocations))
+            for mid, allocations in solution.allocations.items())
     solution.makespan = makespan
     return solution
 
 
-def insertion_policy_oct(workflow, oct_rank_matrix):
+def _ready_times(workflow, task, solution):
+    """
+    The time at which the data of every predecessor of `task` is available
+    on a machine (the EST of `calc_est`, before searching for a free slot).
+
+    :return: (remote, local) where `remote` is the ready time on machines
+        that hold none of the predecessors, and `local` maps each machine
+        that does hold a predecessor to its ready time.
+    """
+    comm = workflow.comm
+    inputs = []
+    for pretask, attr in workflow.graph.pred[task].items():
+        alloc = solution.task_allocations[pretask]
+        comm_cost = comm[attr[WORKFLOW_EDGE]].item()
+        inputs.append((alloc.machine, alloc.aft, comm_cost))
+    remote = max([0] + [aft + comm_cost for _, aft, comm_cost in inputs])
+    local = {}
+    for machine, _, _ in inputs:
+        if machine not in local:
+            local[machine] = max([0] + [
+                aft if pre_machine == machine else aft + comm_cost
+                for pre_machine, aft, comm_cost in inputs
+            ])
+    return remote, local
+
+
+def _min_eft(solution, machines, runtime, remote, local):
+    """
+    The machine in `machines` with the earliest finish time for a task,
+    and that finish time. The first such machine is returned if there is a
+    tie.
+
+    :param runtime: Runtime of the task, indexed by machine index
+    :param remote: Ready time of the task (see `_ready_times`)
+    :param local: Ready time on machines holding its predecessors
+    :return: (aft, machine)
+    """
+    aft, m = -1, None
+    for machine in machines:
+        duration = runtime[machine.index]
+        est = solution.earliest_start(
+            machine, local.get(machine, remote), duration
+        )
+        # see if the next processor gives us an earlier finish time
+        if aft == -1 or est + duration < aft:
+            aft = est + duration
+            m = machine
+    return aft, m
+
+
+def _min_eft_vectorised(solution, machines, runtime, finish, remote, local):
+    """
+    As `_min_eft`, but the finish time of the task if it is appended after
+    the last allocation on each machine is computed for every machine at
+    once. The idle gaps of a machine are only searched if the task could
+    start before its last allocation finishes and could still finish no
+    later than the best appended finish time; on every other machine the
+    appended finish time is exact, or too late to be the minimum.
+
+    :param runtime: Runtime of the task on each machine (array)
+    :param finish: Finish time of the last allocation on each machine
+    :return: (aft, machine)
+    """
+    ready = np.full(len(machines), remote, dtype=np.float64)
+    for machine, ready_time in local.items():
+        ready[machine.index] = ready_time
+    earliest = ready + runtime
+    eft = np.maximum(ready, finish) + runtime
+    gaps = np.flatnonzero((earliest < eft) & (earliest <= eft.min()))
+    for i in gaps.tolist():
+        eft[i] = solution.earliest_start(
+            machines[i], ready[i].item(), runtime[i].item()) + runtime[i]
+    machine = machines[int(np.argmin(eft))]
+    # The finish time on the chosen machine is recomputed from the original
+    # (not float64) values, so it is the one the serial search returns
+    duration = runtime[machine.index].item()
+    return solution.earliest_start(
+        machine, local.get(machine, remote), duration) + duration, machine
+
+
+def _class_candidates(workflow, task, solution, available):
+    """
+    Machines on which to evaluate the EFT of `task` when the environment is
+    collapsed into machine classes: the earliest-available machine of each
+    class, and every machine holding a predecessor of `task` (on which its
+    data is available without a transfer). Candidates are returned in
+    environment order, so ties are broken as they are without classes.
+
+    :param available: One heap per machine class of (available time,
+        machine index, machine) entries. Entries are refreshed as they reach
+        the top of the heap; as a machine's available time never decreases,
+        stale entries are always too early, never too late.
+    """
+    candidates = {
+        solution.task_allocations[pretask].machine
+        for pretask in workflow.graph.predecessors(task)
+    }
+    for heap in available:
+        while True:
+            ready, i, machine = heap[0]
+            latest = solution.latest_allocation_on_machine(machine)
+            current = latest.aft if latest is not None else 0
+            if current == ready:
+                break
+            heapq.heapreplace(heap, (current, i, machine))
+        candidates.add(machine)
+    return sorted(candidates, key=lambda m: m.index)
+
+
+def insertion_policy_oct(workflow, oct_rank_matrix, stats=None):
     """
     Allocate tasks to machines following the insertion based policy outline
     in Tocuoglu et al.(2002)
+
+    :param oct_rank_matrix: OptimisticCostTable for the workflow (this is
+        generated if None is given)
+    :param stats: Optional SchedulerStats (see `insertion_policy`)
     """
 
     makespan = 0
-    if not oct_rank_matrix:
+    if oct_rank_matrix is None:
         oct_rank_matrix = generate_ranking_matrix(workflow)
-    eft_matrix = dict()
-    oeft_matrix = dict()
     m = None
-    sorted_tasks = workflow.sort_tasks('rank')
-    solution = Solution(workflow.env.machines)
-    for task in sorted_tasks:
-        if task == list(workflow.tasks)[0]:
-            ast = 0
-            min_oeft = -1
-            for machine in workflow.env.machines:
-                eft_matrix[(task, machine)] = task.calculated_runtime(machine)
-                oeft_matrix[(task, machine)] = eft_matrix[(task, machine)] + \
-                                               oct_rank_matrix[(task, machine)]
-                if (min_oeft == -1) or (
-                        oeft_matrix[(task, machine)] < min_oeft):
-                    min_oeft = oeft_matrix[(task, machine)]
-                    m = machine
-            aft = task.calculated_runtime(m)
-            solution.add_allocation(task=task, machine=m, ast=ast, aft=aft)
-        else:
+    with phase(stats, 'sorting'):
+        sorted_tasks = _ready_list_order(
+            workflow.graph, workflow.sort_tasks('rank'))
+    solution = Solution(workflow.env.machines, stats)
+    first_task = next(iter(workflow.tasks))
+    with phase(stats, 'allocation'):
+        for task in sorted_tasks:
+            runtime = workflow.runtimes[task.index].tolist()
+            oct_row = oct_rank_matrix.table[task.index].tolist()
+            if task == first_task:
+                # The entry task is not always allocated first (see
+                # _ready_list_order), so it is placed in the first free slot
+                eft = [
+                    solution.earliest_start(machine, 0, runtime[machine.index])
+                    + runtime[machine.index]
+                    for machine in workflow.env.machines
+                ]
+            else:
+                if stats is not None:
+                    stats.eft_probes += len(workflow.env.machines)
+                eft = [
+                    calc_est(workflow, task, machine, solution)
+                    + runtime[machine.index]
+                    for machine in workflow.env.machines
+                ]
             min_oeft = -1
             for machine in workflow.env.machines:
-                if workflow.graph.predecessors(task):
-                    est = calc_est(workflow, task, machine, solution)
-                else:
-                    est = 0
-                eft = est + task.calculated_runtime(machine)
-                eft_matrix[(task, machine)] = eft
-                oeft_matrix[(task, machine)] = eft_matrix[(task, machine)] + \
-                                               oct_rank_matrix[(task, machine)]
-                if (min_oeft == -1) or (
-                        oeft_matrix[(task, machine)] < min_oeft):
-                    min_oeft = oeft_matrix[(task, machine)]
+                oeft = eft[machine.index] + oct_row[machine.index]
+                if (min_oeft == -1) or (oeft < min_oeft):
+                    min_oeft = oeft
                     m = machine
 
-            aft = eft_matrix[(task, m)]
-            ast = aft - task.calculated_runtime(m)
-            task.machine = m
-
-            if aft >= makespan:
-                makespan = aft
+            aft = eft[m.index]
+            ast = aft - runtime[m.index]
+            if task != first_task:
+                task.machine = m
+                if aft >= makespan:
+                    makespan = aft
             solution.add_allocation(task=task, machine=m, ast=ast, aft=aft)
+    if stats is not None:
+        stats.record_allocations(
+            (mid, len(allocations))
+            for mid, allocations in solution.allocations.items())
 
     solution.makespan = makespan
     return solution
 
 
-def fcfs_allocation(workflow, greedy, seed):
+def _ready_list_order(graph, sorted_tasks):
+    """
+    The order in which PHEFT allocates tasks: the ready task (all of whose
+    predecessors have been allocated) that comes first in `sorted_tasks`
+    is allocated next. Unlike upward ranks, OCT ranks are not guaranteed
+    to be larger than those of a task's successors, so the rank order
+    alone may place a task before its predecessors; if it does not, the
+    order is unchanged.
+    """
+    position = {task: k for k, task in enumerate(sorted_tasks)}
+    waiting = {task: graph.in_degree(task) for task in sorted_tasks}
+    ready = [k for k, task in enumerate(sorted_tasks) if waiting[task] == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        task = sorted_tasks[heapq.heappop(ready)]
+        order.append(task)
+        for successor in graph.successors(task):
+            waiting[successor] -= 1
+            if waiting[successor] == 0:
+                heapq.heappush(ready, position[successor])
+    return order
+
+
+def fcfs_allocation(workflow, greedy, seed, stats=None):
     makespan = 0
     # tasks = sort_tasks(workflow, 'rank')
-    sorted_tasks = workflow.sort_tasks("topological")
+    with phase(stats, 'sorting'):
+        sorted_tasks = list(workflow.sort_tasks("topological"))
     # tmp = workflow.tasks
-    solution = Solution(workflow.env.machines)
+    solution = Solution(workflow.env.machines, stats)
     earliest_alloc = {m: 0 for m in workflow.env.machines}
-    for task in sorted_tasks:
-        pred = list(workflow.graph.predecessors(task))
-        if not pred:
-            start_time = 0
-            nmachine, start_val = next_available_start(earliest_alloc)
-            # update earliest for machine as runtime for this task
-            w = task.calculated_runtime(nmachine)
-            earliest_alloc[nmachine] = w
-            m = nmachine
-            ast = start_time
-            aft = w
-            machine = m
-            solution.add_allocation(task, machine, ast=ast, aft=aft)
-        else:
-            nmachine, start_val = next_available_start(earliest_alloc)
-
-            est = calc_earliest_start_time_on_machine(task, nmachine, start_val,
-                                                      workflow, solution)
-            ast = est
-            aft = est + task.calculated_runtime(nmachine)
-            earliest_alloc[nmachine] = aft
-            # aft = finish_time
-            if aft > makespan:
-                makespan = aft
-            solution.add_allocation(task, nmachine, ast=ast, aft=aft)
+    with phase(stats, 'allocation'):
+        for task in sorted_tasks:
+            pred = list(workflow.graph.predecessors(task))
+            if not pred:
+                start_time = 0
+                nmachine, start_val = next_available_start(earliest_alloc)
+                # update earliest for machine as runtime for this task
+                w = workflow.runtimes[task.index, nmachine.index].item()
+                earliest_alloc[nmachine] = w
+                m = nmachine
+                ast = start_time
+                aft = w
+                machine = m
+                solution.add_allocation(task, machine, ast=ast, aft=aft)
+            else:
+                nmachine, start_val = next_available_start(earliest_alloc)
+                if stats is not None:
+                    stats.eft_probes += 1
+
+                est = calc_earliest_start_time_on_machine(
+                    task, nmachine, start_val, workflow, solution)
+                ast = est
+                aft = est + workflow.runtimes[
+                    task.index, nmachine.index].item()
+                earliest_alloc[nmachine] = aft
+                # aft = finish_time
+                if aft > makespan:
+                    makespan = aft
+                solution.add_allocation(task, nmachine, ast=ast, aft=aft)
+    if stats is not None:
+        stats.record_allocations(
+            (mid, len(allocations))
+            for mid, allocations in solution.allocations.items())
 
     solution.makespan = makespan
     return solution
@@ -549,15 +713,13 @@ def calc_earliest_start_time_on_machine(task, machine, pred_start, workflow,
     """
 
     est = pred_start
-    pred = workflow.graph.predecessors(task)
-    for pretask in pred:
+    comm = workflow.comm
+    for pretask, attr in workflow.graph.pred[task].items():
         # If task isn't on the same processor, there is a transfer cost
         alloc = solution.task_allocations[pretask]
         pre_machine_alloc = alloc.machine
-        rate = workflow.env.system_bandwith
-        if pre_machine_alloc != machine and rate > 0:
-            comm_cost = int(
-                workflow.graph.edges[pretask, task]['transfer_data'] / rate)
+        if pre_machine_alloc != machine:
+            comm_cost = comm[attr[WORKFLOW_EDGE]].item()
         else:
             comm_cost = 0
 
@@ -589,3 +751,330 @@ def latest_allocation(task, solution, workflow):
                              alloc.task in pred]
     pred_task_allocations.sort(key=lambda alloc: alloc.aft, reverse=True)
     return pred_task_allocations[0]  # pred[0]
+
+
+#############################################################################
+######################## COMPILED WORKFLOW POLICIES #########################
+#############################################################################
+
+def compiled_heft(workflow, stats=None):
+    """
+    HEFT on a CompiledWorkflow. This produces the same schedule as `heft`
+    on the Workflow from which `workflow` was compiled, without walking the
+    networkx graph.
+
+    :param workflow: CompiledWorkflow with an environment added
+    :param stats: Optional SchedulerStats (see `heft`)
+    :return: CompiledSolution
+    """
+    with phase(stats, 'ranking'):
+        ranks = compiled_upward_ranks(workflow)
+    with phase(stats, 'sorting'):
+        order = np.argsort(-ranks, kind='stable')
+    return compiled_insertion_policy(workflow, order, stats)
+
+
+def compiled_pheft(workflow, stats=None):
+    """
+    PHEFT on a CompiledWorkflow, using an array-based Optimistic Cost Table
+
+    :param workflow: CompiledWorkflow with an environment added
+    :param stats: Optional SchedulerStats (see `heft`)
+    :return: CompiledSolution
+    """
+    with phase(stats, 'ranking'):
+        oct_table = compiled_oct(workflow)
+        ranks = oct_table.mean(axis=1).astype(np.int64)
+    with phase(stats, 'sorting'):
+        order = _compiled_ready_list_order(
+            workflow, np.argsort(-ranks, kind='stable'))
+    return compiled_insertion_policy_oct(workflow, order, oct_table, stats)
+
+
+def compiled_fcfs(workflow, stats=None):
+    """
+    First Come First Serve allocation on a CompiledWorkflow. Tasks are
+    allocated in topological order to the machine that is available
+    earliest.
+
+    :param workflow: CompiledWorkflow with an environment added
+    :param stats: Optional SchedulerStats (see `heft`)
+    :return: CompiledSolution
+    """
+    runtimes = workflow.runtimes
+    num_tasks, num_machines = runtimes.shape
+    with phase(stats, 'sorting'):
+        order = workflow.topological_order()
+    machine = np.full(num_tasks, -1, dtype=np.int64)
+    ast = np.zeros(num_tasks, dtype=runtimes.dtype)
+    aft = np.zeros(num_tasks, dtype=runtimes.dtype)
+    earliest_alloc = [0] * num_machines
+    pred_ptr = workflow.pred_ptr.tolist()
+    makespan = 0
+    with phase(stats, 'allocation'):
+        for i in order.tolist():
+            m = min(range(num_machines), key=earliest_alloc.__getitem__)
+            if pred_ptr[i] == pred_ptr[i + 1]:
+                start = 0
+            else:
+                start = max(
+                    earliest_alloc[m],
+                    _compiled_ready_times(workflow, i, machine, aft)[m]
+                )
+            finish = start + runtimes[i, m].item()
+            earliest_alloc[m] = finish
+            machine[i], ast[i], aft[i] = m, start, finish
+            if pred_ptr[i] != pred_ptr[i + 1] and finish > makespan:
+                makespan = finish
+    solution = CompiledSolution(workflow, machine, ast, aft, order, makespan)
+    if stats is not None:
+        stats.eft_probes += int((np.diff(workflow.pred_ptr) > 0).sum())
+        _record_compiled_allocations(stats, solution)
+    return solution
+
+
+def compiled_upward_ranks(workflow, vectorised=False):
+    """
+    Upward rank of each task in a CompiledWorkflow, calculated in reverse
+    topological order (see `calculate_upward_ranks`).
+
+    The rank of an exit task is its average runtime; the rank of any other
+    task is the largest (communication cost + rank) over its successors,
+    plus its average runtime (at least 1).
+
+    :param workflow: CompiledWorkflow with an environment added
+    :param vectorised: If True, peel off the tasks whose successors have all
+        been ranked one level at a time, and rank each level with array
+        operations. This gives the same ranks, and is faster for wide
+        workflows with few levels.
+    :return: numpy.ndarray of ranks, indexed by task index
+    """
+    if vectorised:
+        return _level_upward_ranks(workflow)
+    ave = workflow.ave_runtimes.tolist()
+    comm = workflow.comm.tolist()
+    succ_ptr = workflow.succ_ptr.tolist()
+    succ_idx = workflow.succ_idx.tolist()
+    ranks = [0.0] * workflow.num_tasks
+    for i in workflow.topological_order()[::-1].tolist():
+        start, end = succ_ptr[i], succ_ptr[i + 1]
+        if start == end:
+            ranks[i] = max(ave[i], 0)
+        else:
+            longest_rank = max(
+                comm[e] + ranks[succ_idx[e]] for e in range(start, end)
+            )
+            ranks[i] = longest_rank + max(ave[i], 1)
+    return np.array(ranks, dtype=float)
+
+
+def _level_upward_ranks(workflow):
+    ave = workflow.ave_runtimes
+    remaining = np.diff(workflow.succ_ptr)
+    longest_rank = np.full(workflow.num_tasks, -np.inf)
+    ranks = np.zeros(workflow.num_tasks)
+    level = np.flatnonzero(remaining == 0)
+    ranks[level] = np.maximum(ave[level], 0)
+    while len(level):
+        # Every (predecessor, task) edge into the current level
+        k = csr_positions(workflow.pred_ptr, level)
+        pred = workflow.pred_idx[k]
+        edge = workflow.pred_edge[k]
+        np.maximum.at(longest_rank, pred,
+                      workflow.comm[edge] + ranks[workflow.succ_idx[edge]])
+        np.subtract.at(remaining, pred, 1)
+        level = np.unique(pred[remaining[pred] == 0])
+        ranks[level] = longest_rank[level] + np.maximum(ave[level], 1)
+    return ranks
+
+
+def compiled_oct(workflow):
+    """
+    Optimistic Cost Table (Arabnejad and Barbosa, 2014) for a
+    CompiledWorkflow, stored as a (tasks x machines) array.
+
+    :param workflow: CompiledWorkflow with an environment added
+    :return: numpy.ndarray
+    """
+    runtimes = workflow.runtimes
+    comm = workflow.comm
+    succ_ptr = workflow.succ_ptr.tolist()
+    succ_idx = workflow.succ_idx
+    oct_table = np.zeros(runtimes.shape,
+                         dtype=np.result_type(runtimes, comm))
+    for i in workflow.topological_order()[::-1].tolist():
+        start, end = succ_ptr[i], succ_ptr[i + 1]
+        if start == end:
+            continue
+        succ = succ_idx[start:end]
+        cost = oct_table[succ] + runtimes[succ]
+        # Moving to a different machine adds the communication cost
+        cost = np.minimum(
+            cost, cost.min(axis=1, keepdims=True) + comm[start:end, None]
+        )
+        oct_table[i] = cost.max(axis=0)
+    return oct_table
+
+
+def compiled_insertion_policy(workflow, order, stats=None):
+    """
+    Insertion-based allocation (Topcuoglu et al. 2002) of the tasks of a
+    CompiledWorkflow, in the order given.
+
+    :param workflow: CompiledWorkflow with an environment added
+    :param order: Task indices in the order they are allocated
+    :param stats: Optional SchedulerStats, in which the allocation phase is
+        timed and the EFT probes and gaps scanned are counted
+    :return: CompiledSolution
+    """
+    runtimes = workflow.runtimes
+    num_tasks, num_machines = runtimes.shape
+    machine = np.full(num_tasks, -1, dtype=np.int64)
+    ast = np.zeros(num_tasks, dtype=runtimes.dtype)
+    aft = np.zeros(num_tasks, dtype=runtimes.dtype)
+    slots = _compiled_slots(num_machines, stats)
+    makespan = 0
+    order = np.asarray(order)
+    with phase(stats, 'allocation'):
+        for n, i in enumerate(order.tolist()):
+            runtime = runtimes[i].tolist()
+            if n == 0:
+                # As Task.calc_mininum_runtime
+                if workflow.time:
+                    m = int(np.argmin(runtimes[i]))
+                    finish = runtime[m]
+                else:
+                    m, finish = calc_minimum_runtime(
+                        workflow.comp[i].item(), workflow.task_data[i].item(),
+                        workflow.env.machines)
+                start = 0
+            else:
+                ready = _compiled_ready_times(workflow, i, machine, aft)
+                finish, m = -1, 0
+                for j in range(num_machines):
+                    est = slots[j].earliest_start(ready[j], runtime[j])
+                    if finish == -1 or est + runtime[j] < finish:
+                        finish = est + runtime[j]
+                        m = j
+                if finish >= makespan:
+                    makespan = finish
+                start = finish - runtime[m]
+            slots[m].add(start, finish)
+            machine[i], ast[i], aft[i] = m, start, finish
+    solution = CompiledSolution(workflow, machine, ast, aft, order, makespan)
+    if stats is not None:
+        stats.eft_probes += max(len(order) - 1, 0) * num_machines
+        _record_compiled_allocations(stats, solution)
+    return solution
+
+
+def compiled_insertion_policy_oct(workflow, order, oct_table, stats=None):
+    """
+    Insertion-based allocation of the tasks of a CompiledWorkflow that
+    minimises the Optimistic EFT (EFT + OCT) of each task.
+
+    :param workflow: CompiledWorkflow with an environment added
+    :param order: Task indices in the order they are allocated
+    :param oct_table: (tasks x machines) Optimistic Cost Table
+    :param stats: Optional SchedulerStats (see `compiled_insertion_policy`)
+    :return: CompiledSolution
+    """
+    runtimes = workflow.runtimes
+    num_tasks, num_machines = runtimes.shape
+    machine = np.full(num_tasks, -1, dtype=np.int64)
+    ast = np.zeros(num_tasks, dtype=runtimes.dtype)
+    aft = np.zeros(num_tasks, dtype=runtimes.dtype)
+    slots = _compiled_slots(num_machines, stats)
+    makespan = 0
+    order = np.asarray(order)
+    with phase(stats, 'allocation'):
+        for i in order.tolist():
+            runtime = runtimes[i].tolist()
+            if i == 0:
+                eft = [slots[j].earliest_start(0, runtime[j]) + runtime[j]
+                       for j in range(num_machines)]
+            else:
+                ready = _compiled_ready_times(workflow, i, machine, aft)
+                eft = [
+                    slots[j].earliest_start(ready[j], runtime[j])
+                    + runtime[j]
+                    for j in range(num_machines)
+                ]
+            m = int(np.argmin(np.asarray(eft) + oct_table[i]))
+            finish = eft[m]
+            start = finish - runtime[m]
+            if i != 0 and finish >= makespan:
+                makespan = finish
+            slots[m].add(start, finish)
+            machine[i], ast[i], aft[i] = m, start, finish
+    solution = CompiledSolution(workflow, machine, ast, aft, order, makespan)
+    if stats is not None:
+        stats.eft_probes += int((order != 0).sum()) * num_machines
+        _record_compiled_allocations(stats, solution)
+    return solution
+
+
+def _compiled_ready_list_order(workflow, order):
+    """
+    `_ready_list_order` for a CompiledWorkflow, where `order` is the task
+    indices sorted by rank
+    """
+    order = order.tolist()
+    position = [0] * len(order)
+    for k, i in enumerate(order):
+        position[i] = k
+    waiting = np.diff(workflow.pred_ptr).tolist()
+    succ_ptr = workflow.succ_ptr.tolist()
+    succ_idx = workflow.succ_idx.tolist()
+    ready = [k for k, i in enumerate(order) if waiting[i] == 0]
+    heapq.heapify(ready)
+    result = []
+    while ready:
+        i = order[heapq.heappop(ready)]
+        result.append(i)
+        for s in succ_idx[succ_ptr[i]:succ_ptr[i + 1]]:
+            waiting[s] -= 1
+            if waiting[s] == 0:
+                heapq.heappush(ready, position[s])
+    return np.array(result, dtype=np.int64)
+
+
+def _compiled_slots(num_machines, stats):
+    """
+    A free-slot index for each machine, counting the gaps scanned if
+    statistics are collected
+    """
+    if stats is None:
+        return [FreeSlotIndex() for _ in range(num_machines)]
+    return [CountingSlotIndex(stats) for _ in range(num_machines)]
+
+
+def _record_compiled_allocations(stats, solution):
+    """
+    Attach `stats` to a CompiledSolution, and record the number of
+    allocations on each machine
+    """
+    machines = solution.workflow.env.machines
+    counts = np.bincount(solution.machine, minlength=len(machines))
+    stats.record_allocations(
+        (m.id, count) for m, count in zip(machines, counts.tolist()))
+    solution.stats = stats
+
+
+def _compiled_ready_times(workflow, i, machine, aft):
+    """
+    The time at which all data from the predecessors of task `i` is
+    available on each machine.
+
+    :return: list of ready times, indexed by machine index
+    """
+    num_machines = workflow.runtimes.shape[1]
+    start, end = workflow.pred_ptr[i], workflow.pred_ptr[i + 1]
+    if start == end:
+        return [0] * num_machines
+    pred = workflow.pred_idx[start:end]
+    finish = aft[pred]
+    remote = finish + workflow.comm[workflow.pred_edge[start:end]]
+    local = machine[pred][:, None] == np.arange(num_machines)
+    ready = np.where(local, finish[:, None], remote[:, None]).max(axis=0)
+    return np.maximum(ready, 0).tolist()
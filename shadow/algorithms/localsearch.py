@@ -0,0 +1,341 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Local-search improvement of an existing schedule.
+
+A schedule is described by the machine each task runs on and the order
+of the tasks on each machine; every task starts as soon as its machine is
+free and the data from its predecessors has arrived (as in
+shadow.models.simulator). `local_search` repeatedly proposes a move:
+
+* 'reassign': move a task to another machine;
+* 'swap': exchange the machines of two tasks;
+* 'reorder': exchange a task with the next task on its machine.
+
+A task that moves to another machine is placed among that machine's tasks
+by its current start time. After a move, only the downstream cone of the
+tasks it touched (their successors, and the tasks after them on their
+machines, recursively) is recomputed; a move that would create a cycle is
+rejected. Moves that do not increase the makespan are kept. With a
+positive `temperature`, worse moves are also kept with the Metropolis
+probability, and the temperature is reduced after every move (simulated
+annealing).
+"""
+
+import logging
+import math
+import random
+import time
+
+import numpy as np
+
+from shadow.algorithms.heuristic import compiled_heft
+from shadow.models.compiled import (
+    CompiledWorkflow, CompiledSolution, solution_arrays
+)
+
+LOGGER = logging.getLogger(__name__)
+
+MOVES = ('reassign', 'swap', 'reorder')
+
+
+class _Schedule(object):
+    """
+    Machine sequences and times of a schedule, with moves that can be
+    evaluated (and undone) incrementally
+    """
+
+    def __init__(self, workflow, machine, ast, rank):
+        self.runtimes = workflow.runtimes.tolist()
+        self.comm = workflow.comm.tolist()
+        self.succ_ptr = workflow.succ_ptr.tolist()
+        self.succ_idx = workflow.succ_idx.tolist()
+        self.pred_ptr = workflow.pred_ptr.tolist()
+        self.pred_idx = workflow.pred_idx.tolist()
+        self.pred_edge = workflow.pred_edge.tolist()
+        self.num_machines = len(workflow.env.machines)
+        self.machine = machine.tolist()
+        self.sequence = [[] for _ in range(self.num_machines)]
+        for i in np.lexsort((rank, ast)).tolist():
+            self.sequence[self.machine[i]].append(i)
+        self.position = [0] * workflow.num_tasks
+        for m in range(self.num_machines):
+            self._reposition(m, 0)
+        self.ast = [0] * workflow.num_tasks
+        self.aft = [0] * workflow.num_tasks
+        self.makespan = 0
+        if self._recompute(range(workflow.num_tasks)) is None:
+            raise RuntimeError(
+                "The order of tasks on a machine conflicts with their "
+                "dependencies")
+
+    def _reposition(self, m, start):
+        sequence = self.sequence[m]
+        for k in range(start, len(sequence)):
+            self.position[sequence[k]] = k
+
+    def _next(self, i):
+        sequence = self.sequence[self.machine[i]]
+        k = self.position[i] + 1
+        return sequence[k] if k < len(sequence) else None
+
+    def _previous(self, i):
+        k = self.position[i]
+        return self.sequence[self.machine[i]][k - 1] if k > 0 else None
+
+    def _remove(self, i):
+        m = self.machine[i]
+        k = self.position[i]
+        del self.sequence[m][k]
+        self._reposition(m, k)
+
+    def _insert(self, i, m, k=None):
+        sequence = self.sequence[m]
+        if k is None:
+            # First position whose task starts after task i
+            start, k, high = self.ast[i], 0, len(sequence)
+            while k < high:
+                middle = (k + high) // 2
+                if self.ast[sequence[middle]] <= start:
+                    k = middle + 1
+                else:
+                    high = middle
+        sequence.insert(k, i)
+        self.machine[i] = m
+        self._reposition(m, k)
+
+    def _cone(self, seeds):
+        cone = set()
+        stack = [s for s in seeds if s is not None]
+        while stack:
+            i = stack.pop()
+            if i in cone:
+                continue
+            cone.add(i)
+            stack.extend(
+                self.succ_idx[self.succ_ptr[i]:self.succ_ptr[i + 1]])
+            following = self._next(i)
+            if following is not None:
+                stack.append(following)
+        return cone
+
+    def _recompute(self, seeds):
+        """
+        Recompute the times of the downstream cone of `seeds`.
+
+        :return: List of (task, ast, aft) before the update, or None (with
+            the times unchanged) if the machine orders and dependencies
+            form a cycle
+        """
+        cone = self._cone(seeds)
+        machine, aft = self.machine, self.aft
+        indegree = {}
+        for i in cone:
+            count = sum(
+                1 for p in self.pred_idx[self.pred_ptr[i]:self.pred_ptr[i + 1]]
+                if p in cone)
+            previous = self._previous(i)
+            if previous is not None and previous in cone:
+                count += 1
+            indegree[i] = count
+        ready = [i for i in cone if indegree[i] == 0]
+        saved = []
+        while ready:
+            i = ready.pop()
+            m = machine[i]
+            previous = self._previous(i)
+            start = aft[previous] if previous is not None else 0
+            for k in range(self.pred_ptr[i], self.pred_ptr[i + 1]):
+                p = self.pred_idx[k]
+                arrival = aft[p]
+                if machine[p] != m:
+                    arrival += self.comm[self.pred_edge[k]]
+                if arrival > start:
+                    start = arrival
+            saved.append((i, self.ast[i], aft[i]))
+            self.ast[i] = start
+            aft[i] = start + self.runtimes[i][m]
+            dependants = self.succ_idx[self.succ_ptr[i]:self.succ_ptr[i + 1]]
+            following = self._next(i)
+            if following is not None:
+                dependants = dependants + [following]
+            for s in dependants:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    ready.append(s)
+        if len(saved) != len(cone):
+            self._restore(saved)
+            return None
+        # Only rescan every task if the task that set the makespan finished
+        # earlier and nothing in the cone took its place
+        latest = max((aft[i] for i, _, _ in saved), default=0)
+        if latest >= self.makespan:
+            self.makespan = latest
+        elif any(old == self.makespan for _, _, old in saved):
+            self.makespan = max(aft, default=0)
+        return saved
+
+    def _restore(self, saved):
+        for i, ast, aft in saved:
+            self.ast[i] = ast
+            self.aft[i] = aft
+
+    def apply(self, move):
+        """
+        Apply a move, returning the information needed to undo it, or None
+        if the move is not feasible
+        """
+        kind = move[0]
+        makespan = self.makespan
+        if kind == 'reorder':
+            _, i = move
+            j = self._next(i)
+            m, k = self.machine[i], self.position[i]
+            self.sequence[m][k:k + 2] = [j, i]
+            self._reposition(m, k)
+            seeds = [j]
+            structure = [(i, m, k)]
+        else:
+            if kind == 'reassign':
+                _, i, target = move
+                tasks, targets = [i], [target]
+            else:
+                _, i, j = move
+                tasks, targets = [i, j], [self.machine[j], self.machine[i]]
+            structure = []
+            seeds = list(tasks)
+            for i in tasks:
+                seeds.append(self._next(i))
+                structure.append((i, self.machine[i], self.position[i]))
+                self._remove(i)
+            for i, target in zip(tasks, targets):
+                self._insert(i, target)
+        saved = self._recompute(seeds)
+        undo = (kind, structure, saved, makespan)
+        if saved is None:
+            self.undo(undo)
+            return None
+        return undo
+
+    def undo(self, undo):
+        kind, structure, saved, makespan = undo
+        if saved is not None:
+            self._restore(saved)
+        self.makespan = makespan
+        if kind == 'reorder':
+            i, m, k = structure[0]
+            j = self.sequence[m][k]
+            self.sequence[m][k:k + 2] = [i, j]
+            self._reposition(m, k)
+            return
+        for i, _, _ in reversed(structure):
+            self._remove(i)
+        for i, m, k in structure:
+            self._insert(i, m, k)
+
+
+def _propose(rng, schedule, moves):
+    """
+    A random move, or None if the chosen kind of move is not possible
+    """
+    kind = rng.choice(moves)
+    num_tasks = len(schedule.machine)
+    i = rng.randrange(num_tasks)
+    if kind == 'reassign':
+        if schedule.num_machines < 2:
+            return None
+        target = rng.randrange(schedule.num_machines - 1)
+        if target >= schedule.machine[i]:
+            target += 1
+        return kind, i, target
+    if kind == 'swap':
+        j = rng.randrange(num_tasks)
+        if schedule.machine[i] == schedule.machine[j]:
+            return None
+        return kind, i, j
+    if schedule._next(i) is None:
+        return None
+    return kind, i
+
+
+def local_search(workflow, solution=None, time_budget=1.0,
+                 max_iterations=None, temperature=0.0, cooling=0.999,
+                 moves=MOVES, seed=None):
+    """
+    Improve the makespan of a schedule by local search or simulated
+    annealing.
+
+    :param workflow: Workflow or CompiledWorkflow
+    :param solution: Solution or CompiledSolution to start from (defaults
+        to the HEFT schedule)
+    :param time_budget: Seconds to search for
+    :param max_iterations: Optional maximum number of moves to propose
+    :param temperature: Initial annealing temperature; 0 only accepts moves
+        that do not increase the makespan
+    :param cooling: Factor by which the temperature is multiplied after
+        each move
+    :param moves: Kinds of move to propose (see MOVES)
+    :param seed: Seed for the random number generator
+    :return: The best Solution found (or CompiledSolution, if `workflow` is
+        a CompiledWorkflow)
+    """
+    if workflow.env is None:
+        raise RuntimeError("Workflow environment is not initialised")
+    compiled = workflow
+    if not isinstance(workflow, CompiledWorkflow):
+        compiled = workflow.compile()
+    if solution is None:
+        solution = compiled_heft(compiled)
+    schedule = _Schedule(compiled, *solution_arrays(compiled, solution))
+    rng = random.Random(seed)
+    moves = list(moves)
+
+    best_makespan = schedule.makespan
+    best = (list(schedule.machine), list(schedule.ast), list(schedule.aft))
+    deadline = time.perf_counter() + time_budget
+    iteration = accepted = 0
+    while time.perf_counter() < deadline and schedule.machine:
+        if max_iterations is not None and iteration >= max_iterations:
+            break
+        iteration += 1
+        move = _propose(rng, schedule, moves)
+        if move is None:
+            continue
+        current = schedule.makespan
+        undo = schedule.apply(move)
+        if undo is None:
+            continue
+        delta = schedule.makespan - current
+        if delta <= 0 or (temperature > 0 and
+                          rng.random() < math.exp(-delta / temperature)):
+            accepted += 1
+            if schedule.makespan < best_makespan:
+                best_makespan = schedule.makespan
+                best = (list(schedule.machine), list(schedule.ast),
+                        list(schedule.aft))
+        else:
+            schedule.undo(undo)
+        temperature *= cooling
+    LOGGER.info("Local search: %d moves proposed, %d accepted, makespan %s",
+                iteration, accepted, best_makespan)
+
+    machine, ast, aft = (np.array(values) for values in best)
+    result = CompiledSolution(
+        compiled, machine, ast, aft, np.lexsort((aft, ast)), best_makespan
+    )
+    if compiled is workflow:
+        return result
+    return result.to_solution()
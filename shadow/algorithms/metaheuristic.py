@@ -0,0 +1,546 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Population-based (metaheuristic) scheduling of a CompiledWorkflow.
+
+An individual is encoded by two chromosomes over the task indices:
+
+* `machine`: the machine index each task is assigned to;
+* `priority`: a 'random key' for each task. Tasks are allocated in order of
+  priority (lowest first), after the keys have been raised so that no task
+  comes before one of its predecessors (see shadow.algorithms.decoder).
+
+Each task is appended to its machine's timeline, and starts once the
+machine is free and its input data has arrived. A whole population is
+decoded at once: at each step, every individual allocates its next task,
+using array operations over the population.
+
+`ga` minimises a single objective; `nsga2` searches for the Pareto front
+of several (e.g. time and cost).
+"""
+
+import logging
+from multiprocessing import Pool
+
+import numpy as np
+
+from shadow.algorithms.decoder import ScheduleDecoder, topological_levels
+from shadow.algorithms.fitness import population_fitness
+from shadow.algorithms.heuristic import compiled_heft
+from shadow.models.compiled import (
+    CompiledWorkflow, CompiledSolution, csr_positions
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PopulationDecoder(object):
+    """
+    Decode populations of (machine, priority) chromosomes into schedules
+    for a CompiledWorkflow.
+
+    :param workflow: CompiledWorkflow with an environment added
+    """
+
+    def __init__(self, workflow):
+        if workflow.env is None:
+            raise RuntimeError("Workflow environment is not initialised")
+        self.num_tasks = workflow.num_tasks
+        self.num_machines = len(workflow.env.machines)
+        self.runtimes = np.asarray(workflow.runtimes)
+        self.comm = np.asarray(workflow.comm)
+        self.costs = np.array([m.cost for m in workflow.env.machines],
+                              dtype=float)
+        self.pred_ptr = workflow.pred_ptr
+        self.pred_idx = workflow.pred_idx
+        self.pred_edge = workflow.pred_edge
+        self.indegree = np.diff(workflow.pred_ptr)
+        self.levels = topological_levels(workflow)
+        self.position = np.empty(self.num_tasks, dtype=np.int64)
+        self.position[np.concatenate(self.levels)] = np.arange(
+            self.num_tasks)
+
+    def order(self, priority):
+        """
+        Allocation order of each individual: tasks sorted by priority, with
+        each priority first raised to at least that of its predecessors.
+
+        :param priority: (individuals x tasks) array of priorities
+        :return: (individuals x tasks) array of task indices
+        """
+        priority = np.array(priority, dtype=float, ndmin=2)
+        for level in self.levels[1:]:
+            k = csr_positions(self.pred_ptr, level)
+            starts = np.cumsum(self.indegree[level]) - self.indegree[level]
+            highest = np.maximum.reduceat(
+                priority[:, self.pred_idx[k]], starts, axis=1)
+            priority[:, level] = np.maximum(priority[:, level], highest)
+        # Ties are broken by topological position, so predecessors with the
+        # same (raised) priority still come first
+        position = np.broadcast_to(self.position, priority.shape)
+        return np.lexsort((position, priority), axis=1)
+
+    def decode(self, machine, priority):
+        """
+        Decode a population.
+
+        :param machine: (individuals x tasks) array of machine indices
+        :param priority: (individuals x tasks) array of priorities
+        :return: (ast, aft, order) arrays, each (individuals x tasks)
+        """
+        machine = np.array(machine, dtype=np.int64, ndmin=2)
+        order = self.order(priority)
+        size = len(machine)
+        rows = np.arange(size)
+        ast = np.zeros(machine.shape)
+        aft = np.zeros(machine.shape)
+        available = np.zeros((size, self.num_machines))
+        for step in range(self.num_tasks):
+            task = order[:, step]
+            m = machine[rows, task]
+            ready = np.zeros(size)
+            lengths = self.indegree[task]
+            if lengths.any():
+                k = csr_positions(self.pred_ptr, task)
+                owner = np.repeat(rows, lengths)
+                pred = self.pred_idx[k]
+                remote = machine[owner, pred] != m[owner]
+                arrival = (aft[owner, pred]
+                           + self.comm[self.pred_edge[k]] * remote)
+                np.maximum.at(ready, owner, arrival)
+            start = np.maximum(available[rows, m], ready)
+            finish = start + self.runtimes[task, m]
+            ast[rows, task] = start
+            aft[rows, task] = finish
+            available[rows, m] = finish
+        return ast, aft, order
+
+    def fitness(self, machine, priority, objectives=('time',)):
+        """
+        Decode a population and calculate its fitness.
+
+        :return: dict of (individuals,) arrays, keyed by objective
+        """
+        machine = np.array(machine, dtype=np.int64, ndmin=2)
+        ast, aft, _ = self.decode(machine, priority)
+        return population_fitness(objectives, self.costs, machine, ast, aft)
+
+
+_WORKER_DECODER = None
+
+
+def _init_worker(decoder):
+    global _WORKER_DECODER
+    _WORKER_DECODER = decoder
+
+
+def _worker_fitness(machine, priority, objectives):
+    return _WORKER_DECODER.fitness(machine, priority, objectives)
+
+
+class _Evaluator(object):
+    """
+    Population fitness, optionally split across a pool of processes
+    """
+
+    def __init__(self, decoder, objectives, processes=None):
+        self.decoder = decoder
+        self.objectives = objectives
+        self.processes = processes
+        self._pool = None
+        if processes is not None and processes > 1:
+            self._pool = Pool(processes, initializer=_init_worker,
+                              initargs=(decoder,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __call__(self, machine, priority):
+        if self._pool is None or len(machine) < self.processes:
+            return self.decoder.fitness(machine, priority, self.objectives)
+        chunks = np.array_split(np.arange(len(machine)), self.processes)
+        results = self._pool.starmap(_worker_fitness, [
+            (machine[c], priority[c], self.objectives) for c in chunks
+        ])
+        return {
+            objective: np.concatenate([r[objective] for r in results])
+            for objective in self.objectives
+        }
+
+
+def heft_individual(workflow):
+    """
+    Chromosomes that decode to the HEFT schedule of `workflow`: the HEFT
+    mapping, with tasks prioritised by their HEFT start time.
+
+    :return: (machine, priority) arrays
+    """
+    solution = compiled_heft(workflow)
+    priority = np.empty(workflow.num_tasks)
+    priority[np.lexsort((solution.aft, solution.ast))] = (
+        np.arange(workflow.num_tasks) / max(workflow.num_tasks, 1))
+    return np.asarray(solution.machine, dtype=np.int64), priority
+
+
+def _tournament(rng, fitness, count):
+    """
+    Indices of `count` winners of binary tournaments (lower fitness wins)
+    """
+    contenders = rng.integers(0, len(fitness), size=(count, 2))
+    first_wins = fitness[contenders[:, 0]] <= fitness[contenders[:, 1]]
+    return np.where(first_wins, contenders[:, 0], contenders[:, 1])
+
+
+def _offspring(rng, machine, priority, parents, num_machines,
+               crossover_rate, mutation_rate):
+    """
+    Uniform crossover of consecutive pairs of parents, followed by
+    mutation: machine genes are reassigned at random, and priority genes
+    receive Gaussian noise.
+    """
+    first, second = parents[0::2], parents[1::2]
+    count = min(len(first), len(second))
+    first, second = first[:count], second[:count]
+    shape = (count, machine.shape[1])
+    swap = rng.random(shape) < 0.5
+    swap &= (rng.random(count) < crossover_rate)[:, None]
+    children_m = np.concatenate([
+        np.where(swap, machine[second], machine[first]),
+        np.where(swap, machine[first], machine[second])
+    ])
+    children_p = np.concatenate([
+        np.where(swap, priority[second], priority[first]),
+        np.where(swap, priority[first], priority[second])
+    ])
+    mutate = rng.random(children_m.shape) < mutation_rate
+    children_m[mutate] = rng.integers(0, num_machines, size=mutate.sum())
+    mutate = rng.random(children_p.shape) < mutation_rate
+    children_p[mutate] += rng.normal(0, 0.1, size=mutate.sum())
+    return children_m, children_p
+
+
+def ga(workflow, population=100, generations=100, objective='time',
+       crossover_rate=0.9, mutation_rate=None, elite=2, seed=None,
+       heft_seed=True, processes=None):
+    """
+    Genetic algorithm over the (machine, priority) encoding.
+
+    Each generation keeps the `elite` fittest individuals, and fills the
+    rest of the population with the offspring of parents chosen by binary
+    tournament.
+
+    :param workflow: Workflow or CompiledWorkflow to schedule
+    :param population: Number of individuals
+    :param generations: Number of generations
+    :param objective: 'time' (makespan) or 'cost' (see fitness.py)
+    :param crossover_rate: Probability that a pair of parents is crossed
+    :param mutation_rate: Probability that each gene is mutated (defaults
+        to 1 / number of tasks)
+    :param elite: Number of individuals kept unchanged in each generation
+    :param seed: Seed for numpy.random.default_rng
+    :param heft_seed: If True, the HEFT schedule is in the first population
+    :param processes: If greater than 1, the fitness of each population is
+        evaluated in this many processes
+    :return: The best Solution found (or CompiledSolution, if `workflow` is
+        a CompiledWorkflow)
+    """
+    if workflow.env is None:
+        raise RuntimeError("Workflow environment is not initialised")
+    compiled = workflow
+    if not isinstance(workflow, CompiledWorkflow):
+        compiled = workflow.compile()
+    decoder = PopulationDecoder(compiled)
+    rng = np.random.default_rng(seed)
+    num_tasks, num_machines = decoder.num_tasks, decoder.num_machines
+    if mutation_rate is None:
+        mutation_rate = 1 / max(num_tasks, 1)
+    elite = min(elite, population)
+
+    machine = rng.integers(0, num_machines, size=(population, num_tasks))
+    priority = rng.random((population, num_tasks))
+    if heft_seed:
+        machine[0], priority[0] = heft_individual(compiled)
+
+    with _Evaluator(decoder, (objective,), processes) as evaluate:
+        fitness = evaluate(machine, priority)[objective]
+        for generation in range(generations):
+            best = np.argsort(fitness, kind='stable')[:elite]
+            parents = _tournament(rng, fitness, 2 * (population - elite))
+            children_m, children_p = _offspring(
+                rng, machine, priority, parents, num_machines,
+                crossover_rate, mutation_rate
+            )
+            children_m = children_m[:population - elite]
+            children_p = children_p[:population - elite]
+            machine = np.concatenate([machine[best], children_m])
+            priority = np.concatenate([priority[best], children_p])
+            fitness = np.concatenate([
+                fitness[best], evaluate(children_m, children_p)[objective]
+            ])
+            LOGGER.debug("Generation %d: best %s %s", generation, objective,
+                         fitness.min())
+
+    best = int(np.argmin(fitness))
+    return _solution(workflow, compiled, machine[best], priority[best])
+
+
+def _solution(workflow, compiled, machine, priority):
+    """
+    Decode one individual into a CompiledSolution, or a Solution if
+    `workflow` was not compiled
+    """
+    result = ScheduleDecoder(compiled).decode(machine, priority)
+    solution = CompiledSolution(compiled, result.machine, result.ast,
+                                result.aft, result.order, result.makespan)
+    if compiled is workflow:
+        return solution
+    return solution.to_solution()
+
+
+def non_dominated_sort(objectives, block=1024):
+    """
+    Rank each point by the Pareto front it is on (0 is non-dominated).
+    Point a dominates b if it is no worse in every objective (lower is
+    better), and better in at least one.
+
+    Dominance is evaluated with array operations, `block` points at a
+    time, so memory use is O(block x points).
+
+    :param objectives: (points x objectives) array
+    :return: Integer array of front ranks
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    size = len(objectives)
+
+    def dominated_counts(points):
+        counts = np.zeros(size, dtype=np.int64)
+        for first in range(0, len(points), block):
+            rows = objectives[points[first:first + block]]
+            no_worse = np.ones((len(rows), size), dtype=bool)
+            better = np.zeros((len(rows), size), dtype=bool)
+            for column, values in zip(rows.T, objectives.T):
+                no_worse &= column[:, None] <= values
+                better |= column[:, None] < values
+            counts += (no_worse & better).sum(axis=0)
+        return counts
+
+    remaining = dominated_counts(np.arange(size))
+    rank = np.full(size, -1, dtype=np.int64)
+    front = np.flatnonzero(remaining == 0)
+    current = 0
+    while len(front):
+        rank[front] = current
+        remaining -= dominated_counts(front)
+        front = np.flatnonzero((remaining == 0) & (rank < 0))
+        current += 1
+    return rank
+
+
+def crowding_distance(objectives, rank):
+    """
+    Crowding distance (Deb et al. 2002) of each point within its front,
+    calculated for every front at once. The points at either end of a
+    front have an infinite distance.
+
+    :param objectives: (points x objectives) array
+    :param rank: Front rank of each point (see non_dominated_sort)
+    :return: Array of crowding distances
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    size = len(objectives)
+    distance = np.zeros(size)
+    if size == 0:
+        return distance
+    for values in objectives.T:
+        order = np.lexsort((values, rank))
+        front, value = rank[order], values[order]
+        first = np.ones(size, dtype=bool)
+        first[1:] = front[1:] != front[:-1]
+        last = np.ones(size, dtype=bool)
+        last[:-1] = front[:-1] != front[1:]
+        starts = np.flatnonzero(first)
+        lengths = np.diff(np.append(starts, size))
+        spread = np.repeat(np.maximum.reduceat(value, starts)
+                           - np.minimum.reduceat(value, starts), lengths)
+        gap = np.zeros(size)
+        inner = ~(first | last) & (spread > 0)
+        gap[inner] = ((value[2:] - value[:-2])[inner[1:-1]]
+                      / spread[inner])
+        gap[first | last] = np.inf
+        distance[order] += gap
+    return distance
+
+
+def _crowded_tournament(rng, rank, distance, count):
+    """
+    Indices of `count` winners of binary tournaments, by lower front rank
+    and then by larger crowding distance
+    """
+    contenders = rng.integers(0, len(rank), size=(count, 2))
+    a, b = contenders[:, 0], contenders[:, 1]
+    first_wins = (rank[a] < rank[b]) | (
+        (rank[a] == rank[b]) & (distance[a] >= distance[b]))
+    return np.where(first_wins, a, b)
+
+
+def _survivors(objectives, count):
+    """
+    NSGA-II environmental selection: the `count` best points by front,
+    and then by crowding distance
+    """
+    rank = non_dominated_sort(objectives)
+    distance = crowding_distance(objectives, rank)
+    survivors = np.lexsort((-distance, rank))[:count]
+    return survivors, rank[survivors], distance[survivors]
+
+
+def _select(machine, priority, values, count):
+    """
+    The surviving `count` individuals of a population (see `_survivors`),
+    with the front rank and crowding distance of each, all in the same
+    (survivor) order
+    """
+    survivors, rank, distance = _survivors(values, count)
+    return (machine[survivors], priority[survivors], values[survivors],
+            rank, distance)
+
+
+class ParetoArchive(object):
+    """
+    Bounded archive of the non-dominated individuals found during a
+    search. When the archive is full, the most crowded individuals are
+    dropped.
+
+    :param size: Maximum number of individuals
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.machine = None
+        self.priority = None
+        self.objectives = None
+
+    def __len__(self):
+        return 0 if self.objectives is None else len(self.objectives)
+
+    def update(self, machine, priority, objectives):
+        """
+        Add a population to the archive, keeping only the non-dominated
+        individuals (one per distinct objective vector)
+        """
+        if self.objectives is not None:
+            machine = np.concatenate([self.machine, machine])
+            priority = np.concatenate([self.priority, priority])
+            objectives = np.concatenate([self.objectives, objectives])
+        _, unique = np.unique(objectives, axis=0, return_index=True)
+        unique = np.sort(unique)
+        front = unique[non_dominated_sort(objectives[unique]) == 0]
+        while len(front) > self.size:
+            # Drop the most crowded individual, then recalculate
+            distance = crowding_distance(objectives[front],
+                                         np.zeros(len(front), dtype=int))
+            front = np.delete(front, np.argmin(distance))
+        self.machine = machine[front]
+        self.priority = priority[front]
+        self.objectives = objectives[front]
+
+
+def nsga2(workflow, population=100, generations=100,
+          objectives=('time', 'cost'), crossover_rate=0.9,
+          mutation_rate=None, archive_size=None, seed=None, heft_seed=True,
+          processes=None):
+    """
+    NSGA-II (Deb et al. 2002) multi-objective search over the (machine,
+    priority) encoding.
+
+    Each generation, the offspring of parents chosen by crowded binary
+    tournament are added to the population, and the best `population` of
+    the combined individuals (by front, then crowding distance) survive.
+    Non-dominated individuals are kept in a bounded ParetoArchive.
+
+    :param workflow: Workflow or CompiledWorkflow to schedule
+    :param population: Number of individuals
+    :param generations: Number of generations
+    :param objectives: Objectives to minimise (see fitness.py)
+    :param crossover_rate: Probability that a pair of parents is crossed
+    :param mutation_rate: Probability that each gene is mutated (defaults
+        to 1 / number of tasks)
+    :param archive_size: Maximum size of the Pareto front returned
+        (defaults to `population`)
+    :param seed: Seed for numpy.random.default_rng
+    :param heft_seed: If True, the HEFT schedule is in the first population
+    :param processes: If greater than 1, the fitness of each population is
+        evaluated in this many processes
+    :return: List of Solutions (or CompiledSolutions, if `workflow` is a
+        CompiledWorkflow) on the Pareto front, in order of the first
+        objective
+    """
+    if workflow.env is None:
+        raise RuntimeError("Workflow environment is not initialised")
+    compiled = workflow
+    if not isinstance(workflow, CompiledWorkflow):
+        compiled = workflow.compile()
+    decoder = PopulationDecoder(compiled)
+    rng = np.random.default_rng(seed)
+    num_tasks, num_machines = decoder.num_tasks, decoder.num_machines
+    if mutation_rate is None:
+        mutation_rate = 1 / max(num_tasks, 1)
+    archive = ParetoArchive(archive_size or population)
+    objectives = tuple(objectives)
+
+    machine = rng.integers(0, num_machines, size=(population, num_tasks))
+    priority = rng.random((population, num_tasks))
+    if heft_seed:
+        machine[0], priority[0] = heft_individual(compiled)
+
+    with _Evaluator(decoder, objectives, processes) as evaluate:
+
+        def fitness(machine, priority):
+            values = evaluate(machine, priority)
+            return np.column_stack([values[o] for o in objectives])
+
+        values = fitness(machine, priority)
+        archive.update(machine, priority, values)
+        machine, priority, values, rank, distance = _select(
+            machine, priority, values, population)
+        for generation in range(generations):
+            parents = _crowded_tournament(rng, rank, distance, population)
+            children_m, children_p = _offspring(
+                rng, machine, priority, parents, num_machines,
+                crossover_rate, mutation_rate
+            )
+            children_values = fitness(children_m, children_p)
+            archive.update(children_m, children_p, children_values)
+            machine = np.concatenate([machine, children_m])
+            priority = np.concatenate([priority, children_p])
+            values = np.concatenate([values, children_values])
+            machine, priority, values, rank, distance = _select(
+                machine, priority, values, population)
+            LOGGER.debug("Generation %d: %d individuals in the archive",
+                         generation, len(archive))
+
+    front = np.lexsort(archive.objectives.T[::-1])
+    return [
+        _solution(workflow, compiled, archive.machine[k],
+                  archive.priority[k])
+        for k in front
+    ]
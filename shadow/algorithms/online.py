@@ -0,0 +1,233 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Online scheduling of workflows whose tasks arrive over time.
+
+The heuristics in shadow.algorithms.heuristic need the whole workflow
+before they start. OnlineScheduler instead receives the workflow as a
+stream of events:
+
+* `add_task` and `add_edge` as tasks (and their dependencies) become
+  known;
+* `task_completed` when a running task finishes.
+
+A task is ready once every one of its predecessors has completed. Ready
+tasks are allocated, in the order they became ready, with the same
+insertion-based earliest-finish-time policy as HEFT. The Solution (with
+the machine timelines and their free-slot indices) is kept between events,
+so each event only costs the allocation of the tasks it makes ready.
+
+    scheduler = OnlineScheduler(env)
+    scheduler.add_task('a', comp=1000)
+    scheduler.add_task('b', comp=2000)
+    scheduler.add_edge('a', 'b', transfer_data=10)
+    scheduler.allocate()            # allocates 'a'
+    scheduler.task_completed('a')   # allocates 'b'
+"""
+
+import logging
+from collections import deque
+
+import networkx as nx
+import numpy as np
+
+from shadow.models.compiled import calc_runtime_matrix, calc_transfer_times
+from shadow.models.globals import WORKFLOW_DATASIZE, WORKFLOW_EDGE
+from shadow.models.solution import Solution
+from shadow.models.workflow import Task
+
+LOGGER = logging.getLogger(__name__)
+
+
+class OnlineScheduler(object):
+    """
+    Event-driven scheduler for workflows that are not known in advance.
+
+    :param environment: Environment on which tasks are scheduled
+    :param time: If True, the `comp` of each task is a list of
+        pre-calculated runtimes (one per machine) rather than FLOPs
+    :param taskobj: Class used to create the Task object for each task
+
+    Attributes
+    ----------
+    graph : networkx.DiGraph
+        The tasks and edges received so far
+    solution : Solution
+        Allocations made so far
+    time : int
+        Latest completion time reported; tasks are not started earlier
+    """
+
+    def __init__(self, environment, time=False, taskobj=Task):
+        self.env = environment
+        self.graph = nx.DiGraph()
+        self.solution = Solution(environment.machines)
+        self.time = 0
+        self._pre_compute = time
+        self._taskobj = taskobj
+        self._tasks = {}
+        self._runtimes = {}
+        self._completed = set()
+        # Number of predecessors of each task that have not completed
+        self._waiting = {}
+        self._ready = deque()
+        # Data and communication time of each edge, indexed by the
+        # WORKFLOW_EDGE attribute of the edge (see comm)
+        self._transfer_data = []
+        self._comm = []
+        self._comm_version = environment.bandwidth_version
+
+    @property
+    def makespan(self):
+        return self.solution.makespan
+
+    @property
+    def comm(self):
+        """
+        Communication time of each edge received so far, recalculated if
+        the bandwidth of the environment changes
+        """
+        if self._comm_version != self.env.bandwidth_version:
+            self._comm = calc_transfer_times(
+                np.array(self._transfer_data, dtype=float),
+                self.env.system_bandwith
+            ).tolist()
+            self._comm_version = self.env.bandwidth_version
+        return self._comm
+
+    def add_task(self, tid, comp, task_data=0):
+        """
+        Add a task to the workflow. A task without (incomplete)
+        predecessors is ready, and is allocated at the next call to
+        `allocate` or `task_completed`.
+
+        :param tid: Task id
+        :param comp: FLOP demand of the task, or its runtime on each
+            machine if the scheduler was created with time=True
+        :param task_data: Data (IO) demand of the task
+        :return: The new Task
+        """
+        if tid in self._tasks:
+            raise ValueError("Task {0} already exists".format(tid))
+        task = self._taskobj(tid, comp, task_data, self._pre_compute)
+        task.index = len(self._tasks)
+        self._runtimes[task] = calc_runtime_matrix(
+            np.array([comp]), np.array([task_data or 0], dtype=float),
+            self.env.machines, self._pre_compute
+        )[0].tolist()
+        self._tasks[tid] = task
+        self.graph.add_node(task, comp=comp, task_data=task_data)
+        self._waiting[task] = 0
+        self._ready.append(task)
+        return task
+
+    def add_edge(self, source, target, transfer_data=0):
+        """
+        Add a dependency between two tasks that have already been added.
+        The target must not have been allocated yet.
+        """
+        u, v = self._tasks[source], self._tasks[target]
+        if v in self.solution.task_allocations:
+            raise RuntimeError(
+                "Task {0} has already been allocated".format(target))
+        comm = self.comm
+        cost = calc_transfer_times(
+            np.array([transfer_data], dtype=float), self.env.system_bandwith
+        )[0].item()
+        attr = self.graph.get_edge_data(u, v)
+        if attr is not None:
+            e = attr[WORKFLOW_EDGE]
+            self._transfer_data[e], comm[e] = transfer_data, cost
+            attr[WORKFLOW_DATASIZE] = transfer_data
+            return
+        self.graph.add_edge(u, v, **{WORKFLOW_DATASIZE: transfer_data,
+                                     WORKFLOW_EDGE: len(comm)})
+        self._transfer_data.append(transfer_data)
+        comm.append(cost)
+        if u not in self._completed:
+            self._waiting[v] += 1
+
+    def task_completed(self, tid, finish=None):
+        """
+        Record that a task has finished, and allocate the tasks this makes
+        ready.
+
+        :param tid: Task id
+        :param finish: Actual finish time of the task. If this differs from
+            its allocated finish time, the allocations that depend on it are
+            updated (see Solution.reschedule).
+        :return: List of the Allocations made
+        """
+        task = self._tasks[tid]
+        alloc = self.solution.task_allocations.get(task)
+        if alloc is None:
+            raise RuntimeError("Task {0} has not been allocated".format(tid))
+        if task in self._completed:
+            raise RuntimeError("Task {0} has already completed".format(tid))
+        if finish is not None and finish != alloc.aft:
+            self.solution.reschedule(self, task, finish=finish)
+        self._completed.add(task)
+        self.time = max(self.time, alloc.aft)
+        for successor in self.graph.successors(task):
+            self._waiting[successor] -= 1
+            if self._waiting[successor] == 0:
+                self._ready.append(successor)
+        return self.allocate()
+
+    def allocate(self):
+        """
+        Allocate every ready task, in the order the tasks became ready, to
+        the machine on which it finishes earliest.
+
+        :return: List of the Allocations made
+        """
+        allocations = []
+        while self._ready:
+            task = self._ready.popleft()
+            if (self._waiting[task] > 0
+                    or task in self.solution.task_allocations):
+                # An edge was added to the task after it became ready
+                continue
+            allocations.append(self._allocate(task))
+        return allocations
+
+    def _allocate(self, task):
+        runtime = self._runtimes[task]
+        comm = self.comm
+        inputs = []
+        for pretask, attr in self.graph.pred[task].items():
+            pre_alloc = self.solution.task_allocations[pretask]
+            inputs.append(
+                (pre_alloc.machine, pre_alloc.aft, comm[attr[WORKFLOW_EDGE]]))
+
+        aft, m = -1, None
+        for machine in self.env.machines:
+            est = self.time
+            for pre_machine, pre_aft, comm_cost in inputs:
+                if pre_machine != machine:
+                    pre_aft += comm_cost
+                if pre_aft > est:
+                    est = pre_aft
+            duration = runtime[machine.index]
+            est = self.solution.earliest_start(machine, est, duration)
+            if aft == -1 or est + duration < aft:
+                aft, m = est + duration, machine
+        ast = aft - runtime[m.index]
+        task.machine = m
+        self.solution.add_allocation(task=task, machine=m, ast=ast, aft=aft)
+        self.solution.makespan = max(self.solution.makespan, aft)
+        LOGGER.debug("Allocated %s to %s (%s, %s)", task, m, ast, aft)
+        return self.solution.task_allocations[task]
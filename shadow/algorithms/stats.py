@@ -0,0 +1,125 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Instrumentation for the list-scheduling heuristics.
+
+`heft`, `pheft` and `fcfs` (and their compiled forms) accept a
+SchedulerStats object, which records the wall-clock and CPU time of each
+phase of the heuristic and counts the work done on the allocation hot
+path. The stats object is also attached to the returned solution:
+
+    stats = SchedulerStats()
+    solution = heft(workflow, stats=stats)
+    solution.stats.phases['allocation'].wall
+    stats.as_dict()
+
+Without a stats object, the heuristics skip the timing and use the
+uninstrumented free-slot index, so there is no overhead.
+"""
+
+import time
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+
+PhaseTime = namedtuple('PhaseTime', ['wall', 'cpu'])
+
+
+class SchedulerStats(object):
+    """
+    Phase timings and hot-path counters of a scheduling heuristic.
+
+    Attributes
+    ----------
+    phases : dict
+        PhaseTime (wall-clock and CPU seconds) of each phase, keyed by the
+        name of the phase ('ranking', 'sorting' or 'allocation'). Times
+        of a phase that runs more than once are summed.
+    eft_probes : int
+        Number of (task, machine) pairs for which a start time was
+        calculated
+    gaps_scanned : int
+        Number of idle gaps visited while searching for a free slot on a
+        machine (see shadow.models.intervals.CountingSlotIndex)
+    allocation_sorts : int
+        Number of times the allocation list of a machine was sorted
+    peak_allocations : dict
+        Largest number of allocations held by each machine, keyed by
+        machine id
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.eft_probes = 0
+        self.gaps_scanned = 0
+        self.allocation_sorts = 0
+        self.peak_allocations = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time the body of a `with` statement as the phase `name`
+        """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield self
+        finally:
+            previous = self.phases.get(name, PhaseTime(0.0, 0.0))
+            self.phases[name] = PhaseTime(
+                previous.wall + time.perf_counter() - wall,
+                previous.cpu + time.process_time() - cpu
+            )
+
+    def record_allocations(self, counts):
+        """
+        Update the peak allocation counts from the number of allocations
+        on each machine
+
+        :param counts: Iterable of (machine id, number of allocations)
+        """
+        for mid, count in counts:
+            if count > self.peak_allocations.get(mid, 0):
+                self.peak_allocations[mid] = count
+
+    def as_dict(self):
+        """
+        The statistics as a JSON-serialisable dictionary
+        """
+        return {
+            'phases': {name: phase._asdict()
+                       for name, phase in self.phases.items()},
+            'eft_probes': self.eft_probes,
+            'gaps_scanned': self.gaps_scanned,
+            'allocation_sorts': self.allocation_sorts,
+            'peak_allocations': dict(self.peak_allocations)
+        }
+
+    def __repr__(self):
+        phases = ', '.join('{0}={1:.3f}s'.format(name, phase.wall)
+                           for name, phase in self.phases.items())
+        return ("SchedulerStats({0}; eft_probes={1}, gaps_scanned={2}, "
+                "allocation_sorts={3})".format(
+                    phases, self.eft_probes, self.gaps_scanned,
+                    self.allocation_sorts))
+
+
+def phase(stats, name):
+    """
+    `stats.phase(name)`, or a context manager that does nothing if `stats`
+    is None
+    """
+    if stats is None:
+        return nullcontext()
+    return stats.phase(name)
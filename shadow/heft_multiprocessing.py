@@ -13,43 +13,43 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+"""
+Schedule a set of workflow files on an environment in parallel.
+
+    python -m shadow.heft_multiprocessing shadow_config.json wf1.json \
+        wf2.json --processes 4
+
+This is a command-line wrapper around shadow.algorithms.batch; use
+`schedule_many` or `BatchScheduler` directly from Python.
+"""
+
+import argparse
 import time
-from copy import deepcopy
-from pathlib import Path
-from multiprocessing import Pool
-from shadow.models.workflow import Workflow
-from shadow.models.environment import Environment
-from shadow.algorithms.heuristic import heft
 
+from shadow.algorithms.batch import BatchScheduler, ALGORITHMS
+from shadow.models.environment import Environment
 
-def run_workflow(workflow, environment):
-    workflow.add_environment(environment)
-    return heft(workflow)
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Schedule workflows in parallel')
+    parser.add_argument('environment', help='Environment config file')
+    parser.add_argument('workflows', nargs='+', help='Workflow files')
+    parser.add_argument('--algorithm', default='heft',
+                        choices=sorted(ALGORITHMS))
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args(argv)
 
-if __name__ == '__main__':
-    env = Environment("/home/rwb/github/thesis_experiments/"
-        "notebooks/sdp_comparison/output/shadow_config.json")
-    # files = list(wf_path.iterdir())
-    wfs = [
-        Workflow("/home/rwb/github/thesis_experiments/skaworkflows_tests"
-                 "/workflows/hpso01_time-3600_channels-256_tel-512.json") for i
-        in range(3)
-    ]
-    environs = [deepcopy(env) for i in range(3)]
-
-    params = list(zip(wfs, environs))
+    env = Environment(args.environment)
     start = time.time()
-    with Pool(processes=4) as pool:
-        result = pool.starmap(run_workflow, params)
+    with BatchScheduler(processes=args.processes) as scheduler:
+        results = scheduler.schedule_many(args.workflows, env, args.algorithm)
     finish = time.time()
+    for path, result in zip(args.workflows, results):
+        print(f"{path}: makespan={result.makespan} cost={result.cost}")
     print(f"{finish-start=}")
+    return results
 
-    # start = time.time()
-    # for x in range(3):
-    #     workflow = Workflow("/home/rwb/github/thesis_experiments/skaworkflows_tests"
-    #                  "/workflows/hpso01_time-3600_channels-256_tel-512.json")
-    #     workflow.add_environment(env)
-    #     print(heft(workflow))
-    # finish = time.time()
-    # print(f"{finish-start=}")
+
+if __name__ == '__main__':
+    main()
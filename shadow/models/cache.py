@@ -0,0 +1,174 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+On-disk binary cache for parsed workflow and environment files.
+
+When caching is enabled (e.g. `Workflow(config, cache=True)`), the arrays
+parsed from `config` are saved to a sidecar directory next to it,
+`<config>.cache/`, as one .npy file per array plus a `meta.json`
+describing the source file. Later loads memory-map the .npy files instead
+of re-parsing the JSON.
+
+A sidecar is only used if it was written for the same (absolute) path and
+the source file is unchanged: if its size and modification time match the
+sidecar is used directly; otherwise the content hash of the file is
+compared with the one stored in the sidecar.
+"""
+
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+CACHE_SUFFIX = '.cache'
+CACHE_VERSION = 1
+_META = 'meta.json'
+
+
+def cache_path(config):
+    """
+    :param config: Path to the workflow or environment file
+    :return: Path of the sidecar directory for `config`
+    """
+    return "{0}{1}".format(config, CACHE_SUFFIX)
+
+
+def file_hash(config, blocksize=1 << 20):
+    """
+    SHA-1 content hash of the file at `config`
+    """
+    digest = hashlib.sha1()
+    with open(config, 'rb') as infile:
+        for block in iter(lambda: infile.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_stat(config):
+    stat = os.stat(config)
+    return {
+        'path': os.path.abspath(config),
+        'mtime': stat.st_mtime_ns,
+        'size': stat.st_size
+    }
+
+
+def read_cache(config, kind):
+    """
+    Memory-map the cached arrays for `config`, if a valid sidecar exists.
+
+    :param config: Path to the workflow or environment file
+    :param kind: The kind of object that was cached ('workflow' or
+        'environment')
+    :return: (meta, arrays) pair, where `arrays` maps array names to
+        read-only memory-mapped arrays; or None if there is no valid cache.
+    """
+    directory = cache_path(config)
+    meta_path = os.path.join(directory, _META)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r') as infile:
+        meta = json.load(infile)
+    source = _source_stat(config)
+    if (meta.get('version') != CACHE_VERSION or meta.get('kind') != kind
+            or meta['source']['path'] != source['path']):
+        return None
+    if (meta['source']['mtime'] != source['mtime']
+            or meta['source']['size'] != source['size']):
+        if meta['source']['sha1'] != file_hash(config):
+            LOGGER.debug('Cache for %s is out of date', config)
+            return None
+        # The file has been touched, but not changed
+        source['sha1'] = meta['source']['sha1']
+        meta['source'] = source
+        _write_meta(directory, meta)
+    arrays = {
+        name: np.load(os.path.join(directory, '{0}.npy'.format(name)),
+                      mmap_mode='r')
+        for name in meta['arrays']
+    }
+    LOGGER.debug('Loaded %s from cache %s', config, directory)
+    return meta, arrays
+
+
+def write_cache(config, kind, arrays, **attrs):
+    """
+    Save `arrays` to the sidecar directory of `config`.
+
+    :param config: Path to the workflow or environment file the arrays were
+        parsed from
+    :param kind: The kind of object being cached ('workflow' or
+        'environment')
+    :param arrays: Dictionary of array names to numeric or string arrays
+    :param attrs: Additional (JSON-serialisable) values to store in the
+        sidecar metadata
+    :return: True if the cache was written
+    """
+    arrays = {name: np.asarray(value) for name, value in arrays.items()}
+    for name, value in arrays.items():
+        if value.dtype == object:
+            LOGGER.warning(
+                'Unable to cache %s: %s cannot be stored as a flat array',
+                config, name)
+            return False
+    directory = cache_path(config)
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, _META)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    for name, value in arrays.items():
+        np.save(os.path.join(directory, '{0}.npy'.format(name)), value)
+    source = _source_stat(config)
+    source['sha1'] = file_hash(config)
+    meta = {
+        'version': CACHE_VERSION,
+        'kind': kind,
+        'source': source,
+        'arrays': sorted(arrays),
+        'attrs': attrs
+    }
+    # The metadata is written last, so an incomplete cache is never read
+    _write_meta(directory, meta)
+    return True
+
+
+def _write_meta(directory, meta):
+    tmp_path = os.path.join(directory, '{0}.tmp'.format(_META))
+    with open(tmp_path, 'w') as outfile:
+        json.dump(meta, outfile, indent=2)
+    os.replace(tmp_path, os.path.join(directory, _META))
+
+
+def workflow_arrays(compiled):
+    """
+    The arrays of a CompiledWorkflow that are saved in a workflow cache
+    """
+    tids = compiled.tids
+    if len(set(type(tid) for tid in tids)) > 1:
+        # Mixed id types would be coerced to a common type by NumPy
+        tids = np.array(tids, dtype=object)
+    return {
+        'tids': tids,
+        'comp': compiled.comp,
+        'task_data': compiled.task_data,
+        'succ_ptr': compiled.succ_ptr,
+        'succ_idx': compiled.succ_idx,
+        'transfer_data': compiled.transfer_data
+    }
@@ -0,0 +1,559 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Array-backed ('compiled') representation of a Workflow.
+
+The networkx graph used by shadow.models.workflow.Workflow is convenient to
+build and inspect, but traversing it (predecessors, successors, edge
+attribute dictionaries) dominates scheduling time on large workflows. A
+CompiledWorkflow is built once from a Workflow and stores the same structure
+as flat NumPy arrays:
+
+* Tasks are referred to by their integer index (their position in the
+  original graph's node order); `tids` maps an index back to the task id.
+* Successors and predecessors are stored in CSR (compressed sparse row)
+  form; edge `e` in the successor arrays has transfer data
+  `transfer_data[e]`, and `pred_edge` maps predecessor entries back onto
+  these edge indices.
+
+Heuristics in shadow.algorithms.heuristic accept a CompiledWorkflow in place
+of a Workflow and return a CompiledSolution, which may be converted back to
+a Solution with `CompiledSolution.to_solution()`.
+"""
+
+import operator
+
+import numpy as np
+
+from shadow.models.globals import WORKFLOW_DATASIZE
+from shadow.models.solution import Solution
+
+
+def calc_runtime_matrix(comp, task_data, machines, time=False):
+    """
+    Calculate the runtime of every task on every machine in one pass.
+
+    Parameters
+    ----------
+    comp : numpy.ndarray
+        The 'comp' value of each task. If `time` is True, this is a
+        (tasks x machines) array of pre-calculated runtimes; otherwise it
+        is the FLOP demand of each task.
+    task_data : numpy.ndarray
+        The data (IO) demand of each task
+    machines : list
+        Machine objects in the environment
+    time : bool
+        Whether `comp` is time-based (pre-calculated) or FLOP-based
+
+    Returns
+    -------
+    runtimes : numpy.ndarray
+        (tasks x machines) array of task runtimes
+
+    Notes
+    -----
+    For FLOP-based workflows this is the vectorised equivalent of
+    `Task.calc_runtime`: the runtime is the larger of the (rounded) compute
+    and IO times, and the compute time is never less than 1.
+    """
+    if time:
+        if comp.ndim != 2:
+            raise TypeError(
+                "Computation costs should be an array, but instead are "
+                "scalar values. Check your configuration files"
+            )
+        if comp.shape[1] != len(machines):
+            raise RuntimeError(
+                "Number of computation costs ({0}) does not match the number "
+                "of machines ({1})".format(comp.shape[1], len(machines))
+            )
+        return comp
+
+    compute, data = _compute_and_io_times(comp, task_data, machines)
+    return np.maximum(np.maximum(compute, 1), data)
+
+
+def _compute_and_io_times(comp, task_data, machines):
+    """
+    Rounded compute and IO times of each task on each machine, without
+    the minimum compute time of `calc_runtime_matrix`. The IO time is 0 on
+    machines that have no IO rate.
+    """
+    flops = np.array([m.flops for m in machines], dtype=float)
+    iorate = np.array([m.iorate for m in machines], dtype=float)
+    compute = np.round(comp[:, np.newaxis] / flops).astype(np.int64)
+    data = np.zeros_like(compute)
+    has_rate = iorate > 0
+    if has_rate.any():
+        data[:, has_rate] = np.round(
+            task_data[:, np.newaxis] / iorate[has_rate]
+        ).astype(np.int64)
+    return compute, data
+
+
+def calc_average_runtimes(comp, task_data, machines, weights=None):
+    """
+    Average runtime of each FLOP-based task over the machines.
+
+    Parameters
+    ----------
+    comp : numpy.ndarray
+        The FLOP demand of each task
+    task_data : numpy.ndarray
+        The data (IO) demand of each task
+    machines : list
+        Machine objects in the environment
+    weights : numpy.ndarray
+        Optional weight of each machine (e.g. the size of its class)
+
+    Notes
+    -----
+    This is not the mean of the runtime matrix: the average compute time
+    and the average IO time are calculated separately, and the larger of
+    the two is the average runtime. Compute times are not rounded up to 1.
+    """
+    compute, data = _compute_and_io_times(comp, task_data, machines)
+    return np.maximum(np.average(compute, axis=1, weights=weights),
+                      np.average(data, axis=1, weights=weights))
+
+
+def calc_minimum_runtime(flops, data, machines):
+    """
+    Minimum runtime of a FLOP-based task, from the machine with the most
+    FLOP/s (the first, if several have the same) and the machine with the
+    highest IO rate. Both times are at least 1, and the larger of the two
+    is the bottleneck, so it is the one returned.
+
+    :return: (machine index, runtime)
+    """
+    flops_machine = max(machines, key=operator.attrgetter('flops'))
+    compute = max(int(np.round(flops / flops_machine.flops)), 1)
+    if flops_machine.iorate:
+        io_machine = max(machines, key=operator.attrgetter('iorate'))
+        io = max(int(np.round(data / io_machine.iorate)), 1)
+        if io > compute:
+            return io_machine.index, io
+    return flops_machine.index, compute
+
+
+def calc_maximum_runtime(flops, data, machines):
+    """
+    Maximum runtime of a FLOP-based task, from the machine with the fewest
+    FLOP/s and the machine with the lowest IO rate (the IO time is 0 if
+    that rate is 0). The larger of the two times is returned.
+
+    :return: (machine index, runtime)
+    """
+    flops_machine = min(machines, key=operator.attrgetter('flops'))
+    io_machine = min(machines, key=operator.attrgetter('iorate'))
+    compute = int(np.round(flops / flops_machine.flops))
+    io = 0
+    if io_machine.iorate:
+        io = int(np.round(data / io_machine.iorate))
+    if compute > io:
+        return flops_machine.index, compute
+    return io_machine.index, io
+
+
+def calc_environment_runtimes(comp, task_data, environment, time=False):
+    """
+    Calculate the runtime matrix of a set of tasks in an environment, and
+    the average runtime of each task over all machines.
+
+    If the environment's machines have been collapsed into classes (see
+    Environment.collapse_machines), runtimes are only calculated for one
+    machine in each class, and averages are weighted by class size.
+
+    :return: (runtimes, ave_runtimes) where `runtimes` is a (tasks x
+        machines) array and `ave_runtimes` has one entry per task.
+    """
+    classes = environment.machine_classes
+    if not classes:
+        runtimes = calc_runtime_matrix(
+            comp, task_data, environment.machines, time
+        )
+        if time:
+            return runtimes, runtimes.mean(axis=1)
+        return runtimes, calc_average_runtimes(
+            comp, task_data, environment.machines)
+
+    first = [c.indices[0] for c in classes]
+    if time:
+        runtimes = calc_runtime_matrix(
+            comp, task_data, environment.machines, time
+        )
+        class_runtimes = runtimes[:, first]
+        if not np.array_equal(
+                runtimes, class_runtimes[:, environment.machine_class_index]):
+            raise RuntimeError(
+                "Pre-calculated runtimes differ between machines of the "
+                "same class; the environment cannot be collapsed"
+            )
+    else:
+        class_runtimes = calc_runtime_matrix(
+            comp, task_data, [environment.machines[i] for i in first], time
+        )
+        runtimes = class_runtimes[:, environment.machine_class_index]
+    counts = np.array([len(c) for c in classes])
+    if time:
+        ave_runtimes = (class_runtimes * counts).sum(axis=1) / counts.sum()
+    else:
+        ave_runtimes = calc_average_runtimes(
+            comp, task_data, [environment.machines[i] for i in first],
+            weights=counts)
+    return runtimes, ave_runtimes
+
+
+def calc_transfer_times(transfer_data, bandwidth):
+    """
+    Calculate the communication time of each edge, given the system
+    bandwidth. This mirrors Environment.calc_data_transfer_time.
+
+    :param transfer_data: Array of the data transferred along each edge
+    :param bandwidth: The system bandwidth of the environment
+    :return: Integer array of communication times (0 if bandwidth is 0)
+    """
+    if bandwidth > 0:
+        return np.trunc(transfer_data / bandwidth).astype(np.int64)
+    return np.zeros(len(transfer_data), dtype=np.int64)
+
+
+def _transpose_csr(num_tasks, succ_ptr, succ_idx):
+    """
+    Build the predecessor CSR arrays from the successor CSR arrays.
+
+    `pred_edge[k]` is the index (into the successor edge arrays) of the
+    edge described by predecessor entry `k`.
+    """
+    sources = np.repeat(np.arange(num_tasks), np.diff(succ_ptr))
+    pred_edge = np.argsort(succ_idx, kind='stable')
+    pred_idx = sources[pred_edge]
+    pred_ptr = np.zeros(num_tasks + 1, dtype=np.int64)
+    np.cumsum(np.bincount(succ_idx, minlength=num_tasks), out=pred_ptr[1:])
+    return pred_ptr, pred_idx, pred_edge
+
+
+def csr_positions(ptr, rows):
+    """
+    Positions of the entries of `rows` in a CSR structure with row pointer
+    `ptr`, concatenated in the order of `rows`.
+    """
+    begin = ptr[rows]
+    lengths = ptr[rows + 1] - begin
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(begin - offsets, lengths) + np.arange(lengths.sum())
+
+
+class CompiledWorkflow(object):
+    """
+    Array-backed workflow representation used on the scheduling hot path.
+
+    :param tids: Sequence of task ids, indexed by task index
+    :param comp: Computation demand (FLOPs, or per-machine runtimes if
+        `time` is True) of each task
+    :param task_data: Data (IO) demand of each task
+    :param succ_ptr: CSR row pointer for the successors of each task
+    :param succ_idx: CSR column indices (successor task indices)
+    :param transfer_data: Data transferred along each successor edge
+    :param time: True if `comp` holds pre-calculated runtimes
+    :param tasks: Optional list of Task objects, indexed by task index. This
+        is used to convert results back into Solution objects.
+    """
+
+    def __init__(self, tids, comp, task_data, succ_ptr, succ_idx,
+                 transfer_data, time=False, tasks=None):
+        self.tids = tids
+        self.tasks = tasks
+        self.time = time
+        self.comp = np.asarray(comp)
+        self.task_data = np.asarray(task_data, dtype=float)
+        self.succ_ptr = np.asarray(succ_ptr, dtype=np.int64)
+        self.succ_idx = np.asarray(succ_idx, dtype=np.int64)
+        self.transfer_data = np.asarray(transfer_data, dtype=float)
+        self.pred_ptr, self.pred_idx, self.pred_edge = _transpose_csr(
+            len(self.succ_ptr) - 1, self.succ_ptr, self.succ_idx
+        )
+
+        # Initialised when we 'add_environment'
+        self.env = None
+        self.runtimes = None
+        self.ave_runtimes = None
+        self._comm = None
+        self._comm_version = None
+
+    @classmethod
+    def from_workflow(cls, workflow):
+        """
+        Compile a Workflow into its array-backed form. Task indices follow
+        the node order of `workflow.graph`, and successors are stored in the
+        graph's adjacency order, so algorithms that walk the compiled
+        arrays visit tasks in the same order as those walking the graph.
+
+        If the workflow already has an environment, it is added to the
+        compiled workflow as well.
+        """
+        graph = workflow.graph
+        tasks = list(graph.nodes)
+        index = {task: i for i, task in enumerate(tasks)}
+        succ_ptr = np.zeros(len(tasks) + 1, dtype=np.int64)
+        succ_idx = np.empty(graph.number_of_edges(), dtype=np.int64)
+        transfer_data = np.empty(graph.number_of_edges(), dtype=float)
+        e = 0
+        for i, task in enumerate(tasks):
+            for successor, attr in graph.succ[task].items():
+                succ_idx[e] = index[successor]
+                transfer_data[e] = attr[WORKFLOW_DATASIZE]
+                e += 1
+            succ_ptr[i + 1] = e
+        comp = [graph.nodes[task]['comp'] for task in tasks]
+        task_data = [graph.nodes[task].get('task_data', 0) for task in tasks]
+        compiled = cls(
+            [task.tid for task in tasks], comp, task_data, succ_ptr,
+            succ_idx, transfer_data, time=bool(workflow._time), tasks=tasks
+        )
+        if workflow.env is not None:
+            compiled.add_environment(workflow.env, runtimes=workflow.runtimes,
+                                     ave_runtimes=workflow.ave_runtimes,
+                                     comm=workflow.comm)
+        return compiled
+
+    def __len__(self):
+        return len(self.succ_ptr) - 1
+
+    @property
+    def num_tasks(self):
+        return len(self.succ_ptr) - 1
+
+    @property
+    def num_edges(self):
+        return len(self.succ_idx)
+
+    @property
+    def comm(self):
+        """
+        Communication time of each successor edge (aligned with `succ_idx`)
+        in the environment. This is recalculated when the bandwidth of the
+        environment changes, and is None until an environment is added.
+        """
+        if (self.env is not None
+                and self._comm_version != self.env.bandwidth_version):
+            self._comm = calc_transfer_times(
+                self.transfer_data, self.env.system_bandwith
+            )
+            self._comm_version = self.env.bandwidth_version
+        return self._comm
+
+    def add_environment(self, environment, runtimes=None, ave_runtimes=None,
+                        comm=None):
+        """
+        Calculate the task runtimes and edge communication costs for the
+        environment.
+
+        :param environment: An Environment object
+        :param runtimes: Optional (tasks x machines) runtime matrix that has
+            already been calculated for this environment (e.g. by
+            Workflow.add_environment), which is shared rather than rebuilt.
+        :param ave_runtimes: Average runtime of each task, if `runtimes`
+            is given
+        :param comm: Optional communication time of each edge for the
+            environment's current bandwidth (e.g. Workflow.comm), which is
+            shared rather than rebuilt
+        :return: Non-negative return value indicates success.
+        """
+        self.env = environment
+        if runtimes is None:
+            runtimes, ave_runtimes = calc_environment_runtimes(
+                self.comp, self.task_data, environment, self.time
+            )
+        elif ave_runtimes is None and self.time:
+            ave_runtimes = runtimes.mean(axis=1)
+        elif ave_runtimes is None:
+            ave_runtimes = calc_average_runtimes(
+                self.comp, self.task_data, environment.machines)
+        self.runtimes = runtimes
+        self.ave_runtimes = ave_runtimes
+        if self.tasks is not None:
+            for task in self.tasks:
+                task._runtimes = runtimes
+        self._comm = comm
+        self._comm_version = None if comm is None else \
+            environment.bandwidth_version
+        return 0
+
+    def successors(self, i):
+        return self.succ_idx[self.succ_ptr[i]:self.succ_ptr[i + 1]]
+
+    def predecessors(self, i):
+        return self.pred_idx[self.pred_ptr[i]:self.pred_ptr[i + 1]]
+
+    def topological_order(self):
+        """
+        Return the task indices in topological order.
+
+        Tasks are produced generation by generation, following the same
+        visiting order as networkx.topological_sort on the original graph.
+        """
+        indegree = np.diff(self.pred_ptr).tolist()
+        succ_ptr = self.succ_ptr.tolist()
+        succ_idx = self.succ_idx.tolist()
+        generation = [i for i, d in enumerate(indegree) if d == 0]
+        order = []
+        while generation:
+            order.extend(generation)
+            following = []
+            for i in generation:
+                for s in succ_idx[succ_ptr[i]:succ_ptr[i + 1]]:
+                    indegree[s] -= 1
+                    if indegree[s] == 0:
+                        following.append(s)
+            generation = following
+        if len(order) != self.num_tasks:
+            raise RuntimeError("Workflow graph contains a cycle")
+        return np.array(order, dtype=np.int64)
+
+
+class CompiledSolution(object):
+    """
+    Array-backed result of scheduling a CompiledWorkflow.
+
+    :param workflow: The CompiledWorkflow that was scheduled
+    :param machine: Index (into `workflow.env.machines`) of the machine each
+        task is allocated to
+    :param ast: Actual start time of each task
+    :param aft: Actual finish time of each task
+    :param order: Task indices in the order they were allocated
+    :param makespan: The makespan of the schedule
+    """
+
+    def __init__(self, workflow, machine, ast, aft, order, makespan):
+        self.workflow = workflow
+        self.machine = machine
+        self.ast = ast
+        self.aft = aft
+        self.order = order
+        self.makespan = makespan
+        # SchedulerStats of the heuristic that produced the schedule, if
+        # it was asked to collect them
+        self.stats = None
+
+    def to_solution(self, tasks=None):
+        """
+        Convert the arrays into a Solution with Allocation objects.
+
+        :param tasks: List of Task objects indexed by task index. Defaults to
+            the tasks stored in the compiled workflow.
+        :return: Solution
+        """
+        if tasks is None:
+            tasks = self.workflow.tasks
+        if tasks is None:
+            raise RuntimeError(
+                "Compiled workflow has no Task objects to build a Solution")
+        machines = self.workflow.env.machines
+        solution = Solution(machines, self.stats)
+        machine, ast, aft = (
+            self.machine.tolist(), self.ast.tolist(), self.aft.tolist()
+        )
+        for i in self.order.tolist():
+            solution.add_allocation(
+                task=tasks[i], machine=machines[machine[i]],
+                ast=ast[i], aft=aft[i]
+            )
+        solution.makespan = self.makespan
+        return solution
+
+
+class ScheduleResult(object):
+    """
+    Lightweight result of scheduling a CompiledWorkflow, as returned by
+    the workers of a BatchScheduler and by ScheduleDecoder.
+
+    :param makespan: Makespan of the schedule
+    :param cost: Total cost of running each task on its machine
+    :param machine: Machine index of each task (by task index)
+    :param ast: Actual start time of each task
+    :param aft: Actual finish time of each task
+    :param order: Task indices in the order they were allocated
+    """
+
+    __slots__ = ('makespan', 'cost', 'machine', 'ast', 'aft', 'order')
+
+    def __init__(self, makespan, cost, machine, ast, aft, order):
+        self.makespan = makespan
+        self.cost = cost
+        self.machine = machine
+        self.ast = ast
+        self.aft = aft
+        self.order = order
+
+    def __repr__(self):
+        return "ScheduleResult(makespan={0}, cost={1})".format(
+            self.makespan, self.cost)
+
+    def to_solution(self, workflow):
+        """
+        Promote the result to a Solution.
+
+        :param workflow: CompiledWorkflow (with Task objects and the same
+            environment) that was scheduled
+        :return: Solution
+        """
+        return CompiledSolution(
+            workflow, self.machine, self.ast, self.aft, self.order,
+            self.makespan
+        ).to_solution()
+
+
+def solution_arrays(workflow, solution, machines=None):
+    """
+    Machine index, planned start time and allocation rank (the position
+    in the order tasks were allocated) of each task in a schedule of
+    `workflow`.
+
+    :param workflow: CompiledWorkflow that was scheduled
+    :param solution: CompiledSolution, or Solution of the workflow's Task
+        objects
+    :param machines: Machines the schedule runs on, in index order
+        (defaults to those of the workflow's environment)
+    :return: (machine, ast, rank) arrays, indexed by task index
+    """
+    num_tasks = workflow.num_tasks
+    rank = np.arange(num_tasks)
+    if isinstance(solution, CompiledSolution):
+        if solution.order is not None:
+            rank[solution.order] = np.arange(num_tasks)
+        return np.asarray(solution.machine), np.asarray(solution.ast), rank
+    if workflow.tasks is None:
+        raise RuntimeError(
+            "Compiled workflow has no Task objects to match a Solution")
+    if machines is None:
+        machines = workflow.env.machines
+    index = {m.id: i for i, m in enumerate(machines)}
+    position = {
+        task: k for k, task in enumerate(solution.task_allocations)
+    }
+    machine = np.empty(num_tasks, dtype=np.int64)
+    ast = np.empty(num_tasks, dtype=float)
+    for i, task in enumerate(workflow.tasks):
+        alloc = solution.task_allocations.get(task)
+        if alloc is None:
+            raise RuntimeError(
+                "Task {0} is not allocated in the solution".format(task))
+        machine[i] = index[alloc.machine.id]
+        ast[i] = alloc.ast
+        rank[i] = position[task]
+    return machine, ast, rank
@@ -19,13 +19,20 @@ import json
 import logging
 
 from shadow.models.globals import *
+from shadow.models.cache import read_cache, write_cache
 
 logger = logging.getLogger(__name__)
 
 
 class Machine(object):
-    def __init__(self, mid, flops, memory, bandwidth, cost):
+    __slots__ = ('id', 'index', 'machine_type', 'flops', 'memory', 'iorate',
+                 'bandwidth', 'cost')
+
+    def __init__(self, mid, flops, memory, bandwidth, cost, index=None):
         self.id = mid
+        # Position of the machine in its Environment; this is the column of
+        # the machine in a workflow's runtime matrix
+        self.index = index
         self.machine_type = mid.split("_")[0]
         self.flops = flops
         self.memory = memory
@@ -52,7 +59,7 @@ def _process_env_resources(resources):
     else:
         machines = []
         # This is resources dictionary
-        for machine in resources:
+        for i, machine in enumerate(resources):
             name = machine
             flops, memory, bandwidth, cost = 0, 0, 0, 0
             if 'flops' in resources[machine]:
@@ -64,17 +71,91 @@ def _process_env_resources(resources):
             if 'cost' in resources[machine]:
                 cost = resources[machine]['cost']
 
-            m = Machine(name, flops, memory, bandwidth, cost=cost)
+            m = Machine(name, flops, memory, bandwidth, cost=cost, index=i)
             machines.append(m)
         return machines
 
 
+def _machine_arrays(machines):
+    return {
+        'ids': [m.id for m in machines],
+        'flops': [m.flops for m in machines],
+        'memory': [m.memory for m in machines],
+        'bandwidth': [m.bandwidth for m in machines],
+        'cost': [m.cost for m in machines]
+    }
+
+
+def _machines_from_arrays(arrays):
+    columns = [arrays[name].tolist() for name in
+               ['ids', 'flops', 'memory', 'bandwidth', 'cost']]
+    return [
+        Machine(mid, flops, memory, bandwidth, cost=cost, index=i)
+        for i, (mid, flops, memory, bandwidth, cost) in enumerate(
+            zip(*columns))
+    ]
+
+
+class MachineClass(object):
+    """
+    A group of identical machines (the same FLOPs, memory, IO rate and
+    cost) in an Environment. Machines in a class are listed in the order
+    they appear in the environment.
+    """
+
+    __slots__ = ('index', 'machine_type', 'machines', 'indices')
+
+    def __init__(self, index, machines):
+        self.index = index
+        self.machine_type = machines[0].machine_type
+        self.machines = machines
+        self.indices = np.array([m.index for m in machines], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.machines)
+
+    def __repr__(self):
+        return "{0}[{1}]".format(self.machine_type, len(self.machines))
+
+
+def _collapse_machines(machines):
+    groups = {}
+    for m in machines:
+        key = (m.flops, m.memory, m.iorate, m.cost)
+        groups.setdefault(key, []).append(m)
+    return [MachineClass(i, group) for i, group in enumerate(groups.values())]
+
+
 class Environment(object):
-    def __init__(self, config, dictionary=False):
+    def __init__(self, config, dictionary=False, cache=False, collapse=False):
         """
         This is a description of the Environment class
         :param config:
+        :param cache: If True (and `config` is a file), load the machines
+            from the binary cache of `config` if one exists, or create the
+            cache after parsing the file (see shadow.models.cache).
+        :param collapse: If True, group identical machines into classes (see
+            `collapse_machines`)
         """
+        self.machine_classes = None
+        self.machine_class_index = None
+        # Incremented whenever the system bandwidth changes, so that edge
+        # communication times calculated from it can be refreshed
+        self.bandwidth_version = 0
+        self._system_bandwith = None
+        cached = None
+        if cache and not dictionary:
+            cached = read_cache(config, 'environment')
+        if cached:
+            meta, arrays = cached
+            self.machines = _machines_from_arrays(arrays)
+            self.system_bandwith = meta['attrs']['system_bandwidth']
+        else:
+            self._machines_from_config(config, dictionary, cache)
+        if collapse:
+            self.collapse_machines()
+
+    def _machines_from_config(self, config, dictionary, cache):
         resources = {}
         bandwidth = 1.0 # 1 gb/s
         costs_bool = False
@@ -96,6 +177,36 @@ class Environment(object):
 
         self.machines = _process_env_resources(resources)
         self.system_bandwith = bandwidth
+        if cache and not dictionary:
+            write_cache(config, 'environment', _machine_arrays(self.machines),
+                        system_bandwidth=bandwidth)
+
+    @property
+    def system_bandwith(self):
+        return self._system_bandwith
+
+    @system_bandwith.setter
+    def system_bandwith(self, bandwidth):
+        self._system_bandwith = bandwidth
+        self.bandwidth_version += 1
+
+    def collapse_machines(self):
+        """
+        Group identical machines into MachineClass objects. Scheduling
+        heuristics can then calculate runtimes and rank statistics once per
+        class, and consider a few candidate machines from each class
+        instead of every machine in the environment (see
+        shadow.algorithms.heuristic.insertion_policy).
+
+        :return: List of MachineClass objects, which is also stored in
+            `machine_classes`
+        """
+        self.machine_classes = _collapse_machines(self.machines)
+        self.machine_class_index = np.empty(len(self.machines), dtype=np.int64)
+        for machine_class in self.machine_classes:
+            self.machine_class_index[machine_class.indices] = \
+                machine_class.index
+        return self.machine_classes
 
     @staticmethod
     def _check_comp(res_dict):
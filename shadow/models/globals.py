@@ -28,3 +28,5 @@ ENV_BANDWIDTH = 'system_bandwidth'
 ENV_COST = 'cost'
 
 WORKFLOW_DATASIZE = 'transfer_data'
+# Position of an edge in the workflow's per-edge arrays (e.g. Workflow.comm)
+WORKFLOW_EDGE = 'edge_index'
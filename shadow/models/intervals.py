@@ -0,0 +1,269 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Free-interval ('gap') index for the allocations on a single machine.
+
+Insertion-based policies (e.g. HEFT) look for the earliest idle gap on a
+machine that starts at or after a task's earliest start time (EST) and is
+long enough to hold the task. FreeSlotIndex keeps the gaps between the
+allocations on a machine in a treap ordered by the time the gap ends, where
+each node also records the longest gap in its subtree. This answers the
+query in O(log n) expected time, rather than rebuilding and scanning every
+gap on the machine for each probe.
+"""
+
+import random
+from bisect import bisect_right
+
+_RANDOM = random.Random(0)
+
+
+class _Gap(object):
+    """
+    Treap node for the idle interval [start, end)
+    """
+
+    __slots__ = ('key', 'start', 'end', 'length', 'max_length', 'priority',
+                 'left', 'right')
+
+    def __init__(self, key, start, end):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.length = end - start
+        self.max_length = self.length
+        self.priority = _RANDOM.random()
+        self.left = None
+        self.right = None
+
+    def update(self):
+        max_length = self.length
+        if self.left is not None and self.left.max_length > max_length:
+            max_length = self.left.max_length
+        if self.right is not None and self.right.max_length > max_length:
+            max_length = self.right.max_length
+        self.max_length = max_length
+
+
+def _split(node, key):
+    """
+    Split the treap at `node` into the nodes with keys < `key`, and the
+    nodes with keys >= `key`.
+    """
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        node.update()
+        return node, right
+    left, node.left = _split(node.left, key)
+    node.update()
+    return left, node
+
+
+def _merge(left, right):
+    """
+    Merge two treaps, where every key in `left` is less than every key in
+    `right`.
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+def _first_fit(node, end, length):
+    """
+    The first gap (in order of end time) that ends at or after `end` and
+    is at least `length` long.
+    """
+    if node is None or node.max_length < length:
+        return None
+    if node.end >= end:
+        found = _first_fit(node.left, end, length)
+        if found is not None:
+            return found
+        if node.length >= length:
+            return node
+    return _first_fit(node.right, end, length)
+
+
+def _count_first_fit(node, end, length):
+    """
+    `_first_fit`, also returning the number of gaps visited
+    """
+    if node is None:
+        return None, 0
+    if node.max_length < length:
+        return None, 1
+    visited = 1
+    if node.end >= end:
+        found, count = _count_first_fit(node.left, end, length)
+        visited += count
+        if found is not None:
+            return found, visited
+        if node.length >= length:
+            return node, visited
+    found, count = _count_first_fit(node.right, end, length)
+    return found, visited + count
+
+
+def earliest_start(starts, finishes, est, duration):
+    """
+    Linear-time equivalent of `FreeSlotIndex.earliest_start`, for
+    allocations given in an arbitrary order.
+
+    :param starts: Start times of the allocations on the machine
+    :param finishes: Finish times of the allocations on the machine
+    :param est: Earliest start time of the task
+    :param duration: Runtime of the task on the machine
+    :return: The earliest time the task can start on the machine
+    """
+    if not starts:
+        return est
+    if starts[0] != 0 and est + duration <= starts[0]:
+        return est
+    for k in range(1, len(starts)):
+        start = max(est, finishes[k - 1])
+        if start + duration <= starts[k]:
+            return start
+    return max(est, finishes[-1])
+
+
+class FreeSlotIndex(object):
+    """
+    The allocations on one machine, and the idle gaps between them.
+
+    Allocations are kept sorted by start time in `starts` and `finishes`;
+    an allocation is inserted after any that start at the same time. The
+    gaps considered are those between consecutive allocations, plus the
+    gap before the first allocation if it does not start at 0. Time after
+    the final allocation is always free.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.finishes = []
+        self._root = None
+        # _gaps[k] is the gap that ends at starts[k] (None if k == 0 and
+        # the first allocation starts at 0)
+        self._gaps = []
+        self._count = 0
+
+    @classmethod
+    def from_intervals(cls, intervals):
+        """
+        Build the index from (start, finish) pairs
+        """
+        index = cls()
+        for start, finish in intervals:
+            index.add(start, finish)
+        return index
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _insert_gap(self, start, end):
+        # Gaps that end at the same time are ordered by insertion, which
+        # matches the order of the allocations they precede.
+        self._count += 1
+        gap = _Gap((end, self._count), start, end)
+        left, right = _split(self._root, gap.key)
+        self._root = _merge(_merge(left, gap), right)
+        return gap
+
+    def _set_gap_start(self, gap, start):
+        path = []
+        node = self._root
+        while node is not gap:
+            path.append(node)
+            node = node.left if gap.key < node.key else node.right
+        gap.start = start
+        gap.length = gap.end - start
+        gap.update()
+        for node in reversed(path):
+            node.update()
+
+    def add(self, start, finish):
+        """
+        Add an allocation that runs from `start` to `finish`.
+
+        :return: The position of the new allocation in `starts`
+        """
+        k = bisect_right(self.starts, start)
+        if not self.starts:
+            gap = self._insert_gap(0, start) if start != 0 else None
+        elif k == 0:
+            if self._gaps[0] is None:
+                self._gaps[0] = self._insert_gap(finish, self.starts[0])
+            else:
+                self._set_gap_start(self._gaps[0], finish)
+            gap = self._insert_gap(0, start) if start != 0 else None
+        else:
+            if k < len(self.starts):
+                self._set_gap_start(self._gaps[k], finish)
+            gap = self._insert_gap(self.finishes[k - 1], start)
+        self.starts.insert(k, start)
+        self.finishes.insert(k, finish)
+        self._gaps.insert(k, gap)
+        return k
+
+    def earliest_start(self, est, duration):
+        """
+        The earliest time at or after `est` that a task of length
+        `duration` fits on the machine: either in the first gap that can
+        hold it, or after the final allocation.
+        """
+        if not self.starts:
+            return est
+        end = est + duration
+        if end <= self.starts[-1]:
+            gap = _first_fit(self._root, end, duration)
+            if gap is not None:
+                return max(est, gap.start)
+        return max(est, self.finishes[-1])
+
+
+class CountingSlotIndex(FreeSlotIndex):
+    """
+    FreeSlotIndex that adds the number of gaps it visits while searching
+    for a free slot to `stats.gaps_scanned` (see
+    shadow.algorithms.stats.SchedulerStats). It is only used when a
+    scheduler is asked to collect statistics, so FreeSlotIndex itself
+    carries no counting overhead.
+    """
+
+    def __init__(self, stats):
+        super().__init__()
+        self.stats = stats
+
+    def earliest_start(self, est, duration):
+        if not self.starts:
+            return est
+        end = est + duration
+        if end <= self.starts[-1]:
+            gap, visited = _count_first_fit(self._root, end, duration)
+            self.stats.gaps_scanned += visited
+            if gap is not None:
+                return max(est, gap.start)
+        return max(est, self.finishes[-1])
@@ -0,0 +1,249 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Streaming loader for shadow workflow JSON files.
+
+Workflow.__init__ reads the whole file with `json.load`, converts it to a
+networkx graph and then relabels every node, so peak memory is several
+copies of the workflow. `stream_workflow` instead reads the file in chunks
+and decodes the 'header', and each element of the 'nodes' and 'links'
+arrays, one at a time. Task objects and the CSR adjacency arrays of a
+CompiledWorkflow are built in the same pass, without an intermediate graph.
+"""
+
+import json
+from array import array
+
+import numpy as np
+
+from shadow.models.cache import read_cache, write_cache, workflow_arrays
+from shadow.models.compiled import CompiledWorkflow
+from shadow.models.globals import WORKFLOW_DATASIZE
+from shadow.models.workflow import Task
+
+CHUNK_SIZE = 1 << 20
+_WHITESPACE = ' \t\n\r'
+
+
+class _JSONStream(object):
+    """
+    Incremental reader over a JSON text file.
+
+    Containers we want to stream (objects and arrays) are walked one
+    token at a time; all other values are decoded whole with
+    json.JSONDecoder.raw_decode, reading more of the file as required.
+    """
+
+    def __init__(self, infile, chunk_size=CHUNK_SIZE):
+        self._file = infile
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """
+        Read another chunk from the file, discarding what has already been
+        consumed from the buffer. Returns False at the end of the file.
+        """
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while (self._pos < len(self._buffer)
+                   and self._buffer[self._pos] in _WHITESPACE):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON file")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError("Expected '{0}' at position {1} of JSON "
+                             "buffer".format(char, self._pos))
+        self._pos += 1
+
+    def read_value(self):
+        """
+        Decode the next complete JSON value
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def iter_object(self):
+        """
+        Yield the keys of the next JSON object. The caller must consume
+        the value belonging to each key before requesting the next one.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(':')
+            yield key
+            if self._peek() == ',':
+                self._pos += 1
+            else:
+                self._expect('}')
+                return
+
+    def iter_array(self):
+        """
+        Yield the decoded elements of the next JSON array, one at a time
+        """
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value()
+            if self._peek() == ',':
+                self._pos += 1
+            else:
+                self._expect(']')
+                return
+
+
+def stream_workflow(config, taskobj=Task, chunk_size=CHUNK_SIZE, cache=False):
+    """
+    Load a shadow workflow JSON file directly into a CompiledWorkflow.
+
+    Parameters
+    ----------
+    config : str
+        Path to the workflow JSON file (see utils.shadowgen)
+    taskobj :
+        Class used to create the Task object for each node
+    chunk_size : int
+        Number of characters read from the file at a time
+    cache : bool
+        If True, memory-map the workflow from its binary cache if one exists
+        for `config`; otherwise, create the cache after reading the file
+        (see shadow.models.cache).
+
+    Returns
+    -------
+    CompiledWorkflow, with `tasks` populated
+
+    Notes
+    -----
+    Task indices follow the order of the 'nodes' array, as they do when a
+    Workflow read from the same file is compiled. The successors of each
+    task follow the order of the 'links' array; a Workflow may differ here,
+    as networkx reorders adjacencies when relabelling nodes in place.
+    """
+    if cache:
+        cached = read_cache(config, 'workflow')
+        if cached:
+            return _compiled_from_cache(*cached, taskobj=taskobj)
+        compiled = stream_workflow(config, taskobj, chunk_size)
+        write_cache(config, 'workflow', workflow_arrays(compiled),
+                    time=compiled.time)
+        return compiled
+
+    time = None
+    tids, tasks, comp, task_data = [], [], [], []
+    index = {}
+    sources, targets = array('q'), array('q')
+    transfer_data = array('d')
+
+    with open(config, 'r') as infile:
+        stream = _JSONStream(infile, chunk_size)
+        for key in stream.iter_object():
+            if key == 'header':
+                time = bool(stream.read_value()['time'])
+            elif key == 'graph':
+                for gkey in stream.iter_object():
+                    if gkey == 'nodes':
+                        for node in stream.iter_array():
+                            nid = node['id']
+                            data = node.get('task_data', 0)
+                            index[nid] = len(tids)
+                            t = taskobj(nid, node['comp'], data, bool(time))
+                            t.index = len(tids)
+                            tids.append(nid)
+                            tasks.append(t)
+                            comp.append(node['comp'])
+                            task_data.append(data)
+                    elif gkey in ('links', 'edges'):
+                        for link in stream.iter_array():
+                            sources.append(index[link['source']])
+                            targets.append(index[link['target']])
+                            transfer_data.append(link[WORKFLOW_DATASIZE])
+                    else:
+                        stream.read_value()
+            else:
+                stream.read_value()
+
+    if time is None:
+        raise ValueError("Workflow file {0} has no header".format(config))
+    for t in tasks:
+        t.pre_compute = time
+
+    # Group edges by source task, keeping the file order within each task
+    sources = np.frombuffer(sources, dtype=np.int64)
+    edge_order = np.argsort(sources, kind='stable')
+    succ_ptr = np.zeros(len(tids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(tids)), out=succ_ptr[1:])
+    return CompiledWorkflow(
+        tids, comp, task_data, succ_ptr,
+        np.frombuffer(targets, dtype=np.int64)[edge_order],
+        np.frombuffer(transfer_data, dtype=float)[edge_order],
+        time=time, tasks=tasks
+    )
+
+
+def _compiled_from_cache(meta, arrays, taskobj):
+    """
+    Build a CompiledWorkflow that uses the memory-mapped arrays of a
+    workflow cache directly.
+    """
+    time = meta['attrs']['time']
+    tids = arrays['tids'].tolist()
+    comp = arrays['comp'].tolist()
+    task_data = arrays['task_data'].tolist()
+    tasks = []
+    for i, tid in enumerate(tids):
+        t = taskobj(tid, comp[i], task_data[i], time)
+        t.index = i
+        tasks.append(t)
+    return CompiledWorkflow(
+        tids, arrays['comp'], arrays['task_data'], arrays['succ_ptr'],
+        arrays['succ_idx'], arrays['transfer_data'], time=time, tasks=tasks
+    )
@@ -0,0 +1,223 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Discrete-event simulation of a schedule.
+
+A Solution records the start and finish times the scheduler expected.
+The Simulator executes the mapping instead: each machine runs its tasks
+in the order they were allocated to it (by start time), and a task starts
+as soon as the machine is free and the data from every predecessor has
+arrived. Data sent between machines takes the transfer time of the edge
+(see Environment.calc_data_transfer_time); data on the same machine
+arrives as soon as the predecessor finishes.
+
+Task finish events are processed in time order from a heap. Runtimes may
+be perturbed per task, to evaluate a schedule under noisy runtimes:
+
+    simulator = Simulator(workflow, env)
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        noise = rng.lognormal(0, 0.1, size=simulator.num_tasks)
+        result = simulator.run(solution, perturbation=noise)
+"""
+
+import heapq
+
+import numpy as np
+
+from shadow.models.compiled import (
+    CompiledWorkflow, calc_environment_runtimes, calc_transfer_times,
+    solution_arrays
+)
+
+
+class SimulationResult(object):
+    """
+    Outcome of simulating a schedule.
+
+    :param start: Actual start time of each task (by task index)
+    :param finish: Actual finish time of each task
+    :param machine: Machine index of each task
+    :param busy: Total time each machine spent running tasks
+    :param transfer_volume: Total data sent between machines
+    :param sent: Data sent by each machine to other machines
+    """
+
+    __slots__ = ('start', 'finish', 'machine', 'busy', 'transfer_volume',
+                 'sent')
+
+    def __init__(self, start, finish, machine, busy, transfer_volume, sent):
+        self.start = start
+        self.finish = finish
+        self.machine = machine
+        self.busy = busy
+        self.transfer_volume = transfer_volume
+        self.sent = sent
+
+    def __repr__(self):
+        return "SimulationResult(makespan={0}, transfer_volume={1})".format(
+            self.makespan, self.transfer_volume)
+
+    @property
+    def makespan(self):
+        if len(self.finish) == 0:
+            return 0
+        return self.finish.max()
+
+    @property
+    def utilisation(self):
+        """
+        Fraction of the makespan each machine spent running tasks
+        """
+        makespan = self.makespan
+        if makespan == 0:
+            return np.zeros(len(self.busy))
+        return self.busy / makespan
+
+
+class Simulator(object):
+    """
+    Simulator for the schedules of one workflow in one environment.
+
+    The runtime and transfer time arrays are calculated once, so many
+    schedules (or many perturbations of one schedule) can be simulated
+    cheaply.
+
+    :param workflow: Workflow or CompiledWorkflow
+    :param environment: Environment in which the schedule runs. Defaults
+        to the environment of the workflow.
+    """
+
+    def __init__(self, workflow, environment=None):
+        if not isinstance(workflow, CompiledWorkflow):
+            workflow = workflow.compile()
+        if environment is None:
+            environment = workflow.env
+        if environment is None:
+            raise RuntimeError("Workflow environment is not initialised")
+        self.workflow = workflow
+        self.env = environment
+        if environment is workflow.env:
+            self.runtimes = workflow.runtimes
+            self.comm = workflow.comm
+        else:
+            self.runtimes, _ = calc_environment_runtimes(
+                workflow.comp, workflow.task_data, environment, workflow.time
+            )
+            self.comm = calc_transfer_times(workflow.transfer_data,
+                                            environment.system_bandwith)
+
+    @property
+    def num_tasks(self):
+        return self.workflow.num_tasks
+
+    def run(self, solution, perturbation=None):
+        """
+        Simulate the execution of a schedule.
+
+        :param solution: Solution or CompiledSolution of the workflow
+        :param perturbation: Optional array with a factor for each task,
+            by which its runtime on its machine is multiplied
+        :return: SimulationResult
+        """
+        workflow = self.workflow
+        num_tasks = workflow.num_tasks
+        machine, ast, rank = solution_arrays(workflow, solution,
+                                             self.env.machines)
+        duration = self.runtimes[np.arange(num_tasks), machine]
+        if perturbation is not None:
+            perturbation = np.asarray(perturbation)
+            if perturbation.shape != (num_tasks,):
+                raise ValueError(
+                    "Expected one perturbation per task ({0}), got "
+                    "{1}".format(num_tasks, perturbation.shape))
+            duration = duration * perturbation
+
+        # Each machine runs its tasks in order of their planned start (and
+        # then of allocation, for tasks planned to start at the same time)
+        queue = np.lexsort((rank, ast, machine))
+        follows = np.full(num_tasks, -1, dtype=np.int64)
+        same = machine[queue[1:]] == machine[queue[:-1]]
+        follows[queue[:-1][same]] = queue[1:][same]
+
+        # Edge arrival delays; data stays put on the same machine
+        succ_ptr, succ_idx = workflow.succ_ptr, workflow.succ_idx
+        source = np.repeat(np.arange(num_tasks), np.diff(succ_ptr))
+        remote = machine[source] != machine[succ_idx]
+        delay = np.where(remote, self.comm, 0)
+        sent = np.bincount(machine[source][remote],
+                           weights=workflow.transfer_data[remote],
+                           minlength=len(self.env.machines))
+
+        waiting = np.diff(workflow.pred_ptr)
+        waiting[follows[follows >= 0]] += 1
+        waiting = waiting.tolist()
+        ready = [0] * num_tasks
+        start = [0] * num_tasks
+        finish = [0] * num_tasks
+        follows = follows.tolist()
+        duration = duration.tolist()
+        succ_ptr, succ_idx = succ_ptr.tolist(), succ_idx.tolist()
+        delay = delay.tolist()
+
+        events = []
+        for i in range(num_tasks):
+            if waiting[i] == 0:
+                finish[i] = duration[i]
+                events.append((finish[i], i))
+        heapq.heapify(events)
+        done = 0
+        while events:
+            time, i = heapq.heappop(events)
+            done += 1
+            first, last = succ_ptr[i], succ_ptr[i + 1]
+            released = zip(succ_idx[first:last], delay[first:last])
+            if follows[i] >= 0:
+                released = list(released)
+                released.append((follows[i], 0))
+            for s, arrival in released:
+                arrival += time
+                if arrival > ready[s]:
+                    ready[s] = arrival
+                waiting[s] -= 1
+                if waiting[s] == 0:
+                    start[s] = ready[s]
+                    finish[s] = ready[s] + duration[s]
+                    heapq.heappush(events, (finish[s], s))
+
+        if done != num_tasks:
+            raise RuntimeError(
+                "Solution cannot be executed: the order of tasks on a "
+                "machine conflicts with their dependencies")
+        busy = np.bincount(machine, weights=duration,
+                           minlength=len(self.env.machines))
+        return SimulationResult(
+            np.array(start), np.array(finish), machine, busy,
+            float(sent.sum()), sent
+        )
+
+
+def simulate(workflow, environment, solution, perturbation=None):
+    """
+    Simulate the execution of `solution`; see Simulator.run
+
+    :param workflow: Workflow or CompiledWorkflow
+    :param environment: Environment in which the schedule runs
+    :param solution: Solution or CompiledSolution of the workflow
+    :param perturbation: Optional per-task runtime factors
+    :return: SimulationResult
+    """
+    return Simulator(workflow, environment).run(solution, perturbation)
@@ -13,12 +13,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from bisect import bisect_left
+from collections import deque
+
+from shadow.models.intervals import (
+    FreeSlotIndex, CountingSlotIndex, earliest_start
+)
+from shadow.models.globals import WORKFLOW_EDGE
+
 
 class Allocation:
     """
     A simple storage class to save an allocation to a solution
     """
 
+    __slots__ = ('machine', 'task', 'ast', 'aft')
+
     def __init__(self, task, machine, ast=None, aft=None):
         self.machine = machine
         self.task = task
@@ -39,28 +49,85 @@ class Solution:
     """
     A solution is generated by an algorithm, or a number of solutions are generated
     in the case that we are comparing a population of solutions.
+
+    Allocations on each machine are kept sorted by their start time as they
+    are added (using bisection, rather than re-sorting the list), along with
+    an index of the idle gaps between them (see
+    shadow.models.intervals.FreeSlotIndex). The makespan is updated
+    incrementally, and the global `execution_order` is only sorted when it
+    is requested.
+
+    :param machines: Machines that tasks are allocated to
+    :param stats: Optional shadow.algorithms.stats.SchedulerStats, in which
+        the gaps scanned for free slots and the sorts of the allocation
+        lists are counted
     """
 
-    def __init__(self, machines):
+    def __init__(self, machines, stats=None):
         self.machines = machines
+        self.stats = stats
         # Generate a list of allocations for each machine
         self.allocations = {m.id: [] for m in machines}
+        # Allocation times and free slots on each machine
+        self._slots = {m.id: self._slot_index() for m in machines}
+        # Machines with allocations added using sort=False, for which
+        # the allocations and slots are not in start-time order
+        self._unsorted = set()
         self.task_allocations = {}
-        self.execution_order = []
+        # Allocations in the order they were added; the first _sorted_count
+        # of these are in execution order once sorted.
+        self._allocation_order = []
+        self._sorted_count = 0
+        self._execution_order = None
+        self._last = None
         self.makespan = 0
 
-    def add_allocation(self, task, machine, ast=None, aft=None, sort=True):
-        a = Allocation(task, machine, ast, aft)
-        self.allocations[machine.id].append(a)
-        if sort:
-            self.allocations[machine.id].sort(
+    @property
+    def execution_order(self):
+        """
+        The allocations sorted by actual start time. Allocations with the
+        same start time are listed in the order they were added, and any
+        added with `sort=False` since the last sorted insertion are
+        appended in the order they were added.
+        """
+        if self._execution_order is None:
+            sorted_part = sorted(
+                self._allocation_order[:self._sorted_count],
                 key=lambda alloc: alloc.ast
             )
+            self._execution_order = (
+                    sorted_part + self._allocation_order[self._sorted_count:]
+            )
+        return self._execution_order
+
+    def add_allocation(self, task, machine, ast=None, aft=None, sort=True):
+        a = Allocation(task, machine, ast, aft)
+        allocations = self.allocations[machine.id]
+        if not sort:
+            allocations.append(a)
+            self._unsorted.add(machine.id)
+        else:
+            if machine.id in self._unsorted:
+                allocations.sort(key=lambda alloc: alloc.ast)
+                if self.stats is not None:
+                    self.stats.allocation_sorts += 1
+                self._slots[machine.id] = self._slot_index(allocations)
+                self._unsorted.discard(machine.id)
+            i = self._slots[machine.id].add(ast, aft)
+            allocations.insert(i, a)
         self.task_allocations[task] = a
-        self.execution_order.append(a)
+
+        self._allocation_order.append(a)
+        self._execution_order = None
+        # The last allocation in execution order is the latest-added
+        # allocation with the greatest start time.
+        if self._last is None or ast >= self._last.ast:
+            self._last = a
         if sort:
-            self.execution_order.sort(key=lambda alloc: alloc.ast)
-        self.makespan = self.execution_order[-1].aft
+            self._sorted_count = len(self._allocation_order)
+            self.makespan = self._last.aft
+        else:
+            self.makespan = aft
 
     def list_machine_allocations(self, machine):
         """
@@ -69,11 +136,219 @@ class Solution:
         :param machine: The String name of the machine
         :return:
         """
-        self.allocations[machine.id].sort(
-            key=lambda alloc: alloc.task.ast
-        )
+        # Allocations added with sort=True are already in start-time order
+        if machine.id in self._unsorted:
+            self.allocations[machine.id].sort(
+                key=lambda alloc: alloc.task.ast
+            )
+            if self.stats is not None:
+                self.stats.allocation_sorts += 1
         return self.allocations[machine.id]
 
+    def earliest_start(self, machine, est, duration):
+        """
+        The earliest time at or after `est` that a task of length `duration`
+        can start on `machine`, either in an idle gap between existing
+        allocations or after the final allocation (the insertion-based
+        policy of Topcuoglu et al. 2002).
+
+        :param machine: Machine object
+        :param est: Earliest time the task's input data is available
+        :param duration: The runtime of the task on the machine
+        :return: Start time
+        """
+        if machine.id in self._unsorted:
+            allocations = self.list_machine_allocations(machine)
+            if self.stats is not None:
+                self.stats.gaps_scanned += len(allocations)
+            return earliest_start(
+                [alloc.ast for alloc in allocations],
+                [alloc.aft for alloc in allocations], est, duration
+            )
+        return self._slots[machine.id].earliest_start(est, duration)
+
+    def _slot_index(self, allocations=()):
+        """
+        Free-slot index of the given allocations (which are in start-time
+        order), counting the gaps it scans if statistics are collected
+        """
+        if self.stats is None:
+            index = FreeSlotIndex()
+        else:
+            index = CountingSlotIndex(self.stats)
+        for alloc in allocations:
+            index.add(alloc.ast, alloc.aft)
+        return index
+
+    def _machine_position(self, alloc):
+        """
+        Position of `alloc` in the (sorted) allocation list of its machine
+        """
+        allocations = self.allocations[alloc.machine.id]
+        k = bisect_left(self._slots[alloc.machine.id].starts, alloc.ast)
+        while allocations[k] is not alloc:
+            k += 1
+        return k
+
+    def _ready_time(self, workflow, alloc):
+        """
+        Time at which the data of every predecessor of the allocated task
+        is available on its machine
+        """
+        comm = workflow.comm
+        ready = 0
+        for pretask, attr in workflow.graph.pred[alloc.task].items():
+            pre_alloc = self.task_allocations[pretask]
+            finish = pre_alloc.aft
+            if pre_alloc.machine != alloc.machine:
+                finish += int(comm[attr[WORKFLOW_EDGE]])
+            if finish > ready:
+                ready = finish
+        return ready
+
+    def _simulate(self, workflow, allocs, previous, followers):
+        """
+        Recompute the start and finish times of `allocs`, in an order that
+        respects both the workflow's dependencies and the order of the
+        allocations on each machine. Each task starts as soon as its data
+        is ready and the previous allocation on its machine has finished,
+        and keeps its current duration.
+
+        :param allocs: Allocations to update (a set closed under
+            `followers`)
+        :param previous: Maps an allocation to the allocation before it on
+            the same machine, if any
+        :param followers: Maps an allocation to the allocations that depend
+            on it (its successors in the workflow, and the next allocation
+            on its machine)
+        :return: True if any finish time decreased
+        """
+        indegree = {a: 0 for a in allocs}
+        for a in allocs:
+            for f in followers[a]:
+                indegree[f] += 1
+        ready = deque(a for a in allocs if indegree[a] == 0)
+        decreased = False
+        while ready:
+            a = ready.popleft()
+            duration = a.aft - a.ast
+            ast = self._ready_time(workflow, a)
+            prev = previous.get(a)
+            if prev is not None and prev.aft > ast:
+                ast = prev.aft
+            if ast + duration < a.aft:
+                decreased = True
+            a.ast, a.aft = ast, ast + duration
+            for f in followers[a]:
+                indegree[f] -= 1
+                if indegree[f] == 0:
+                    ready.append(f)
+        return decreased
+
+    def _reindex(self, machine_ids):
+        """
+        Rebuild the free-slot indices of the given machines after their
+        allocation times have changed (their order is unchanged)
+        """
+        for mid in machine_ids:
+            self._slots[mid] = self._slot_index(self.allocations[mid])
+        self._execution_order = None
+
+    def reschedule(self, workflow, task, runtime=None, finish=None):
+        """
+        Update the schedule after the runtime or finish time of `task` has
+        changed (e.g. it was delayed), keeping the mapping of tasks to
+        machines and the order of the allocations on each machine.
+
+        Only the allocations that can be affected are recomputed: the
+        downstream cone of `task` in the workflow, and the allocations that
+        follow any of these on the same machine. The result is the same as
+        calling `resimulate` after changing the task. Successors that have
+        not been allocated yet (e.g. in online scheduling) are skipped.
+
+        :param workflow: The Workflow (with environment) being scheduled
+        :param task: The Task whose allocation has changed
+        :param runtime: The new runtime of `task`
+        :param finish: The new finish time of `task` (instead of `runtime`)
+        :return: The updated makespan
+        """
+        if (runtime is None) == (finish is None):
+            raise ValueError("Provide one of 'runtime' or 'finish'")
+        if self._unsorted:
+            raise RuntimeError(
+                "Cannot reschedule allocations added with sort=False")
+        alloc = self.task_allocations[task]
+        old_aft = alloc.aft
+        if finish is None:
+            finish = alloc.ast + runtime
+        if finish < alloc.ast:
+            raise ValueError("Task cannot finish before it starts")
+        alloc.aft = finish
+
+        # Downstream cone of the task, including later allocations on the
+        # machines it reaches
+        previous, followers = {}, {}
+        stack = [alloc]
+        while stack:
+            a = stack.pop()
+            if a in followers:
+                continue
+            following = [self.task_allocations[t]
+                         for t in workflow.graph.successors(a.task)
+                         if t in self.task_allocations]
+            allocations = self.allocations[a.machine.id]
+            k = self._machine_position(a) + 1
+            if k < len(allocations):
+                previous[allocations[k]] = a
+                following.append(allocations[k])
+            followers[a] = following
+            stack.extend(f for f in following if f not in followers)
+        cone = set(followers)
+        cone.discard(alloc)
+        for a in cone:
+            if a not in previous:
+                k = self._machine_position(a)
+                if k > 0:
+                    previous[a] = self.allocations[a.machine.id][k - 1]
+
+        # The changed allocation is fixed; propagate from its followers
+        del followers[alloc]
+        decreased = self._simulate(workflow, cone, previous, followers)
+        self._reindex({a.machine.id for a in cone} | {alloc.machine.id})
+        if decreased or finish < old_aft:
+            self.makespan = max(a.aft for a in self.task_allocations.values())
+        else:
+            self.makespan = max(
+                [self.makespan, finish] + [a.aft for a in cone])
+        return self.makespan
+
+    def resimulate(self, workflow):
+        """
+        Recompute the start and finish time of every allocation from the
+        mapping of tasks to machines, the order of allocations on each
+        machine, and the current duration of each allocation. Every task
+        starts as soon as its data is ready and its machine is free.
+
+        :param workflow: The Workflow (with environment) being scheduled
+        :return: The updated makespan
+        """
+        if self._unsorted:
+            raise RuntimeError(
+                "Cannot resimulate allocations added with sort=False")
+        previous, followers = {}, {}
+        for alloc in self.task_allocations.values():
+            followers[alloc] = [self.task_allocations[t]
+                                for t in workflow.graph.successors(alloc.task)]
+        for allocations in self.allocations.values():
+            for prev, alloc in zip(allocations, allocations[1:]):
+                previous[alloc] = prev
+                followers[prev].append(alloc)
+        self._simulate(workflow, set(followers), previous, followers)
+        self._reindex(list(self.allocations))
+        self.makespan = max(
+            [a.aft for a in self.task_allocations.values()], default=0)
+        return self.makespan
+
     def task_machine_pairs(self):
         pairs = []
         for machine in self.allocations:
@@ -23,6 +23,13 @@ import networkx as nx
 import numpy as np
 from shadow.models.environment import Environment
 from shadow.models.solution import Solution
+from shadow.models.compiled import (
+    CompiledWorkflow, calc_runtime_matrix, calc_environment_runtimes,
+    calc_transfer_times, calc_average_runtimes, calc_minimum_runtime,
+    calc_maximum_runtime
+)
+from shadow.models.cache import read_cache, write_cache, workflow_arrays
+from shadow.models.globals import WORKFLOW_DATASIZE, WORKFLOW_EDGE
 
 LOGGER = logging.getLogger(__name__)
 
@@ -36,8 +43,19 @@ class Task(object):
     """
     Tasks are components of a Workflow that store information associated to
     their compute requirement.
+
+    Once the Workflow has an environment, the runtime of a task on each
+    machine is read from the workflow's runtime matrix (row `index`);
+    before then, it is calculated on demand from the FLOP and IO demand.
+
+    Tasks use __slots__ rather than a per-instance __dict__, as workflows may
+    contain millions of them. Subclasses (see the `taskobj` parameter of
+    Workflow) that do not declare __slots__ get a __dict__ as usual.
     """
 
+    __slots__ = ('tid', 'rank', 'pre_compute', 'flops_demand', 'io_demand',
+                 'index', '_runtimes', 'machine', 'ast', 'aft')
+
     def __init__(self, tid, flops=0, data=None, pre_compute=False):
         self.tid = tid  # task id - this is unique
         self.rank = -1  # This is updated during the 'Task Prioritisation' phase
@@ -45,17 +63,14 @@ class Task(object):
         # Resource usage
         self.flops_demand = flops  # Will use the constants
         self.io_demand = data
-        # Following is {machine name, value} dictionary pairs
-        if self.pre_compute:
-            self._calculated_runtime = {}
-            self._calculated_io = {}
-            self._calculated_memory = {}
+        # Row of this task in the workflow runtime matrix, which is shared
+        # by all tasks in the workflow (see Workflow.add_environment)
+        self.index = None
+        self._runtimes = None
         # allocations
         self.machine = None
         self.ast = 0  # actual start time
-        self.aft = 0  # actual finish time  # if self.pre_compute:  #  #  #
-        # self.test_runtime = self._calculated_runtime  # else:  #  #  #
-        # self.test_runtime = {}
+        self.aft = 0  # actual finish time
 
     def __repr__(self):
         return str(self.tid)
@@ -77,43 +92,38 @@ class Task(object):
         if isinstance(task, self.__class__):
             return self.tid <= task.tid
 
-    def calc_runtime(self, machine):
+    def _runtime_row(self, machines):
+        """
+        The runtime of this task on each of `machines`, taken from the
+        workflow runtime matrix if it has been calculated.
+        """
+        if self._runtimes is not None:
+            return self._runtimes[self.index]
         if self.pre_compute:
-            return self._calculated_runtime[machine]
-        else:
-            # Sometimes we may have data but the divisor is more of an issue.
-            if machine.iorate:
-                data = int(np.round(self.io_demand / machine.iorate))
-            else:
-                data = 0
-            compute = int(np.round(self.flops_demand / machine.flops))
-            if compute < 1:
-                compute = 1
-            return max(compute,
-                       data)  # return  # self.calculated_runtime[machine]
+            raise RuntimeError(
+                "Pre-calculated runtimes for task {0} are not available "
+                "until an environment is added to the workflow".format(
+                    self.tid))
+        return calc_runtime_matrix(
+            np.array([self.flops_demand]), np.array([self.io_demand or 0]),
+            machines
+        )[0]
+
+    def calc_runtime(self, machine):
+        if self._runtimes is not None:
+            return self._runtimes[self.index, machine.index].item()
+        return self._runtime_row([machine])[0].item()
 
     def calculated_runtime(self, machine):
-        if self.pre_compute:
-            return self._calculated_runtime[machine]
-        else:
-            # if self.test_runtime[machine] != self.calc_runtime(machine):
-            #     raise RuntimeError('Incorrect calculation')
-            return self.calc_runtime(machine)
+        return self.calc_runtime(machine)
 
     def calc_ave_runtime(self, env):
         if self.pre_compute:
-            return (sum(self._calculated_runtime.values()) / len(
-                self._calculated_runtime))
-        else:
-            mcompute = np.array([m.flops for m in env.machines])
-            miorate = np.array([m.iorate for m in env.machines])
-            compute = self.flops_demand / mcompute
-            if miorate.any():
-                data = self.io_demand / miorate
-            else:
-                data = 0
-            return max(np.average(np.round(compute).astype(int)),
-                       np.average(np.round(data).astype(int)))
+            return self._runtime_row(env.machines).mean()
+        return calc_average_runtimes(
+            np.array([self.flops_demand]), np.array([self.io_demand or 0]),
+            env.machines
+        )[0]
 
     def calc_mininum_runtime(self, env):
         """
@@ -141,34 +151,21 @@ class Task(object):
 
         """
         if self.pre_compute:
-            return min(self._calculated_runtime.items(),
-                       key=operator.itemgetter(1))
-        else:
-            cm = max(env.machines, key=operator.attrgetter('flops'))
-            cw = max(int(np.round(self.flops_demand / cm.flops)), 1)
-            if cm.iorate:
-                iom = max(env.machines, key=operator.attrgetter('iorate'))
-                iow = max(int(np.round(self.io_demand / iom.iorate)),1)
-                if iow > cw:
-                    return iom, iow
-                else:
-                    return cm, cw
-            else:
-                return cm, cw  # return compute, w
+            row = self._runtime_row(env.machines)
+            m = int(np.argmin(row))
+            return env.machines[m], row[m].item()
+        m, w = calc_minimum_runtime(self.flops_demand, self.io_demand or 0,
+                                    env.machines)
+        return env.machines[m], w
 
     def calc_max_runtime(self, env):
         if self.pre_compute:
-            return max(self._calculated_runtime.items(),
-                       key=operator.itemgetter(1))
-        else:
-            min_compute_machine = min(env.machines, key=operator.attrgetter('flops'))
-            min_data_machine = min(env.machines, key=operator.attrgetter('iorate'))
-            w = int(np.round(self.flops_demand / min_compute_machine.flops))
-            d = int(np.round(self.io_demand / min_data_machine.iorate))
-            if w > d:
-                return min_compute_machine, w
-            else:
-                return min_data_machine, d
+            row = self._runtime_row(env.machines)
+            m = int(np.argmax(row))
+            return env.machines[m], row[m].item()
+        m, w = calc_maximum_runtime(self.flops_demand, self.io_demand or 0,
+                                    env.machines)
+        return env.machines[m], w
 
     def update_task_rank(self, rank):
         self.rank = rank
@@ -190,9 +187,43 @@ class Workflow(object):
     The workflow includes this is a test
     """
 
-    def __init__(self, config, taskobj=Task, from_file=True):
+    def __init__(self, config, taskobj=Task, from_file=True, cache=False):
         """
+        :param cache: If True, load the workflow from its binary cache if
+            one exists for `config`, or create the cache after parsing the
+            JSON file (see shadow.models.cache).
         """
+        cached = read_cache(config, 'workflow') if cache else None
+        if cached:
+            self._graph_from_cache(*cached, taskobj=taskobj)
+        else:
+            self._graph_from_file(config, taskobj)
+        self.tasks = self.graph.nodes
+        self.edges = self.graph.edges
+
+        # Initialised when we 'add_environment'
+        self.env = None
+        # (tasks x machines) runtime matrix, rows ordered as self.tasks
+        self.runtimes = None
+        self.ave_runtimes = None
+        # Communication time of each edge, in graph edge order (see comm)
+        self._transfer_data = None
+        self._comm = None
+        self._comm_version = None
+        # Solution is dependent on an environment
+        self.solution = None
+
+        if cache and not cached:
+            write_cache(
+                config, 'workflow',
+                workflow_arrays(CompiledWorkflow.from_workflow(self)),
+                time=bool(self._time)
+            )
+
+        # This lets us know when reading the graph if 'comp' attribute  # in
+        # the Networkx graph is time or FLOPs based
+
+    def _graph_from_file(self, config, taskobj):
         with open(config, 'r') as infile:
             wfconfig = json.load(infile)
         self.graph = nx.readwrite.json_graph.node_link_graph(wfconfig['graph'])
@@ -209,18 +240,37 @@ class Workflow(object):
             else:
                 data = 0
             t = taskobj(node, comp, data, precompute)
+            t.index = len(mapping)
             mapping[node] = t
         self.graph = nx.relabel_nodes(self.graph, mapping, copy=False)
-        self.tasks = self.graph.nodes
-        self.edges = self.graph.edges
 
-        # Initialised when we 'add_environment'
-        self.env = None
-        # Solution is dependent on an environment
-        self.solution = None
-
-        # This lets us know when reading the graph if 'comp' attribute  # in
-        # the Networkx graph is time or FLOPs based
+    def _graph_from_cache(self, meta, arrays, taskobj):
+        """
+        Rebuild the workflow graph from the arrays of a workflow cache.
+        Nodes and edges are added in the order they were compiled, so the
+        graph iterates in the same order as one read from the JSON file.
+        """
+        self._time = meta['attrs']['time']
+        comp = arrays['comp'].tolist()
+        task_data = arrays['task_data'].tolist()
+        tasks = []
+        for i, tid in enumerate(arrays['tids'].tolist()):
+            t = taskobj(tid, comp[i], task_data[i], self._time)
+            t.index = i
+            tasks.append(t)
+        self.graph = nx.DiGraph()
+        self.graph.add_nodes_from(
+            (t, {'comp': comp[i], 'task_data': task_data[i]})
+            for i, t in enumerate(tasks)
+        )
+        succ_ptr = arrays['succ_ptr']
+        sources = np.repeat(np.arange(len(tasks)), np.diff(succ_ptr))
+        self.graph.add_edges_from(
+            (tasks[u], tasks[v], {WORKFLOW_DATASIZE: data})
+            for u, v, data in zip(sources.tolist(),
+                                  arrays['succ_idx'].tolist(),
+                                  arrays['transfer_data'].tolist())
+        )
 
     def add_environment(self, environment):
         """
@@ -232,35 +282,62 @@ class Workflow(object):
         # Go through environment flags and check what processing we can do
         # to the workflow
         self.solution = Solution(machines=[m for m in self.env.machines])
-        # That is, the runtime of tasks has already been calculated
-        if self._time:
-            # Check the number of  values stored for each node so they match the
-            # nunber of machines in thcomputatione system config
-            for task in self.tasks:
-                try:
-                    comp_array_length = len(self.tasks[task]['comp'])
-                except TypeError:
-                    print("Computation costs should be an array, "
-                          "but instead is {0}. Check your configuration "
-                          "files".format(self.tasks[task]['comp']))
-                    raise TypeError
-                if len(self.tasks[task]['comp']) is not len(self.env.machines):
-                    raise RuntimeError
-                machines = [m for m in self.env.machines]
-                runtime_list = self.tasks[task]['comp']
-                task._calculated_runtime = dict(zip(machines, runtime_list))
-                task.test_runtime = task._calculated_runtime
-            return 0
-        # Use compute provided by system values to calculate the time taken
-        else:
+        # If 'time' is set, the runtime of tasks has already been calculated
+        # and 'comp' stores a runtime for each machine; otherwise we use the
+        # compute provided by system values to calculate the time taken.
+        if not self._time:
             LOGGER.debug('Tasks do not have pre calculated runtimes')
-            # for m in self.env.machines:
-            #     for task in self.tasks:
-            #         comp = task.flops_demand
-            # task.test_runtime[m] = int(
-            #     self.env.calc_task_runtime_on_machine(m, comp)
-            # )
-            return 0
+        try:
+            comp = np.array([self.tasks[task]['comp'] for task in self.tasks])
+        except ValueError:
+            raise RuntimeError(
+                "Tasks have different numbers of computation costs. Check "
+                "your configuration files")
+        task_data = np.array(
+            [task.io_demand or 0 for task in self.tasks], dtype=float
+        )
+        self.runtimes, self.ave_runtimes = calc_environment_runtimes(
+            comp, task_data, self.env, self._time
+        )
+        for task in self.tasks:
+            task._runtimes = self.runtimes
+        # Number the edges in graph order, which is also the successor edge
+        # order of the compiled workflow
+        transfer_data = np.empty(self.graph.number_of_edges(), dtype=float)
+        for e, (_, _, attr) in enumerate(self.graph.edges(data=True)):
+            attr[WORKFLOW_EDGE] = e
+            transfer_data[e] = attr[WORKFLOW_DATASIZE]
+        self._transfer_data = transfer_data
+        self._comm_version = None
+        return 0
+
+    @property
+    def comm(self):
+        """
+        Communication time of each edge in the environment, indexed by the
+        WORKFLOW_EDGE attribute of the edge. The times are calculated once
+        per environment bandwidth (and recalculated if it changes), so
+        scheduling heuristics read them rather than dividing the edge's
+        transfer data by the bandwidth on every lookup.
+
+        :return: numpy.ndarray, or None if there is no environment
+        """
+        if self.env is None:
+            return None
+        if self._comm_version != self.env.bandwidth_version:
+            self._comm = calc_transfer_times(
+                self._transfer_data, self.env.system_bandwith
+            )
+            self._comm_version = self.env.bandwidth_version
+        return self._comm
+
+    def comm_cost(self, task, successor):
+        """
+        Communication time of the edge from `task` to `successor`, if they
+        run on different machines
+        """
+        return self.comm[
+            self.graph.edges[task, successor][WORKFLOW_EDGE]].item()
 
     def sort_tasks(self, sort_type):
         """
@@ -279,5 +356,14 @@ class Workflow(object):
             raise NotImplementedError(
                 "This sorting method has not been implemented")
 
+    def compile(self):
+        """
+        Produce the array-backed (compiled) form of this workflow, for use
+        with the compiled scheduling heuristics.
+
+        :return: shadow.models.compiled.CompiledWorkflow
+        """
+        return CompiledWorkflow.from_workflow(self)
+
     def solution_exec_order(self):
         return sorted(self.tasks, key=lambda x: x.ast)
@@ -14,8 +14,10 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import argparse
 import logging
+import os
 
 from utils.shadowgen import daliuge as dlg
+from utils.shadowgen import synthetic
 
 logger = logging.getLogger(__name__)
 
@@ -43,8 +45,16 @@ def run_daliuge_translator(arg):
 
 
 def ggen_generation(arg):
-    print(arg)
-    pass
+    logger.debug(arg)
+    for index, size in enumerate(arg['sizes']):
+        workflow = synthetic.generate_workflow(
+            arg['family'], size, ccr=arg['ccr'], mean=arg['mean'],
+            uniform_range=arg['range'], seed=arg['seed'], index=index
+        )
+        path = os.path.join(
+            arg['output'], '{0}_{1}.json'.format(arg['family'], size))
+        logger.info('Generating file: %s', path)
+        synthetic.write_workflow(workflow, path, cache=arg['cache'])
 
 
 def dax_translator(arg):
@@ -77,7 +87,23 @@ if __name__ == '__main__':
     daliuge_parser.set_defaults(func=run_daliuge_translator)
 
     ggen_parser = subparsers.add_parser('ggen',
-                                        help=' Generate sample dataflow graphs using ggen')
+                                        help=' Generate sample dataflow graphs')
+    ggen_parser.add_argument('family',
+                             choices=sorted(synthetic.FAMILIES),
+                             help='Graph family to generate')
+    ggen_parser.add_argument('sizes', nargs='+', type=int,
+                             help='Approximate number of tasks of each graph')
+    ggen_parser.add_argument('--output', default='.',
+                             help='Directory for the workflow JSON files')
+    ggen_parser.add_argument('--seed', type=int, default=20)
+    ggen_parser.add_argument('--ccr', type=float, default=0.5,
+                             help='Communication/Computation cost ratio')
+    ggen_parser.add_argument('--mean', type=int, default=5000,
+                             help='Mean computation cost of each task')
+    ggen_parser.add_argument('--range', type=int, default=500,
+                             help='Range of costs above/below the mean')
+    ggen_parser.add_argument('--cache', action='store_true',
+                             help='Also write the binary workflow cache')
     ggen_parser.set_defaults(func=ggen_generation)
 
     dax_parser = subparsers.add_parser('dax',
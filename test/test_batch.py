@@ -0,0 +1,60 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for algorithms/batch.py
+
+import unittest
+
+from test import config as cfg
+from shadow.algorithms.batch import BatchScheduler
+from shadow.algorithms.heuristic import heft, pheft, fcfs
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestBatchScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+        self.paths = [cfg.test_heuristic_data['topcuoglu_graph_nocalc'],
+                      cfg.test_heuristic_data['topcuoglu_graph'],
+                      cfg.test_heuristic_data['pheft_graph']]
+
+    def test_schedule_many(self):
+        workflows = [Workflow(path) for path in self.paths]
+        with BatchScheduler(processes=2) as scheduler:
+            for name, algorithm in [('heft', heft), ('pheft', pheft),
+                                    ('fcfs', fcfs)]:
+                results = scheduler.schedule_many(workflows, self.env, name)
+                for workflow, result in zip(workflows, results):
+                    workflow.add_environment(self.env)
+                    expected = algorithm(workflow.compile())
+                    self.assertEqual(expected.makespan, result.makespan)
+                    self.assertSequenceEqual(expected.machine.tolist(),
+                                             result.machine.tolist())
+                    self.assertSequenceEqual(expected.ast.tolist(),
+                                             result.ast.tolist())
+
+    def test_paths_and_solution(self):
+        with BatchScheduler(processes=1) as scheduler:
+            results = scheduler.schedule_many(
+                self.paths[:1] * 2, [self.env, self.env])
+        self.assertEqual([80, 80], [r.makespan for r in results])
+        workflow = Workflow(self.paths[0])
+        workflow.add_environment(self.env)
+        solution = results[0].to_solution(workflow.compile())
+        self.assertEqual(80, solution.makespan)
+        self.assertEqual(len(workflow.tasks), len(solution.task_allocations))
@@ -0,0 +1,108 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for models/cache.py
+
+import unittest
+import json
+import os
+import shutil
+import tempfile
+
+from test import config as cfg
+from shadow.algorithms.heuristic import heft
+from shadow.models.cache import cache_path, read_cache
+from shadow.models.loader import stream_workflow
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestBinaryCache(unittest.TestCase):
+    """
+    Workflows and environments loaded from the binary cache must be the
+    same as those parsed from the JSON files. The test data is copied to a
+    temporary directory so no sidecars are left in test/data.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.paths = {}
+        for name in ['topcuoglu_graph', 'topcuoglu_graph_nocalc',
+                     'topcuoglu_graph_system']:
+            path = cfg.test_heuristic_data[name]
+            self.paths[name] = shutil.copy(path, self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_environment_cache(self):
+        path = self.paths['topcuoglu_graph_system']
+        expected = Environment(path)
+        self.assertIsNone(read_cache(path, 'environment'))
+        Environment(path, cache=True)
+        self.assertIsNotNone(read_cache(path, 'environment'))
+        cached = Environment(path, cache=True)
+        self.assertEqual(expected.system_bandwith, cached.system_bandwith)
+        for m, n in zip(expected.machines, cached.machines):
+            self.assertEqual(
+                (m.id, m.index, m.flops, m.memory, m.bandwidth, m.cost),
+                (n.id, n.index, n.flops, n.memory, n.bandwidth, n.cost)
+            )
+
+    def test_workflow_cache(self):
+        env = self.paths['topcuoglu_graph_system']
+        for graph, makespan in [('topcuoglu_graph', 98),
+                                ('topcuoglu_graph_nocalc', 80)]:
+            path = self.paths[graph]
+            Workflow(path, cache=True)
+            self.assertIsNotNone(read_cache(path, 'workflow'))
+            workflow = Workflow(path, cache=True)
+            workflow.add_environment(Environment(env, cache=True))
+            self.assertEqual(makespan, heft(workflow).makespan)
+            expected = Workflow(path)
+            self.assertEqual(
+                [(u.tid, v.tid, d) for u, v, d in
+                 expected.graph.edges(data='transfer_data')],
+                [(u.tid, v.tid, d) for u, v, d in
+                 workflow.graph.edges(data='transfer_data')]
+            )
+            # The streaming loader shares the same cache
+            compiled = stream_workflow(path, cache=True)
+            compiled.add_environment(Environment(env))
+            self.assertEqual(makespan, heft(compiled).makespan)
+
+    def test_invalidation(self):
+        path = self.paths['topcuoglu_graph_nocalc']
+        Workflow(path, cache=True)
+        # Touching the file without changing it keeps the cache
+        os.utime(path, (0, 0))
+        self.assertIsNotNone(read_cache(path, 'workflow'))
+        with open(path, 'r') as infile:
+            wfconfig = json.load(infile)
+        wfconfig['graph']['links'][0]['transfer_data'] += 1
+        with open(path, 'w') as outfile:
+            json.dump(wfconfig, outfile)
+        self.assertIsNone(read_cache(path, 'workflow'))
+        self.assertIsNone(read_cache(path, 'environment'))
+        link = wfconfig['graph']['links'][0]
+        workflow = Workflow(path, cache=True)
+        tasks = {t.tid: t for t in workflow.tasks}
+        self.assertEqual(
+            link['transfer_data'],
+            workflow.graph.edges[tasks[link['source']],
+                                 tasks[link['target']]]['transfer_data']
+        )
+        self.assertIsNotNone(read_cache(path, 'workflow'))
+        self.assertTrue(os.path.isdir(cache_path(path)))
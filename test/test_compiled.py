@@ -0,0 +1,192 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for models/compiled.py and the compiled heuristics
+
+import unittest
+import os
+
+from test import config as cfg
+from shadow.algorithms.heuristic import heft, pheft, fcfs
+from shadow.models.compiled import CompiledWorkflow, CompiledSolution
+from shadow.models.loader import stream_workflow
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+current_dir = os.path.abspath('.')
+
+
+class TestCompiledWorkflow(unittest.TestCase):
+
+    def setUp(self):
+        self.workflow = Workflow("{0}/{1}".format(
+            current_dir, cfg.test_workflow_data['topcuoglu_graph']))
+        self.env = Environment("{0}/{1}".format(
+            current_dir, cfg.test_workflow_data['topcuoglu_graph_system']))
+        self.workflow.add_environment(self.env)
+        self.compiled = self.workflow.compile()
+
+    def test_adjacency(self):
+        self.assertEqual(10, self.compiled.num_tasks)
+        self.assertEqual(self.workflow.graph.number_of_edges(),
+                         self.compiled.num_edges)
+        for i, task in enumerate(self.compiled.tasks):
+            self.assertEqual(
+                [s.tid for s in self.workflow.graph.successors(task)],
+                [self.compiled.tids[s] for s in self.compiled.successors(i)]
+            )
+            self.assertEqual(
+                sorted(p.tid for p in self.workflow.graph.predecessors(task)),
+                sorted(self.compiled.tids[p]
+                       for p in self.compiled.predecessors(i))
+            )
+        # Predecessor entries point back to the same edge
+        for k, e in enumerate(self.compiled.pred_edge):
+            u = self.compiled.tasks[self.compiled.pred_idx[k]]
+            v = self.compiled.tasks[self.compiled.succ_idx[e]]
+            self.assertEqual(
+                self.workflow.graph.edges[u, v]['transfer_data'],
+                self.compiled.transfer_data[e]
+            )
+
+    def test_comm(self):
+        """
+        The workflow and its compiled form share one communication time per
+        edge, which is recalculated when the bandwidth changes
+        """
+        self.assertIs(self.workflow.comm, self.compiled.comm)
+        for e, (u, v, data) in enumerate(
+                self.workflow.graph.edges(data='transfer_data')):
+            self.assertEqual(e, self.workflow.graph.edges[u, v]['edge_index'])
+            self.assertEqual(data, self.workflow.comm_cost(u, v))
+            self.assertEqual(data, self.compiled.comm[e])
+        self.env.system_bandwith = 2
+        self.assertEqual((self.compiled.transfer_data // 2).tolist(),
+                         self.compiled.comm.tolist())
+        self.assertEqual(self.compiled.comm.tolist(),
+                         self.workflow.comm.tolist())
+        self.env.system_bandwith = 0
+        self.assertFalse(self.workflow.comm.any())
+
+    def test_topological_order(self):
+        order = [self.compiled.tids[i]
+                 for i in self.compiled.topological_order()]
+        self.assertSequenceEqual([0, 1, 2, 3, 4, 5, 6, 8, 7, 9], order)
+
+    def test_runtimes(self):
+        for i, task in enumerate(self.compiled.tasks):
+            self.assertEqual(
+                [task.calc_runtime(m) for m in self.env.machines],
+                self.compiled.runtimes[i].tolist()
+            )
+
+
+class TestCompiledHeuristics(unittest.TestCase):
+    """
+    The compiled heuristics must produce the same schedules as the
+    heuristics that operate on the networkx graph.
+    """
+
+    def _compile(self, workflow_path, env_path):
+        workflow = Workflow(workflow_path)
+        workflow.add_environment(Environment(env_path))
+        return workflow, CompiledWorkflow.from_workflow(workflow)
+
+    def _assert_same(self, solution, compiled_solution):
+        self.assertIsInstance(compiled_solution, CompiledSolution)
+        self.assertEqual(solution.makespan, compiled_solution.makespan)
+        converted = compiled_solution.to_solution()
+        self.assertEqual(solution.makespan, converted.makespan)
+        for task, alloc in solution.task_allocations.items():
+            other = converted.task_allocations[task]
+            self.assertEqual(alloc.machine, other.machine)
+            self.assertEqual(alloc.ast, other.ast)
+            self.assertEqual(alloc.aft, other.aft)
+
+    def test_heft(self):
+        for graph in ['topcuoglu_graph', 'topcuoglu_graph_nocalc',
+                      'pheft_graph']:
+            workflow, compiled = self._compile(
+                cfg.test_heuristic_data[graph],
+                cfg.test_heuristic_data['topcuoglu_graph_system']
+            )
+            self._assert_same(heft(workflow), heft(compiled))
+
+    def test_io_heft(self):
+        workflow, compiled = self._compile(
+            'test/data/heuristic/final_heft_data.json',
+            'test/data/heuristic/final_heft_sys_data.json'
+        )
+        self._assert_same(heft(workflow), heft(compiled))
+
+    def test_pheft(self):
+        workflow, compiled = self._compile(
+            cfg.test_heuristic_data['pheft_graph'],
+            cfg.test_heuristic_data['topcuoglu_graph_system']
+        )
+        self._assert_same(pheft(workflow), pheft(compiled))
+        self.assertEqual(122, pheft(compiled).makespan)
+
+    def test_fcfs(self):
+        workflow, compiled = self._compile(
+            cfg.test_heuristic_data['topcuoglu_graph'],
+            cfg.test_heuristic_data['topcuoglu_graph_system']
+        )
+        self._assert_same(fcfs(workflow), fcfs(compiled))
+        self.assertEqual(112, fcfs(compiled).makespan)
+
+
+class TestStreamWorkflow(unittest.TestCase):
+    """
+    Loading a workflow with the streaming loader must produce the same
+    compiled workflow as compiling a Workflow read from the same file.
+    """
+
+    def _assert_same(self, path, env_path, chunk_size):
+        workflow = Workflow(path)
+        workflow.add_environment(Environment(env_path))
+        expected = workflow.compile()
+        streamed = stream_workflow(path, chunk_size=chunk_size)
+        streamed.add_environment(Environment(env_path))
+        self.assertEqual(expected.tids, streamed.tids)
+        self.assertEqual(expected.time, streamed.time)
+        for attr in ['succ_ptr', 'pred_ptr', 'runtimes']:
+            self.assertEqual(getattr(expected, attr).tolist(),
+                             getattr(streamed, attr).tolist())
+        # Successors follow the order of the file, which networkx may not
+        # preserve when relabelling nodes, so compare edges as sets.
+        for i in range(expected.num_tasks):
+            start, end = expected.succ_ptr[i], expected.succ_ptr[i + 1]
+            self.assertEqual(
+                sorted(zip(expected.succ_idx[start:end].tolist(),
+                           expected.comm[start:end].tolist())),
+                sorted(zip(streamed.succ_idx[start:end].tolist(),
+                           streamed.comm[start:end].tolist()))
+            )
+        self.assertEqual(heft(expected).makespan, heft(streamed).makespan)
+        task = streamed.tasks[5]
+        self.assertEqual(
+            [task.calc_runtime(m) for m in streamed.env.machines],
+            streamed.runtimes[5].tolist()
+        )
+
+    def test_stream_workflow(self):
+        for graph in ['topcuoglu_graph', 'topcuoglu_graph_nocalc']:
+            for chunk_size in [7, 1 << 20]:
+                self._assert_same(
+                    cfg.test_heuristic_data[graph],
+                    cfg.test_heuristic_data['topcuoglu_graph_system'],
+                    chunk_size
+                )
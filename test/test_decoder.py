@@ -0,0 +1,83 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for algorithms/decoder.py
+
+import unittest
+
+import numpy as np
+
+from test import config as cfg
+from shadow.algorithms.decoder import ScheduleDecoder, decode
+from shadow.algorithms.fitness import calculate_fitness
+from shadow.algorithms.metaheuristic import PopulationDecoder, heft_individual
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestScheduleDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.workflow = Workflow(cfg.test_heuristic_data['topcuoglu_graph'])
+        env = Environment(cfg.test_heuristic_data['topcuoglu_graph_system'])
+        for i, machine in enumerate(env.machines):
+            machine.cost = i + 1
+        self.workflow.add_environment(env)
+        self.compiled = self.workflow.compile()
+
+    def test_decode_heft(self):
+        machine, priority = heft_individual(self.compiled)
+        # Integer priorities: the position of each task in the HEFT order
+        rank = np.argsort(np.argsort(priority))
+        result = decode(self.compiled, machine, rank)
+        self.assertEqual(98, result.makespan)
+        solution = result.to_solution(self.compiled)
+        self.assertEqual(98, solution.makespan)
+        self.assertEqual(len(self.workflow.tasks),
+                         len(solution.task_allocations))
+        self.assertEqual(calculate_fitness(['cost'], solution)['cost'],
+                         result.cost)
+
+    def test_precedence(self):
+        """
+        Priorities that put successors first are raised, so the order is
+        still topological.
+        """
+        decoder = ScheduleDecoder(self.compiled)
+        machine = np.zeros(self.compiled.num_tasks, dtype=np.int64)
+        priority = -np.arange(self.compiled.num_tasks)
+        result = decoder.decode(machine, priority)
+        position = np.argsort(result.order)
+        for i in range(self.compiled.num_tasks):
+            for p in self.compiled.predecessors(i):
+                self.assertLess(position[p], position[i])
+        self.assertEqual(self.compiled.runtimes[:, 0].sum(), result.makespan)
+        with self.assertRaises(ValueError):
+            decoder.decode(machine[1:], priority[1:])
+
+    def test_population_decoder(self):
+        """
+        The population decoder gives the same schedules
+        """
+        rng = np.random.default_rng(0)
+        machine = rng.integers(0, 3, size=(10, self.compiled.num_tasks))
+        priority = rng.integers(0, 5, size=(10, self.compiled.num_tasks))
+        decoder = ScheduleDecoder(self.compiled)
+        ast, aft, order = PopulationDecoder(self.compiled).decode(
+            machine, priority)
+        for k in range(10):
+            result = decoder.decode(machine[k], priority[k])
+            self.assertTrue(np.array_equal(aft[k], result.aft))
+            self.assertTrue(np.array_equal(order[k], result.order))
@@ -0,0 +1,108 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for algorithms/dynamic.py
+
+import unittest
+
+import numpy as np
+
+from test import config as cfg
+from shadow.algorithms.dynamic import (
+    ready_list_schedule, static_levels, hlfet, dls, etf, DynamicLevel
+)
+from shadow.algorithms.heuristic import hlfet as heuristic_hlfet
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestReadyListSchedule(unittest.TestCase):
+
+    def setUp(self):
+        self.workflow = Workflow(
+            cfg.test_heuristic_data['topcuoglu_graph_nocalc'])
+        self.workflow.add_environment(Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system']))
+        self.compiled = self.workflow.compile()
+
+    def _assert_valid(self, solution):
+        compiled = self.compiled
+        for i in range(compiled.num_tasks):
+            m = solution.machine[i]
+            self.assertEqual(compiled.runtimes[i][m],
+                             solution.aft[i] - solution.ast[i])
+            for e in range(compiled.pred_ptr[i], compiled.pred_ptr[i + 1]):
+                p = compiled.pred_idx[e]
+                comm = 0
+                if solution.machine[p] != m:
+                    comm = compiled.comm[compiled.pred_edge[e]]
+                self.assertGreaterEqual(solution.ast[i],
+                                        solution.aft[p] + comm)
+        for m in range(len(compiled.env.machines)):
+            on_machine = np.flatnonzero(solution.machine == m)
+            intervals = sorted(zip(solution.ast[on_machine],
+                                   solution.aft[on_machine]))
+            for first, second in zip(intervals, intervals[1:]):
+                self.assertLessEqual(first[1], second[0])
+
+    def test_static_levels(self):
+        levels = static_levels(self.compiled)
+        self.assertAlmostEqual(61, levels[0])
+        self.assertAlmostEqual(self.compiled.ave_runtimes[9], levels[9])
+
+    def test_priorities(self):
+        for algorithm, makespan in [(hlfet, 93), (dls, 91), (etf, 93)]:
+            solution = algorithm(self.compiled)
+            self.assertEqual(makespan, solution.makespan)
+            self._assert_valid(solution)
+            self.assertEqual(
+                makespan, algorithm(self.workflow).makespan)
+        self.assertEqual(93, heuristic_hlfet(self.workflow).makespan)
+
+    def test_custom_priority(self):
+        class EarliestFinish(DynamicLevel):
+            def order(self, state, i, m):
+                return state.runtimes[i][m]
+
+        solution = ready_list_schedule(self.compiled, EarliestFinish())
+        self._assert_valid(solution)
+        with self.assertRaises(ValueError):
+            ready_list_schedule(self.compiled, 'missing')
+
+    def test_machine_classes(self):
+        """
+        With two identical copies of each machine, only considering the
+        earliest available machine of each class gives the same schedule.
+        """
+        resources = {}
+        for i in range(2):
+            for name, flops in [('cat0', 7000.0), ('cat1', 6000.0),
+                                ('cat2', 11000.0)]:
+                resources['{0}_m{1}'.format(name, i)] = {
+                    'flops': flops, 'compute_bandwidth': 1.0
+                }
+        config = {'system': {'resources': resources,
+                             'system_bandwidth': 1.0}}
+        workflow = Workflow(cfg.test_heuristic_data['topcuoglu_graph'])
+        self.compiled = workflow.compile()
+        for priority in ['static_level', 'dynamic_level', 'etf']:
+            makespans = []
+            for collapse in [False, True]:
+                env = Environment(config, dictionary=True, collapse=collapse)
+                self.compiled.add_environment(env)
+                solution = ready_list_schedule(self.compiled, priority)
+                self._assert_valid(solution)
+                makespans.append(solution.makespan)
+            self.assertEqual(makespans[0], makespans[1])
@@ -35,3 +35,22 @@ class TestEnvironmentInit(unittest.TestCase):
 	def tearDown(self) -> None:
 		pass
 
+
+class TestMachineClasses(unittest.TestCase):
+	def setUp(self) -> None:
+		resources = {}
+		for i in range(4):
+			resources['cat0_m{0}'.format(i)] = {'flops': 100}
+			resources['cat1_m{0}'.format(i)] = {'flops': 200}
+		self.config = {'system': {'resources': resources}}
+
+	def test_collapse(self):
+		env = Environment(self.config, dictionary=True, collapse=True)
+		self.assertEqual(2, len(env.machine_classes))
+		cat0, cat1 = env.machine_classes
+		self.assertEqual('cat0', cat0.machine_type)
+		self.assertSequenceEqual([0, 2, 4, 6], cat0.indices.tolist())
+		self.assertSequenceEqual([1, 1, 1, 1], env.machine_class_index[
+			cat1.indices].tolist())
+		self.assertIsNone(Environment(self.config, dictionary=True)
+						  .machine_classes)
@@ -0,0 +1,114 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for the NumPy cost generation of utils/shadowgen/generator.py
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.shadowgen.generator import (
+    draw_comp_costs, draw_data_costs, draw_graph_costs, graph_rng,
+    generate_graph_costs
+)
+from utils.shadowgen.synthetic import generate_workflow
+
+try:
+    import pydot
+except ImportError:
+    pydot = None
+
+
+def _costs(index):
+    return draw_graph_costs(1000, 3000, 0.5, 5000, 500, seed=7, index=index)
+
+
+class TestCostGeneration(unittest.TestCase):
+
+    def test_distribution(self):
+        rng = graph_rng(20)
+        comp = draw_comp_costs(rng, 10000, 5000, 500, multiplier=10)
+        self.assertTrue(((45000 <= comp) & (comp < 55000)).all())
+        self.assertTrue((comp % 10 == 0).all())
+        data = draw_data_costs(rng, 10000, 5000, 500, 1, 0.5)
+        self.assertTrue(((2250 <= data) & (data < 2750)).all())
+
+    def test_multiplier(self):
+        # As generate_data_costs, data costs are not rounded down to a
+        # multiple of the multiplier; as generate_graph_costs, graph costs
+        # are
+        data = draw_data_costs(graph_rng(20), 1000, 5000, 500, 10, 0.5)
+        self.assertTrue((data % 10 != 0).any())
+        comp, data = draw_graph_costs(100, 1000, 0.5, 5000, 500,
+                                      multiplier=10)
+        self.assertTrue((comp % 10 == 0).all())
+        self.assertTrue((data % 10 == 0).all())
+
+    def test_independent_streams(self):
+        state = random.getstate()
+        comp, data = _costs(0)
+        self.assertEqual(state, random.getstate())
+        same_comp, same_data = _costs(0)
+        self.assertTrue(np.array_equal(comp, same_comp))
+        self.assertTrue(np.array_equal(data, same_data))
+        other_comp, _ = _costs(1)
+        self.assertFalse(np.array_equal(comp, other_comp))
+
+    def test_serial_and_parallel(self):
+        serial = [_costs(index) for index in range(4)]
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            parallel = list(pool.map(_costs, reversed(range(4))))[::-1]
+        for (comp, data), (pcomp, pdata) in zip(serial, parallel):
+            self.assertTrue(np.array_equal(comp, pcomp))
+            self.assertTrue(np.array_equal(data, pdata))
+
+    def test_synthetic_workflows(self):
+        first = generate_workflow('layered', 500, seed=3, index=1)
+        generate_workflow('layered', 500, seed=3, index=0)
+        again = generate_workflow('layered', 500, seed=3, index=1)
+        self.assertTrue(np.array_equal(first.succ_idx, again.succ_idx))
+        self.assertTrue(np.array_equal(first.comp, again.comp))
+        self.assertTrue(np.array_equal(first.transfer_data,
+                                       again.transfer_data))
+
+    @unittest.skipIf(pydot is None, 'pydot is required to read DOT files')
+    def test_graph_costs(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            dot_path = os.path.join(tmpdir, 'graph.dot')
+            with open(dot_path, 'w') as outfile:
+                outfile.write('digraph { 0 -> 1; 0 -> 2; 1 -> 3; 2 -> 3; }')
+            json_path = os.path.join(tmpdir, 'graph.json')
+            state = random.getstate()
+            generate_graph_costs(dot_path, json_path, 0.5, 5000, 500,
+                                 seed=7, index=2)
+            self.assertEqual(state, random.getstate())
+            with open(json_path) as infile:
+                graph = json.load(infile)['graph']
+            comp, data = draw_graph_costs(4, 4, 0.5, 5000, 500, seed=7,
+                                          index=2)
+            self.assertEqual(comp.tolist(),
+                             [node['comp'] for node in graph['nodes']])
+            self.assertEqual(sorted(data.tolist()),
+                             sorted(link['transfer_data']
+                                    for link in graph['links']))
+        finally:
+            shutil.rmtree(tmpdir)
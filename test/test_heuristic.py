@@ -17,15 +17,19 @@
 import unittest
 import networkx as nx
 import os
+import json
+import shutil
+import tempfile
 import logging
 
 from test import config as cfg
 from shadow.algorithms.heuristic import heft, pheft, \
     fcfs, generate_ranking_matrix, \
-    calculate_upward_ranks
+    calculate_upward_ranks, compiled_pheft
 from shadow.models.workflow import Workflow, Task
 from shadow.models.environment import Environment
 from shadow.models.solution import Solution, Allocation
+from utils.shadowgen.synthetic import generate_workflow, write_workflow
 
 # CHANGE THIS TO GET DEBUG VALUES FROM LOGS
 # logging.basicConfig(level='WARNING')
@@ -93,10 +97,78 @@ class TestHeftMethods(unittest.TestCase):
         for node in sorted_tasks:
             self.assertTrue(rank_values[node.tid] == int(node.rank))
 
+    def test_rank_vectorised(self):
+        task_ranks = calculate_upward_ranks(self.workflow, progress=False)
+        level_ranks = calculate_upward_ranks(self.workflow, progress=False,
+                                             vectorised=True)
+        self.assertDictEqual(task_ranks, level_ranks)
+
     def test_schedule(self):
         solution = heft(self.workflow)
         self.assertEqual(80, solution.makespan)
 
+    def test_schedule_vectorised(self):
+        serial = heft(self.workflow)
+        vectorised = heft(self.workflow, vectorised=True)
+        self.assertEqual(80, vectorised.makespan)
+        for task, alloc in serial.task_allocations.items():
+            self.assertEqual(alloc.machine,
+                             vectorised.task_allocations[task].machine)
+            self.assertEqual(alloc.ast, vectorised.task_allocations[task].ast)
+
+    def test_schedule_vectorised_large(self):
+        """
+        The vectorised search gives the same schedule as the serial search
+        on a larger workflow, with many heterogeneous machines (on which
+        idle gaps are searched)
+        """
+        resources = {
+            'cat{0}_m{1}'.format(i % 4, i): {
+                'flops': float(1000 * (5 + i % 7)), 'compute_bandwidth': 1.0
+            } for i in range(48)
+        }
+        config = {'system': {'resources': resources,
+                             'system_bandwidth': 1.0}}
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'layered.json')
+            write_workflow(generate_workflow('layered', 500, seed=5), path)
+            schedules = []
+            for vectorised in [False, True]:
+                workflow = Workflow(path)
+                workflow.add_environment(
+                    Environment(config, dictionary=True))
+                solution = heft(workflow, vectorised=vectorised)
+                schedules.append(sorted(
+                    (task.tid, alloc.machine.id, alloc.ast, alloc.aft)
+                    for task, alloc in solution.task_allocations.items()))
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertEqual(schedules[0], schedules[1])
+
+    def test_schedule_machine_classes(self):
+        """
+        With two identical copies of each machine, evaluating only the
+        earliest-available machine of each class gives the same makespan.
+        """
+        resources = {}
+        for i in range(2):
+            for name, flops in [('cat0', 7000.0), ('cat1', 6000.0),
+                                ('cat2', 11000.0)]:
+                resources['{0}_m{1}'.format(name, i)] = {
+                    'flops': flops, 'compute_bandwidth': 1.0
+                }
+        config = {'system': {'resources': resources,
+                             'system_bandwidth': 1.0}}
+        makespans = []
+        for collapse in [False, True]:
+            workflow = Workflow(cfg.test_heuristic_data['topcuoglu_graph'])
+            env = Environment(config, dictionary=True, collapse=collapse)
+            workflow.add_environment(env)
+            makespans.append(heft(workflow).makespan)
+        self.assertEqual(3, len(env.machine_classes))
+        self.assertEqual(makespans[0], makespans[1])
+
 
 class TestHeftMethodCalcTime(unittest.TestCase):
     def setUp(self):
@@ -117,6 +189,10 @@ class TestHeftMethodCalcTime(unittest.TestCase):
         solution = heft(self.workflow)
         self.assertEqual(98, solution.makespan)
 
+    def test_schedule_vectorised(self):
+        solution = heft(self.workflow, vectorised=True)
+        self.assertEqual(98, solution.makespan)
+
     def test_io_schedule(self):
         workflow = Workflow('test/data/heuristic/final_heft_data.json')
         env = Environment('test/data/heuristic/final_heft_sys_data.json')
@@ -181,6 +257,16 @@ class TestPHeftMethods(unittest.TestCase):
             self.assertEqual(self.up_oct_rank_values[node.tid],
                              node.rank)
 
+    def test_oct_table(self):
+        oct_rank_matrix = generate_ranking_matrix(self.workflow)
+        self.assertEqual((len(self.workflow.tasks),
+                          len(self.workflow.env.machines)),
+                         oct_rank_matrix.table.shape)
+        ranks = oct_rank_matrix.ranks()
+        for task in self.workflow.tasks:
+            self.assertEqual(self.up_oct_rank_values[task.tid],
+                             ranks[task.index])
+
     def test_heft_schedule(self):
         # upward_rank(self.workflow)
         solution = heft(self.workflow)
@@ -192,6 +278,83 @@ class TestPHeftMethods(unittest.TestCase):
         self.assertTrue(solution.makespan == 122)
 
 
+class TestPHeftEntryTasks(unittest.TestCase):
+    """
+    A workflow with two entry tasks (0 and 1), where the mean OCT rank of
+    task 0 (23) is lower than that of its successor, task 2 (24). Task 1
+    has the highest rank, so it is allocated first, to machine 0 at time
+    0; task 0 is then also best placed on machine 0.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        comp = [[1, 16, 5], [11, 5, 18], [2, 18, 4], [2, 6, 6], [5, 12, 17],
+                [10, 16, 12]]
+        links = [(0, 2, 10), (0, 3, 0), (0, 5, 1), (1, 2, 13), (2, 4, 14),
+                 (4, 5, 11)]
+        config = {
+            'header': {'time': True},
+            'graph': {
+                'directed': True, 'multigraph': False, 'graph': {},
+                'nodes': [{'id': i, 'comp': c} for i, c in enumerate(comp)],
+                'links': [{'source': u, 'target': v, 'transfer_data': d}
+                          for u, v, d in links]
+            }
+        }
+        path = os.path.join(self.tmpdir, 'entry_tasks.json')
+        with open(path, 'w') as outfile:
+            json.dump(config, outfile)
+        self.workflow = Workflow(path)
+        env = Environment(cfg.test_workflow_data['topcuoglu_graph_system'])
+        self.workflow.add_environment(env)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def assertValidSchedule(self, allocations):
+        """
+        :param allocations: (machine, ast, aft) of each task, by task id
+        """
+        for u, v in self.workflow.graph.edges:
+            finish = allocations[u.tid][2]
+            if allocations[u.tid][0] != allocations[v.tid][0]:
+                finish += self.workflow.comm_cost(u, v)
+            self.assertLessEqual(finish, allocations[v.tid][1])
+        for machine in set(m for m, _, _ in allocations.values()):
+            times = sorted((ast, aft) for m, ast, aft in allocations.values()
+                           if m == machine)
+            for (_, aft), (ast, _) in zip(times, times[1:]):
+                self.assertLessEqual(aft, ast)
+
+    def test_ranks(self):
+        ranks = generate_ranking_matrix(self.workflow).ranks()
+        self.assertEqual([23, 25, 24, 0, 12, 0], ranks.tolist())
+
+    def test_pheft(self):
+        solution = pheft(self.workflow)
+        allocations = {
+            task.tid: (alloc.machine.index, alloc.ast, alloc.aft)
+            for task, alloc in solution.task_allocations.items()
+        }
+        self.assertValidSchedule(allocations)
+        self.assertEqual((0, 0, 11), allocations[1])
+        self.assertEqual((0, 11, 12), allocations[0])
+        self.assertEqual(29, solution.makespan)
+
+    def test_compiled_pheft(self):
+        compiled = self.workflow.compile()
+        solution = compiled_pheft(compiled)
+        self.assertEqual([1, 0, 2, 4, 3, 5], solution.order.tolist())
+        allocations = {
+            tid: (int(m), ast, aft) for tid, m, ast, aft in zip(
+                compiled.tids, solution.machine.tolist(),
+                solution.ast.tolist(), solution.aft.tolist())
+        }
+        self.assertValidSchedule(allocations)
+        self.assertEqual((0, 11, 12), allocations[0])
+        self.assertEqual(pheft(self.workflow).makespan, solution.makespan)
+
+
 @unittest.SkipTest
 class TestDALiuGEGraph(unittest.TestCase):
 
@@ -0,0 +1,57 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for models/intervals.py
+
+import unittest
+import random
+
+from shadow.models.intervals import FreeSlotIndex, earliest_start
+
+
+class TestFreeSlotIndex(unittest.TestCase):
+
+    def test_gaps(self):
+        index = FreeSlotIndex.from_intervals([(10, 20), (30, 35), (0, 5)])
+        self.assertSequenceEqual([0, 10, 30], index.starts)
+        self.assertSequenceEqual([5, 20, 35], index.finishes)
+        self.assertEqual(5, index.earliest_start(0, 5))
+        self.assertEqual(20, index.earliest_start(0, 6))
+        self.assertEqual(22, index.earliest_start(22, 8))
+        self.assertEqual(35, index.earliest_start(22, 9))
+        self.assertEqual(40, index.earliest_start(40, 100))
+        # The gap before the first allocation
+        index = FreeSlotIndex.from_intervals([(10, 20)])
+        self.assertEqual(2, index.earliest_start(2, 8))
+        self.assertEqual(20, index.earliest_start(2, 9))
+
+    def test_matches_linear_search(self):
+        """
+        Slots found by the index are the same as those found by scanning
+        every gap on the machine.
+        """
+        rng = random.Random(10)
+        for _ in range(50):
+            index = FreeSlotIndex()
+            for _ in range(100):
+                est, duration = rng.randint(0, 300), rng.randint(1, 20)
+                start = index.earliest_start(est, duration)
+                self.assertEqual(
+                    earliest_start(index.starts, index.finishes, est,
+                                   duration),
+                    start
+                )
+                index.add(start, start + duration)
+            self.assertEqual(sorted(index.starts), index.starts)
@@ -0,0 +1,89 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for algorithms/localsearch.py
+
+import random
+import unittest
+
+import numpy as np
+
+from test import config as cfg
+from shadow.algorithms.heuristic import heft, compiled_heft
+from shadow.algorithms.localsearch import (
+    local_search, MOVES, _Schedule, _propose
+)
+from shadow.models.compiled import CompiledSolution, solution_arrays
+from shadow.models.simulator import Simulator, simulate
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestLocalSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.workflow = Workflow(cfg.test_heuristic_data['topcuoglu_graph'])
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+        self.workflow.add_environment(self.env)
+        self.compiled = self.workflow.compile()
+
+    def test_incremental_moves(self):
+        """
+        The times after each move match a full simulation of the new
+        schedule, and undoing a move restores the previous schedule.
+        """
+        schedule = _Schedule(self.compiled, *solution_arrays(
+            self.compiled, compiled_heft(self.compiled)))
+        self.assertEqual(98, schedule.makespan)
+        simulator = Simulator(self.compiled)
+        rng = random.Random(0)
+        for _ in range(200):
+            move = _propose(rng, schedule, MOVES)
+            if move is None:
+                continue
+            before = (list(schedule.machine), list(schedule.aft),
+                      [list(s) for s in schedule.sequence], schedule.makespan)
+            undo = schedule.apply(move)
+            if undo is None:
+                continue
+            solution = CompiledSolution(
+                self.compiled, np.array(schedule.machine),
+                np.array(schedule.ast), None, None, 0)
+            result = simulator.run(solution)
+            self.assertTrue(np.array_equal(result.finish, schedule.aft))
+            self.assertEqual(result.makespan, schedule.makespan)
+            if rng.random() < 0.5:
+                schedule.undo(undo)
+                self.assertEqual(
+                    before,
+                    (list(schedule.machine), list(schedule.aft),
+                     [list(s) for s in schedule.sequence], schedule.makespan))
+
+    def test_local_search(self):
+        solution = local_search(self.workflow, max_iterations=2000,
+                                time_budget=10, seed=0)
+        self.assertLessEqual(solution.makespan, heft(self.workflow).makespan)
+        self.assertEqual(len(self.workflow.tasks),
+                         len(solution.task_allocations))
+        result = local_search(self.compiled, max_iterations=2000,
+                              time_budget=10, temperature=5, seed=0)
+        self.assertLess(result.makespan, 98)
+        self.assertEqual(result.makespan,
+                         simulate(self.compiled, self.env, result).makespan)
+
+    def test_time_budget(self):
+        result = local_search(self.compiled, time_budget=0)
+        self.assertEqual(98, result.makespan)
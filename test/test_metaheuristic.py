@@ -0,0 +1,159 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for algorithms/metaheuristic.py
+
+import unittest
+
+import numpy as np
+
+from test import config as cfg
+from shadow.algorithms.fitness import calculate_fitness
+from shadow.algorithms.heuristic import heft
+from shadow.algorithms.metaheuristic import (
+    ga, nsga2, PopulationDecoder, heft_individual, non_dominated_sort,
+    crowding_distance, _select, _crowded_tournament
+)
+from shadow.models.simulator import simulate
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestPopulationDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.workflow = Workflow(cfg.test_heuristic_data['topcuoglu_graph'])
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+        for i, machine in enumerate(self.env.machines):
+            machine.cost = i + 1
+        self.workflow.add_environment(self.env)
+        self.compiled = self.workflow.compile()
+        self.decoder = PopulationDecoder(self.compiled)
+
+    def test_heft_individual(self):
+        machine, priority = heft_individual(self.compiled)
+        fitness = self.decoder.fitness(machine, priority, ['time', 'cost'])
+        solution = heft(self.workflow)
+        self.assertEqual(98, fitness['time'][0])
+        self.assertEqual(calculate_fitness(['cost'], solution)['cost'],
+                         fitness['cost'][0])
+
+    def test_precedence(self):
+        """
+        Random priorities are raised so that predecessors come first, and
+        every decoded schedule can be executed as planned.
+        """
+        rng = np.random.default_rng(0)
+        machine = rng.integers(0, 3, size=(20, self.compiled.num_tasks))
+        priority = rng.random((20, self.compiled.num_tasks))
+        ast, aft, order = self.decoder.decode(machine, priority)
+        for k in range(20):
+            position = np.argsort(order[k])
+            for i in range(self.compiled.num_tasks):
+                for p in self.compiled.predecessors(i):
+                    self.assertLess(position[p], position[i])
+        fitness = self.decoder.fitness(machine, priority)
+        self.assertTrue(np.array_equal(aft.max(axis=1), fitness['time']))
+
+
+class TestGeneticAlgorithm(unittest.TestCase):
+
+    def setUp(self):
+        self.workflow = Workflow(cfg.test_heuristic_data['topcuoglu_graph'])
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+        self.workflow.add_environment(self.env)
+
+    def test_ga(self):
+        solution = ga(self.workflow, population=20, generations=20, seed=0)
+        self.assertLessEqual(solution.makespan, 98)
+        self.assertEqual(len(self.workflow.tasks),
+                         len(solution.task_allocations))
+        compiled = self.workflow.compile()
+        result = ga(compiled, population=20, generations=20, seed=0)
+        self.assertEqual(solution.makespan, result.makespan)
+        self.assertEqual(result.makespan,
+                         simulate(compiled, self.env, result).makespan)
+
+    def test_ga_processes(self):
+        compiled = self.workflow.compile()
+        serial = ga(compiled, population=20, generations=5, seed=1)
+        parallel = ga(compiled, population=20, generations=5, seed=1,
+                      processes=2)
+        self.assertEqual(serial.makespan, parallel.makespan)
+        self.assertTrue(np.array_equal(serial.machine, parallel.machine))
+
+
+class TestNSGA2(unittest.TestCase):
+
+    def setUp(self):
+        self.workflow = Workflow(cfg.test_heuristic_data['topcuoglu_graph'])
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+        for i, machine in enumerate(self.env.machines):
+            machine.cost = i + 1
+        self.workflow.add_environment(self.env)
+
+    def test_non_dominated_sort(self):
+        points = np.array([[1, 5], [2, 2], [5, 1], [3, 3], [4, 4], [2, 2],
+                           [6, 6]])
+        self.assertListEqual([0, 0, 0, 1, 2, 0, 3],
+                             non_dominated_sort(points, block=2).tolist())
+
+    def test_crowding_distance(self):
+        points = np.array([[1, 4], [2, 3], [4, 1], [3, 3], [5, 5]])
+        rank = non_dominated_sort(points)
+        distance = crowding_distance(points, rank)
+        self.assertEqual(np.inf, distance[0])
+        self.assertEqual(np.inf, distance[2])
+        self.assertAlmostEqual(3 / 3 + 3 / 3, distance[1])
+        # Fronts of one point are at both ends
+        self.assertEqual(np.inf, distance[3])
+        self.assertEqual(np.inf, distance[4])
+
+    def test_selection_order(self):
+        """
+        The rank and distance used in a tournament belong to the
+        individual in the same row of the selected population
+        """
+        values = np.array([[5, 1], [4, 4], [1, 5], [0, 0], [6, 6], [3, 3]])
+        machine = np.arange(6)[:, None]
+        priority = np.zeros((6, 1))
+        machine, priority, values, rank, distance = _select(
+            machine, priority, values, 6)
+        planted = int(np.flatnonzero(machine[:, 0] == 3)[0])
+        self.assertEqual([0, 0], values[planted].tolist())
+        self.assertEqual(0, rank[planted])
+        self.assertTrue((np.delete(rank, planted) > 0).all())
+        rng = np.random.default_rng(0)
+        winners = _crowded_tournament(rng, rank, distance, 200)
+        rng = np.random.default_rng(0)
+        contenders = rng.integers(0, len(rank), size=(200, 2))
+        involved = (contenders == planted).any(axis=1)
+        self.assertTrue(involved.any())
+        self.assertTrue((winners[involved] == planted).all())
+
+    def test_nsga2(self):
+        front = nsga2(self.workflow, population=30, generations=20, seed=0,
+                      archive_size=10)
+        self.assertLessEqual(len(front), 10)
+        points = np.array([
+            [s.makespan, calculate_fitness(['cost'], s)['cost']]
+            for s in front
+        ])
+        self.assertTrue((non_dominated_sort(points) == 0).all())
+        self.assertTrue((np.diff(points[:, 0]) > 0).all())
+        self.assertLessEqual(points[0, 0], 98)
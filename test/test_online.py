@@ -0,0 +1,79 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for algorithms/online.py
+
+import unittest
+
+from test import config as cfg
+from shadow.algorithms.online import OnlineScheduler
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestOnlineScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+        self.workflow = Workflow(
+            cfg.test_heuristic_data['topcuoglu_graph_nocalc'])
+
+    def _replay(self, scheduler, delay=0):
+        """
+        Feed the workflow to the scheduler one task at a time, completing
+        each task (late by `delay`) once all its predecessors are known
+        """
+        graph = self.workflow.graph
+        for task in graph:
+            scheduler.add_task(task.tid, graph.nodes[task]['comp'])
+            for pretask in graph.predecessors(task):
+                scheduler.add_edge(pretask.tid, task.tid,
+                                   graph.edges[pretask, task]['transfer_data'])
+        scheduler.allocate()
+        pending = [t.tid for t in graph]
+        while pending:
+            for tid in pending:
+                task = scheduler._tasks[tid]
+                alloc = scheduler.solution.task_allocations.get(task)
+                if alloc is not None:
+                    scheduler.task_completed(tid, finish=alloc.aft + delay)
+                    pending.remove(tid)
+                    break
+
+    def test_events(self):
+        scheduler = OnlineScheduler(self.env, time=True)
+        scheduler.add_task('a', [10, 20, 30])
+        scheduler.add_task('b', [5, 5, 5])
+        scheduler.add_edge('a', 'b', transfer_data=100)
+        allocations = scheduler.allocate()
+        self.assertEqual(['a'], [alloc.task.tid for alloc in allocations])
+        self.assertEqual(10, scheduler.makespan)
+        allocations = scheduler.task_completed('a', finish=12)
+        self.assertEqual(['b'], [alloc.task.tid for alloc in allocations])
+        # 'b' runs on the same machine as 'a', as soon as it finishes
+        self.assertEqual((12, 17), (allocations[0].ast, allocations[0].aft))
+        with self.assertRaises(RuntimeError):
+            scheduler.add_edge('a', 'b')
+
+    def test_replay_workflow(self):
+        scheduler = OnlineScheduler(self.env, time=True)
+        self._replay(scheduler)
+        self.assertEqual(len(self.workflow.tasks),
+                         len(scheduler.solution.task_allocations))
+        makespan = scheduler.makespan
+        delayed = OnlineScheduler(self.env, time=True)
+        self._replay(delayed, delay=5)
+        self.assertGreater(delayed.makespan, makespan)
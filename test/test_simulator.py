@@ -0,0 +1,100 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for models/simulator.py
+
+import unittest
+
+import numpy as np
+
+from test import config as cfg
+from shadow.algorithms.heuristic import heft
+from shadow.models.compiled import CompiledSolution
+from shadow.models.simulator import Simulator, simulate
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+        self.workflow = Workflow(
+            cfg.test_heuristic_data['topcuoglu_graph_nocalc'])
+        self.workflow.add_environment(self.env)
+        self.compiled = self.workflow.compile()
+
+    def test_replay_heft(self):
+        """
+        HEFT starts every task as early as it can, so executing its
+        mapping reproduces the planned times exactly.
+        """
+        solution = heft(self.workflow)
+        result = simulate(self.workflow, self.env, solution)
+        self.assertEqual(80, result.makespan)
+        for i, task in enumerate(self.compiled.tasks):
+            alloc = solution.task_allocations[task]
+            self.assertEqual(alloc.ast, result.start[i])
+            self.assertEqual(alloc.aft, result.finish[i])
+        compiled = heft(self.compiled)
+        result = simulate(self.compiled, self.env, compiled)
+        self.assertTrue(np.array_equal(compiled.aft, result.finish))
+        self.assertEqual(
+            (compiled.aft - compiled.ast).sum(), result.busy.sum())
+
+    def test_transfer_volume(self):
+        solution = heft(self.compiled)
+        result = Simulator(self.compiled).run(solution)
+        source = np.repeat(np.arange(self.compiled.num_tasks),
+                           np.diff(self.compiled.succ_ptr))
+        remote = (solution.machine[source]
+                  != solution.machine[self.compiled.succ_idx])
+        self.assertEqual(self.compiled.transfer_data[remote].sum(),
+                         result.transfer_volume)
+        self.assertEqual(result.transfer_volume, result.sent.sum())
+
+        # On a single machine, no data is sent
+        machine = np.zeros(self.compiled.num_tasks, dtype=np.int64)
+        order = self.compiled.topological_order()
+        ast = np.empty(self.compiled.num_tasks)
+        ast[order] = np.arange(self.compiled.num_tasks)
+        result = Simulator(self.compiled).run(
+            CompiledSolution(self.compiled, machine, ast, None, order, 0))
+        self.assertEqual(0, result.transfer_volume)
+        self.assertEqual(self.compiled.runtimes[:, 0].sum(), result.makespan)
+
+    def test_perturbation(self):
+        simulator = Simulator(self.compiled)
+        solution = heft(self.compiled)
+        slower = simulator.run(
+            solution, perturbation=np.full(self.compiled.num_tasks, 2.0))
+        self.assertEqual(2 * simulator.run(solution).busy.sum(),
+                         slower.busy.sum())
+        self.assertGreater(slower.makespan, solution.makespan)
+        with self.assertRaises(ValueError):
+            simulator.run(solution, perturbation=[1.0])
+
+    def test_invalid_order(self):
+        """
+        A machine order that runs a task before its predecessor on the same
+        machine cannot be executed.
+        """
+        solution = heft(self.compiled)
+        machine = np.zeros(self.compiled.num_tasks, dtype=np.int64)
+        ast = -solution.ast.astype(float)
+        with self.assertRaises(RuntimeError):
+            Simulator(self.compiled).run(
+                CompiledSolution(self.compiled, machine, ast, None, None, 0))
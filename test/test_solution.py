@@ -5,6 +5,7 @@ from test import config as cfg
 
 from shadow.models.workflow import Workflow
 from shadow.models.environment import Environment
+from shadow.models.solution import Solution
 
 from shadow.algorithms.heuristic import heft
 
@@ -25,3 +26,47 @@ class TestWorkflowClass(unittest.TestCase):
 		for i, alloc in enumerate(order):
 			self.assertEqual(correct_order[i], alloc.tid)
 
+
+	def test_add_allocation(self):
+		solution = Solution(self.env.machines)
+		tasks = list(self.workflow.tasks)
+		m0, m1 = self.env.machines[0], self.env.machines[1]
+		solution.add_allocation(tasks[0], m0, ast=10, aft=20)
+		solution.add_allocation(tasks[1], m0, ast=0, aft=5)
+		solution.add_allocation(tasks[2], m1, ast=10, aft=15)
+		self.assertEqual(15, solution.makespan)
+		solution.add_allocation(tasks[3], m1, ast=3, aft=8)
+		self.assertEqual(15, solution.makespan)
+		self.assertSequenceEqual(
+			[tasks[1], tasks[3], tasks[0], tasks[2]],
+			[alloc.task for alloc in solution.execution_order]
+		)
+		self.assertSequenceEqual(
+			[tasks[1], tasks[0]],
+			[alloc.task for alloc in solution.list_machine_allocations(m0)]
+		)
+		self.assertEqual(
+			tasks[0], solution.latest_allocation_on_machine(m0).task
+		)
+
+	def test_reschedule(self):
+		"""
+		Delaying a task moves its downstream cone, and gives the same
+		schedule as re-simulating the whole mapping.
+		"""
+		solution = heft(self.workflow)
+		tasks = {t.tid: t for t in self.workflow.tasks}
+		before = {t: (a.ast, a.aft) for t, a in
+				  solution.task_allocations.items()}
+		alloc = solution.task_allocations[tasks[3]]
+		makespan = solution.reschedule(
+			self.workflow, tasks[3], runtime=alloc.aft - alloc.ast + 10)
+		after = {t: (a.ast, a.aft) for t, a in
+				 solution.task_allocations.items()}
+		self.assertEqual(before[tasks[0]], after[tasks[0]])
+		self.assertEqual(before[tasks[3]][1] + 10, after[tasks[3]][1])
+		self.assertGreaterEqual(makespan, 98)
+		solution.resimulate(self.workflow)
+		self.assertEqual(after, {t: (a.ast, a.aft) for t, a in
+								 solution.task_allocations.items()})
+		self.assertEqual(makespan, solution.makespan)
@@ -0,0 +1,70 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for algorithms/stats.py and the instrumented heuristics
+
+import json
+import unittest
+
+from test import config as cfg
+from shadow.algorithms.heuristic import heft, pheft, fcfs
+from shadow.algorithms.stats import SchedulerStats
+from shadow.models.workflow import Workflow
+from shadow.models.environment import Environment
+
+
+class TestSchedulerStats(unittest.TestCase):
+
+    def setUp(self):
+        self.workflow = Workflow(cfg.test_heuristic_data['topcuoglu_graph'])
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+        self.workflow.add_environment(self.env)
+        self.compiled = self.workflow.compile()
+
+    def test_heft(self):
+        stats = SchedulerStats()
+        solution = heft(self.workflow, stats=stats)
+        self.assertEqual(98, solution.makespan)
+        self.assertIs(stats, solution.stats)
+        self.assertListEqual(['ranking', 'sorting', 'allocation'],
+                             list(stats.phases))
+        for timing in stats.phases.values():
+            self.assertGreaterEqual(timing.wall, 0)
+            self.assertGreaterEqual(timing.cpu, 0)
+        # Every task but the first is probed on each of the 3 machines
+        self.assertEqual(9 * 3, stats.eft_probes)
+        self.assertGreater(stats.gaps_scanned, 0)
+        self.assertEqual(10, sum(stats.peak_allocations.values()))
+        json.dumps(stats.as_dict())
+
+    def test_compiled(self):
+        for heuristic in (heft, pheft, fcfs):
+            stats, compiled_stats = SchedulerStats(), SchedulerStats()
+            solution = heuristic(self.workflow, stats=stats)
+            result = heuristic(self.compiled, stats=compiled_stats)
+            self.assertEqual(solution.makespan, result.makespan)
+            self.assertIs(compiled_stats, result.stats)
+            self.assertIs(compiled_stats, result.to_solution().stats)
+            self.assertListEqual(list(stats.phases),
+                                 list(compiled_stats.phases))
+            self.assertEqual(stats.eft_probes, compiled_stats.eft_probes)
+            self.assertDictEqual(stats.peak_allocations,
+                                 compiled_stats.peak_allocations)
+
+    def test_disabled(self):
+        solution = heft(self.workflow)
+        self.assertIsNone(solution.stats)
+        self.assertIsNone(heft(self.compiled).stats)
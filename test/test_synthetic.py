@@ -0,0 +1,101 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Tests for utils/shadowgen/synthetic.py
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from test import config as cfg
+from shadow.algorithms.heuristic import heft, compiled_heft
+from shadow.models.cache import read_cache
+from shadow.models.environment import Environment
+from shadow.models.loader import stream_workflow
+from shadow.models.workflow import Workflow
+from utils.shadowgen.synthetic import (
+    FAMILIES, generate_workflow, write_workflow, gaussian_elimination, fft
+)
+
+
+class TestSyntheticWorkflows(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.env = Environment(
+            cfg.test_heuristic_data['topcuoglu_graph_system'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_families(self):
+        for family in FAMILIES:
+            for size in [10, 100, 1000]:
+                workflow = generate_workflow(family, size)
+                num_tasks = len(workflow.comp)
+                sources = np.repeat(np.arange(num_tasks),
+                                    np.diff(workflow.succ_ptr))
+                graph = nx.DiGraph(
+                    zip(sources.tolist(), workflow.succ_idx.tolist()))
+                self.assertTrue((sources < workflow.succ_idx).all())
+                self.assertEqual(len(sources), graph.number_of_edges())
+                self.assertLessEqual(num_tasks, max(size, 15))
+                self.assertGreaterEqual(num_tasks, size // 2)
+
+    def test_topcuoglu_sizes(self):
+        # 5 x 5 matrix; 4 input points
+        self.assertEqual(14, gaussian_elimination(14)[0])
+        total, sources, targets = fft(15)
+        self.assertEqual(15, total)
+        self.assertEqual(22, len(sources))
+
+    def test_costs(self):
+        workflow = generate_workflow('denselu', 1000, ccr=0.5, mean=5000,
+                                     uniform_range=500, seed=3)
+        self.assertTrue(((4500 <= workflow.comp)
+                         & (workflow.comp < 5500)).all())
+        self.assertTrue(((2250 <= workflow.transfer_data)
+                         & (workflow.transfer_data < 2750)).all())
+        same = generate_workflow('denselu', 1000, ccr=0.5, mean=5000,
+                                 uniform_range=500, seed=3)
+        self.assertTrue(np.array_equal(workflow.comp, same.comp))
+        self.assertTrue(np.array_equal(workflow.transfer_data,
+                                       same.transfer_data))
+
+    def test_write_workflow(self):
+        for family in FAMILIES:
+            generated = generate_workflow(family, 50)
+            path = write_workflow(
+                generated, os.path.join(self.tmpdir, family + '.json'),
+                cache=True)
+            self.assertIsNotNone(read_cache(path, 'workflow'))
+            workflow = Workflow(path)
+            workflow.add_environment(self.env)
+            compiled = workflow.compile()
+            self.assertTrue(np.array_equal(generated.comp, compiled.comp))
+            self.assertTrue(np.array_equal(generated.succ_ptr,
+                                           compiled.succ_ptr))
+            self.assertTrue(np.array_equal(generated.transfer_data,
+                                           compiled.transfer_data))
+            streamed = stream_workflow(path, cache=True)
+            self.assertTrue(np.array_equal(generated.succ_idx,
+                                           streamed.succ_idx))
+            generated.add_environment(self.env)
+            self.assertEqual(heft(workflow).makespan,
+                             compiled_heft(generated).makespan)
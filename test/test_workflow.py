@@ -17,6 +17,9 @@
 
 import unittest
 import os
+import json
+import shutil
+import tempfile
 
 from test import config as cfg
 
@@ -84,3 +87,82 @@ class TestAddEnvironment(unittest.TestCase):
                 self.assertEqual([24, 28, 15], x)
 
         self.assertEqual(self.wf.graph.edges[Task(3), Task(7)]['transfer_data'], 27)
+
+    def test_runtime_matrix(self):
+        self.wf.add_environment(self.env)
+        self.assertEqual((10, 3), self.wf.runtimes.shape)
+        for task in self.wf.tasks:
+            row = [task.calc_runtime(m) for m in self.env.machines]
+            self.assertEqual(row, self.wf.runtimes[task.index].tolist())
+            self.assertEqual(sum(row) / len(row),
+                             self.wf.ave_runtimes[task.index])
+            m, w = task.calc_mininum_runtime(self.env)
+            self.assertEqual(min(row), w)
+            self.assertEqual(row.index(w), m.index)
+            m, w = task.calc_max_runtime(self.env)
+            self.assertEqual(max(row), w)
+
+
+class TestFlopRuntimes(unittest.TestCase):
+    """
+    Average, minimum and maximum runtimes of FLOP-based tasks with IO
+    demand. These are not reductions of the runtime matrix: the average
+    is the larger of the average compute and IO times, and the minimum
+    and maximum come from the fastest (slowest) compute and IO machines.
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        nodes = [(0, 2000, 0), (1, 70000, 30), (2, 45000, 4), (3, 5000, 12)]
+        links = [(0, 1, 10), (0, 2, 5), (1, 3, 3), (2, 3, 8)]
+        workflow = {
+            'header': {'time': False},
+            'graph': {
+                'directed': True, 'multigraph': False, 'graph': {},
+                'nodes': [{'id': i, 'comp': c, 'task_data': d}
+                          for i, c, d in nodes],
+                'links': [{'source': u, 'target': v, 'transfer_data': d}
+                          for u, v, d in links]
+            }
+        }
+        system = {'system': {'resources': {
+            'cat0_m0': {'flops': 7000.0, 'compute_bandwidth': 2.0},
+            'cat1_m1': {'flops': 6000.0, 'compute_bandwidth': 5.0},
+            'cat2_m2': {'flops': 11000.0, 'compute_bandwidth': 3.0}
+        }, 'system_bandwidth': 1.0}}
+        wf_path = os.path.join(self.tmpdir, 'workflow.json')
+        env_path = os.path.join(self.tmpdir, 'system.json')
+        with open(wf_path, 'w') as outfile:
+            json.dump(workflow, outfile)
+        with open(env_path, 'w') as outfile:
+            json.dump(system, outfile)
+        self.wf = Workflow(wf_path)
+        self.env = Environment(env_path)
+        self.wf.add_environment(self.env)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_runtimes(self):
+        tasks = sorted(self.wf.tasks)
+        self.assertEqual([[1, 1, 1], [15, 12, 10], [6, 8, 4], [6, 2, 4]],
+                         self.wf.runtimes.tolist())
+        # Compute times round to 0 for task 0, and are not rounded up
+        self.assertListEqual([0, 31 / 3, 6, 4],
+                             self.wf.ave_runtimes.tolist())
+        for task in tasks:
+            self.assertEqual(self.wf.ave_runtimes[task.index],
+                             task.calc_ave_runtime(self.env))
+        self.assertEqual(
+            [('cat2_m2', 1), ('cat2_m2', 6), ('cat2_m2', 4), ('cat1_m1', 2)],
+            [(m.id, w) for m, w in
+             (task.calc_mininum_runtime(self.env) for task in tasks)])
+        self.assertEqual(
+            [('cat0_m0', 0), ('cat0_m0', 15), ('cat1_m1', 8), ('cat0_m0', 6)],
+            [(m.id, w) for m, w in
+             (task.calc_max_runtime(self.env) for task in tasks)])
+
+    def test_heft(self):
+        compiled = self.wf.compile()
+        self.assertEqual(19, heuristic.heft(self.wf).makespan)
+        self.assertEqual(19, heuristic.heft(compiled).makespan)
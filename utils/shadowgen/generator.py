@@ -195,6 +195,72 @@ def generate_comp_costs(
     return cmpdict
 
 
+def graph_rng(seed, index=0):
+    """
+    Random number generator for the graph numbered `index` of a set of
+    graphs generated from the base `seed`.
+
+    Each graph has an independent stream (a child of the SeedSequence of
+    `seed`), which depends only on `seed` and `index`. Costs are therefore
+    the same whether the graphs are generated one after another or across
+    a process pool, and in whatever order.
+
+    :param seed: Base seed of the set of graphs
+    :param index: Index of the graph in the set
+    :return: numpy.random.Generator
+    """
+    return np.random.default_rng(
+        np.random.SeedSequence(seed, spawn_key=(index,)))
+
+
+def draw_comp_costs(rng, num_tasks, mean, uniform_range, multiplier=1):
+    """
+    Computation costs of `num_tasks` tasks, drawn in one call from the
+    distribution used by generate_comp_costs
+
+    :param rng: numpy.random.Generator (see graph_rng)
+    :return: numpy array of integer costs, in task order
+    """
+    comp = rng.uniform((mean - uniform_range) * multiplier,
+                       (mean + uniform_range) * multiplier,
+                       num_tasks).astype(np.int64)
+    return comp - comp % multiplier
+
+
+def draw_data_costs(rng, num_edges, mean, uniform_range, multiplier, ccr):
+    """
+    Data transferred along `num_edges` edges, drawn in one call from the
+    distribution used by generate_data_costs
+
+    :param rng: numpy.random.Generator (see graph_rng)
+    :return: numpy array of integer costs, in edge order
+    """
+    comm_mean = int(mean * ccr)
+    data = rng.uniform((comm_mean - (uniform_range * ccr)) * multiplier,
+                       (comm_mean + (uniform_range * ccr)) * multiplier,
+                       num_edges).astype(np.int64)
+    return data
+
+
+def draw_graph_costs(num_tasks, num_edges, ccr, mean, uniform_range,
+                     multiplier=1, seed=20, index=0):
+    """
+    Computation and data costs of the graph numbered `index` of a set of
+    graphs generated from `seed`, from the distributions used by
+    generate_graph_costs: as there, data costs are rounded down to a
+    multiple of `multiplier` (which draw_data_costs, like
+    generate_data_costs, does not do). Unlike generate_graph_costs, this
+    does not use (or change) the state of the `random` module.
+
+    :return: (comp, transfer_data) arrays of integer costs
+    """
+    rng = graph_rng(seed, index)
+    comp = draw_comp_costs(rng, num_tasks, mean, uniform_range, multiplier)
+    data = draw_data_costs(rng, num_edges, mean, uniform_range, multiplier,
+                           ccr)
+    return comp, data - data % multiplier
+
+
 def generate_graph_costs(
         dot_path,
         json_path,
@@ -202,10 +268,16 @@ def generate_graph_costs(
         mean,
         uniform_range,
         magnitude='giga',
-        seed=20
+        seed=20,
+        index=None
 ):
     """
     :param seed:
+    :param index: If given, costs are drawn with draw_graph_costs from the
+        stream of graph `index` of those generated from `seed` (see
+        graph_rng), rather than with the global `random` module, so they
+        do not depend on which graphs were generated before, or in which
+        process
     :param heterogeneity:
     :param magnitude:
     :param dot_path: The path of the dot file for which we are generating cost values
@@ -216,7 +288,8 @@ def generate_graph_costs(
     :param json_path: If specified, use this path as output for json
     :return: None
     """
-    random.seed(seed)
+    if index is None:
+        random.seed(seed)
     os.listdir('.')
     print(dot_path)
     multiplier = 1  # default is Giga flops
@@ -246,17 +319,29 @@ def generate_graph_costs(
     # 	total += heterogeneity[(x % len(heterogeneity))]
     # Generate machine cost values
 
-    for node in dotgraph:
-        rnd = int(random.uniform(comp_min, comp_max))
-        dotgraph.node[node]['comp'] = rnd - (rnd % multiplier)
-
-    # Generate data loads between edges and data-link transfer rates
-    comm_mean = int(mean * ccr)
-    comm_min = (comm_mean - (uniform_range * ccr)) * multiplier
-    comm_max = (comm_mean + (uniform_range * ccr)) * multiplier
-    for edge in dotgraph.edges:
-        rnd = int(random.uniform(comm_min, comm_max))
-        dotgraph.edges[edge]['transfer_data'] = (rnd - (rnd % multiplier))
+    if index is not None:
+        comp, data = draw_graph_costs(
+            dotgraph.number_of_nodes(), dotgraph.number_of_edges(), ccr,
+            mean, uniform_range, multiplier, seed, index
+        )
+        nx.set_node_attributes(
+            dotgraph, dict(zip(dotgraph.nodes, comp.tolist())), 'comp')
+        nx.set_edge_attributes(
+            dotgraph, dict(zip(dotgraph.edges, data.tolist())),
+            'transfer_data')
+    else:
+        for node in dotgraph:
+            rnd = int(random.uniform(comp_min, comp_max))
+            dotgraph.node[node]['comp'] = rnd - (rnd % multiplier)
+
+        # Generate data loads between edges and data-link transfer rates
+        comm_mean = int(mean * ccr)
+        comm_min = (comm_mean - (uniform_range * ccr)) * multiplier
+        comm_max = (comm_mean + (uniform_range * ccr)) * multiplier
+        for edge in dotgraph.edges:
+            rnd = int(random.uniform(comm_min, comm_max))
+            dotgraph.edges[edge]['transfer_data'] = (
+                rnd - (rnd % multiplier))
 
     jgraph = {
         "header": {
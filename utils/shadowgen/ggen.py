@@ -66,16 +66,17 @@ def generate_image_from_dot(dotpath, pdfpath):
 
 
 def genjson():
-    for path in sorted(os.listdir(CURR_DIR)):
-        if 'dot' in path:
-            print('Generating json for {0}'.format(path))
-            today_dir = datetime.date.today().strftime("%Y-%m-%d")
-            json_path = "{0}/{1}".format(JSON_DIR, today_dir)
-            generate_graph_costs('{0}/{1}'.format(CURR_DIR, path),
-                                 '{0}/{1}.json'.format(json_path, path[:-4]),
-                                 0.5, 5000, 500, 'giga')
-            generate_system_machines(
-                '{0}/{1}_sys.json'.format(json_path, path[:-4]),
-                512, 'giga', [0.9375, 0.0625], [(100, 150), (400, 500)])
+    dots = [path for path in sorted(os.listdir(CURR_DIR)) if 'dot' in path]
+    for index, path in enumerate(dots):
+        print('Generating json for {0}'.format(path))
+        today_dir = datetime.date.today().strftime("%Y-%m-%d")
+        json_path = "{0}/{1}".format(JSON_DIR, today_dir)
+        # Each graph has its own cost stream (see generator.graph_rng)
+        generate_graph_costs('{0}/{1}'.format(CURR_DIR, path),
+                             '{0}/{1}.json'.format(json_path, path[:-4]),
+                             0.5, 5000, 500, 'giga', seed=SEED, index=index)
+        generate_system_machines(
+            '{0}/{1}_sys.json'.format(json_path, path[:-4]),
+            512, 'giga', [0.9375, 0.0625], [(100, 150), (400, 500)])
 
 
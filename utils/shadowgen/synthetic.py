@@ -0,0 +1,361 @@
+# Copyright (C) 18/10/26 RW Bunney
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+In-process generator of synthetic workflows.
+
+This replaces the ggen workflow of ggen.py (run `ggen` once per size,
+write a DOT file, read it back with networkx and then attach costs with
+generator.generate_graph_costs). The graph of each family is built
+directly as NumPy edge arrays, the computation and data costs of every
+task and edge are drawn in a single call each, and the result is a
+CompiledWorkflow that can be scheduled straight away or written to disk:
+
+    workflow = generate_workflow('denselu', 10000, ccr=0.5, seed=20)
+    write_workflow(workflow, 'denselu_10000.json', cache=True)
+
+Each family function takes an approximate number of tasks and returns
+(num_tasks, sources, targets), where tasks are numbered
+0..num_tasks-1 and every edge goes from a lower to a higher task number.
+"""
+
+import json
+import logging
+
+import numpy as np
+
+from shadow.models.cache import write_cache, workflow_arrays
+from shadow.models.compiled import CompiledWorkflow
+from utils.shadowgen.generator import draw_graph_costs
+
+LOGGER = logging.getLogger(__name__)
+
+# Lines of the nodes and links arrays formatted per call in write_workflow
+_WRITE_BLOCK = 1 << 16
+
+MAGNITUDES = {'giga': 1, 'tera': 10, 'peta': 100}
+
+
+def layered(num_tasks, seed=20):
+    """
+    Random layered DAG: layers of `width` tasks (the square root of the
+    number of tasks), where each task after the first layer depends on two
+    distinct random tasks of the previous layer. Tasks of the first layer
+    are entry tasks, and a task of a later layer that no task chose is an
+    exit task, so the graph may have several of each.
+    """
+    rng = np.random.default_rng(seed)
+    width = max(1, int(np.sqrt(num_tasks)))
+    layers = max(1, num_tasks // width)
+    total = layers * width
+    tasks = np.arange(width, total)
+    previous = (tasks // width - 1) * width
+    first = rng.integers(0, width, len(tasks))
+    if width == 1:
+        return total, previous, tasks
+    second = (first + rng.integers(1, width, len(tasks))) % width
+    sources = np.concatenate([previous + first, previous + second])
+    targets = np.concatenate([tasks, tasks])
+    return total, sources, targets
+
+
+def fork_join(num_tasks):
+    """
+    Repeated fork-join stages: a join task fans out to `width` parallel
+    tasks, which all feed the next join task. The width is the square
+    root of the number of tasks.
+    """
+    width = max(1, int(np.sqrt(num_tasks)))
+    stages = max(1, (num_tasks - 1) // (width + 1))
+    join = np.arange(stages) * (width + 1)
+    fork = join[:, None] + 1 + np.arange(width)
+    sources = np.concatenate([np.repeat(join, width), fork.ravel()])
+    targets = np.concatenate([fork.ravel(),
+                              np.repeat(join + width + 1, width)])
+    return stages * (width + 1) + 1, sources, targets
+
+
+def denselu_blocks(num_tasks):
+    """
+    Number of blocks of the largest `denselu` workflow with at most
+    `num_tasks` tasks (and at least one block); a workflow of b blocks has
+    b(b+1)(2b+1)/6 tasks.
+    """
+    blocks = 1
+    while (blocks + 1) * (blocks + 2) * (2 * blocks + 3) // 6 <= num_tasks:
+        blocks += 1
+    return blocks
+
+
+def denselu(num_tasks):
+    """
+    Task graph of a blocked dense LU factorisation (the 'denselu' dataflow
+    graph of ggen). For each step k of a b x b block matrix, the diagonal
+    block is factorised (getrf), the blocks below and to the right of it
+    are solved (trsm), and the trailing blocks are updated (gemm). Each
+    block also depends on its own update in the previous step.
+    """
+    blocks = denselu_blocks(num_tasks)
+    sources, targets = [], []
+    offset = 0
+    previous_gemm = None
+    for k in range(blocks):
+        m = blocks - k - 1
+        getrf = offset
+        column = getrf + 1 + np.arange(m)
+        row = column + m
+        gemm = (getrf + 1 + 2 * m + np.arange(m * m)).reshape(m, m)
+        offset += 1 + 2 * m + m * m
+        # getrf -> trsm, trsm -> gemm
+        sources += [np.full(2 * m, getrf), np.repeat(column, m),
+                    np.tile(row, m)]
+        targets += [np.concatenate([column, row]), gemm.ravel(),
+                    gemm.ravel()]
+        if previous_gemm is not None:
+            # Updates of the previous step feed every block of this step
+            sources += [previous_gemm[:1, :1].ravel(),
+                        previous_gemm[1:, 0], previous_gemm[0, 1:],
+                        previous_gemm[1:, 1:].ravel()]
+            targets += [[getrf], column, row, gemm.ravel()]
+        previous_gemm = gemm
+    return offset, np.concatenate(sources), np.concatenate(targets)
+
+
+def gaussian_elimination(num_tasks):
+    """
+    Gaussian elimination graph of Topcuoglu et al. (2002) for an m x m
+    matrix, which has (m^2 + m - 2) / 2 tasks. Step k has a pivot task,
+    which feeds an update task for each column j > k; the update of
+    column k + 1 is the pivot of the next step, and the update of each
+    other column feeds the update of the same column in the next step.
+    """
+    m = 2
+    while ((m + 1) ** 2 + m - 1) // 2 <= num_tasks:
+        m += 1
+    # Step k (0-based) has a pivot followed by m - k - 1 updates
+    sizes = m - np.arange(m - 1)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    step = np.repeat(np.arange(m - 1), sizes - 1)
+    update = np.concatenate([np.arange(1, s) for s in sizes.tolist()])
+    pivot = offsets[step]
+    tasks = pivot + update
+    last = step == m - 2
+    # pivot -> updates; first update -> next pivot; others -> next update
+    nxt = np.where(update == 1, offsets[step + 1],
+                   offsets[step + 1] + update - 1)
+    sources = np.concatenate([pivot, tasks[~last]])
+    targets = np.concatenate([tasks, nxt[~last]])
+    return int(offsets[-1]), sources, targets
+
+
+def fft(num_tasks):
+    """
+    Fast Fourier Transform graph of Topcuoglu et al. (2002) for p input
+    points (a power of two), which has 2p - 1 + p log2(p) tasks: a binary
+    tree of recursive calls, whose p leaves feed log2(p) butterfly stages
+    of p tasks. Each butterfly task depends on two tasks of the previous
+    stage (or on two leaves).
+    """
+    points = 2
+    while 2 * (2 * points) - 1 + 2 * points * (points.bit_length()) \
+            <= num_tasks:
+        points *= 2
+    levels = points.bit_length() - 1
+    tree = 2 * points - 1
+    parent = np.arange(points - 1)
+    sources = [parent, parent]
+    targets = [2 * parent + 1, 2 * parent + 2]
+    previous = np.arange(points - 1, tree)
+    position = np.arange(points)
+    for stage in range(levels):
+        current = tree + stage * points + position
+        sources += [previous, previous[position ^ (1 << stage)]]
+        targets += [current, current]
+        previous = current
+    return tree + levels * points, np.concatenate(sources), \
+        np.concatenate(targets)
+
+
+def montage(num_tasks):
+    """
+    Montage-like mosaic workflow (after the Pegasus Montage workflow): n
+    images are reprojected (mProjectPP), each pair of overlapping images
+    (neighbours one and two apart) is differenced (mDiffFit), the fits are
+    concatenated (mConcatFit) and used to model the background (mBgModel),
+    each reprojected image is background-corrected (mBackground), and the
+    corrected images are tabled (mImgTbl), co-added (mAdd), shrunk
+    (mShrink) and rendered (mJPEG).
+    """
+    n = max(3, (num_tasks - 3) // 4)
+    project = np.arange(n)
+    first = np.concatenate([project[:-1], project[:-2]])
+    second = np.concatenate([project[1:], project[2:]])
+    diff = n + np.arange(len(first))
+    concat = n + len(first)
+    model = concat + 1
+    background = model + 1 + project
+    table = background[-1] + 1
+    add, shrink, jpeg = table + 1, table + 2, table + 3
+    sources = np.concatenate([
+        first, second, diff, [concat], np.full(n, model), project,
+        background, [table, add, shrink]
+    ])
+    targets = np.concatenate([
+        diff, diff, np.full(len(diff), concat), [model], background,
+        background, np.full(n, table), [add, shrink, jpeg]
+    ])
+    return jpeg + 1, sources, targets
+
+
+FAMILIES = {
+    'layered': layered,
+    'fork_join': fork_join,
+    'denselu': denselu,
+    'gaussian_elimination': gaussian_elimination,
+    'fft': fft,
+    'montage': montage
+}
+
+# Families whose structure is random, and so depends on the seed
+_SEEDED = {'layered'}
+
+
+def generate_costs(num_tasks, num_edges, ccr, mean, uniform_range,
+                   magnitude='giga', seed=20, index=0):
+    """
+    Computation demand of each task and data transferred along each edge,
+    drawn from the same uniform distributions as
+    generator.generate_graph_costs, but in one call each (see
+    generator.draw_graph_costs).
+
+    :param num_tasks: Number of tasks
+    :param num_edges: Number of edges
+    :param ccr: Communication/Computation cost ratio
+    :param mean: The mean value of the computation cost distribution
+    :param uniform_range: The range above/below the mean of the uniform
+        distribution
+    :param magnitude: 'giga', 'tera' or 'peta'; costs are rounded down to
+        a multiple of its multiplier
+    :param seed: Base seed of the random number generator
+    :param index: Index of the graph among those generated from `seed`
+    :return: (comp, transfer_data) integer arrays
+    """
+    if magnitude not in MAGNITUDES:
+        raise ValueError(
+            "Provided magnitude {0} is not supported".format(magnitude))
+    return draw_graph_costs(num_tasks, num_edges, ccr, mean, uniform_range,
+                            MAGNITUDES[magnitude], seed, index)
+
+
+def generate_workflow(family, num_tasks, ccr=0.5, mean=5000,
+                      uniform_range=500, magnitude='giga', seed=20,
+                      index=0):
+    """
+    Generate a synthetic workflow, with costs attached.
+
+    Workflows generated from the same `seed` with different `index`
+    values use independent random streams, so a set of workflows can be
+    generated in any order, or in parallel, with the same result.
+
+    :param family: Name of a graph family in FAMILIES
+    :param num_tasks: Approximate number of tasks; each family rounds it
+        to the nearest size it can produce that is not larger (except
+        that every family has a minimum size)
+    :param seed: Base seed of the cost generator (and of the graph
+        structure, for random families)
+    :param index: Index of the workflow among those generated from `seed`
+    :return: CompiledWorkflow whose task ids are 0..n-1, with FLOP-based
+        costs (its `gen_specs` attribute describes how it was generated)
+
+    See `generate_costs` for the other parameters.
+    """
+    if family not in FAMILIES:
+        raise ValueError("Unknown workflow family {0}; expected one of "
+                         "{1}".format(family, sorted(FAMILIES)))
+    if family in _SEEDED:
+        # A child of the workflow's cost stream (see generator.graph_rng)
+        structure = np.random.SeedSequence(seed, spawn_key=(index, 0))
+        total, sources, targets = FAMILIES[family](num_tasks,
+                                                   seed=structure)
+    else:
+        total, sources, targets = FAMILIES[family](num_tasks)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    comp, data = generate_costs(total, len(sources), ccr, mean,
+                                uniform_range, magnitude, seed, index)
+    # CSR successor arrays: edges grouped by source, then by target
+    order = np.lexsort((targets, sources))
+    succ_ptr = np.zeros(total + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=total), out=succ_ptr[1:])
+    workflow = CompiledWorkflow(
+        np.arange(total), comp, np.zeros(total), succ_ptr,
+        targets[order], data[order]
+    )
+    workflow.gen_specs = {
+        'family': family, 'size': num_tasks, 'ccr': ccr, 'mean': mean,
+        'uniform_range': uniform_range, 'magnitude': magnitude,
+        'seed': seed, 'index': index
+    }
+    return workflow
+
+
+def write_workflow(workflow, json_path, cache=False):
+    """
+    Write a generated workflow as a shadow workflow JSON file.
+
+    :param workflow: CompiledWorkflow from generate_workflow
+    :param json_path: Path of the JSON file
+    :param cache: If True, also write the binary cache of the workflow
+        (see shadow.models.cache), so `Workflow(json_path, cache=True)`
+        and `stream_workflow(json_path, cache=True)` memory-map the arrays
+        instead of parsing the JSON file
+    :return: json_path
+    """
+    num_tasks = len(workflow.comp)
+    header = {'time': False,
+              'gen_specs': getattr(workflow, 'gen_specs', {})}
+    sources = np.repeat(np.arange(num_tasks), np.diff(workflow.succ_ptr))
+    # JSON is formatted a block at a time, rather than with json.dump,
+    # which would need a dictionary for every node and link
+    with open(json_path, 'w') as outfile:
+        outfile.write('{{"header": {0}, "graph": {{"directed": true, '
+                      '"multigraph": false, "graph": {{}}, '
+                      '"nodes": ['.format(json.dumps(header)))
+        _write_block(outfile, '{{"id": {0}, "comp": {1}}}',
+                     workflow.tids, workflow.comp)
+        outfile.write('], "links": [')
+        _write_block(outfile,
+                     '{{"source": {0}, "target": {1}, '
+                     '"transfer_data": {2}}}',
+                     sources, workflow.succ_idx,
+                     workflow.transfer_data.astype(np.int64))
+        outfile.write(']}}')
+    LOGGER.debug('Wrote %d tasks to %s', num_tasks, json_path)
+    if cache:
+        write_cache(json_path, 'workflow', workflow_arrays(workflow),
+                    time=False)
+    return json_path
+
+
+def _write_block(outfile, template, *columns):
+    """
+    Write one `template` per row of `columns`, separated by commas
+    """
+    for start in range(0, len(columns[0]), _WRITE_BLOCK):
+        rows = zip(*(np.asarray(column[start:start + _WRITE_BLOCK]).tolist()
+                     for column in columns))
+        if start:
+            outfile.write(', ')
+        outfile.write(', '.join(template.format(*row) for row in rows))